@@ -0,0 +1,79 @@
+"""
+Benchmark the batched partition without coverage against looping over the partition of each replicate
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csp'))
+
+from obtain_predictor_intervals import get_predictors_intersections, get_interval_best_predictor, merge_intervals, \
+    get_batch_interval_lengths  # noqa: E402
+
+RHO = 0.5
+REPLICATES = 100000
+PREDICTORS = 6
+
+
+def parse_args():
+    """
+    Parse command line
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--replicates', type=int, default=REPLICATES, help='number of replicates of the batch')
+    parser.add_argument('--loop-replicates', type=int, default=REPLICATES,
+                        help='number of replicates of the loop (its time is scaled to --replicates)')
+    parser.add_argument('--predictors', type=int, default=PREDICTORS, help='number of predictors of each replicate')
+    parser.add_argument('--seed', type=int, default=1, help='random seed of the parameters of the replicates')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    return parser.parse_args()
+
+
+def get_loop_interval_lengths(parameters, rho):
+    """
+    Get the length of the interval of [0, 1] in which each predictor is the best one, one replicate at a time
+    """
+    interval_lengths = np.zeros(parameters.shape[:2])
+    for replicate, replicate_parameters in enumerate(parameters):
+        predictors = {str(i): values.tolist() for i, values in enumerate(replicate_parameters)}
+        x_points = get_predictors_intersections(rho, predictors)
+        merged_intervals = merge_intervals(get_interval_best_predictor(rho, predictors, x_points))
+        for predictor, length in merged_intervals.items():
+            interval_lengths[replicate, int(predictor)] = length
+    return interval_lengths
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    parameters = np.round(rng.uniform(0.5, 1.0, (args.replicates, args.predictors, 2)), 3)
+
+    start = time.perf_counter()
+    batch_lengths = get_batch_interval_lengths(parameters, RHO)
+    batch_seconds = time.perf_counter() - start
+
+    loop_replicates = min(args.loop_replicates, args.replicates)
+    start = time.perf_counter()
+    loop_lengths = get_loop_interval_lengths(parameters[:loop_replicates], RHO)
+    loop_seconds = (time.perf_counter() - start) * args.replicates / loop_replicates
+
+    report = {'python': platform.python_version(), 'machine': platform.machine(), 'replicates': args.replicates,
+              'loop_replicates': loop_replicates, 'predictors': args.predictors,
+              'results': {'batch': batch_seconds, 'loop': loop_seconds},
+              'max_difference': float(np.abs(batch_lengths[:loop_replicates] - loop_lengths).max())}
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=1, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=1, sort_keys=True))
+    print(f'batch: {batch_seconds:.4f} s, loop: {loop_seconds:.4f} s ({loop_seconds / batch_seconds:.0f}x)',
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark each stage of the cost space partition over synthetic predictors and compare it with a stored baseline
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csp'))
+
+from synthetic_predictors import KINDS, get_synthetic_predictors  # noqa: E402
+from find_predictor_intersections import get_nodes, unmerge_nodes, merge_nodes, get_lines, sort_line_nodes  # noqa: E402
+from build_intersection_graph import get_predictors_graph  # noqa: E402
+from search_graph_polygons import get_polygons  # noqa: E402
+from obtain_polygon_data import get_polygons_data  # noqa: E402
+from obtain_predictor_intervals import get_predictors_intersections, get_interval_best_predictor, merge_intervals, \
+    get_batch_interval_lengths  # noqa: E402
+
+RHO = 0.5
+REJ_SIZES = [3, 4, 5, 6, 8]
+NOREJ_SIZES = [3, 10, 50, 100, 200, 500]
+BATCH_REPLICATES = 1000
+BATCH_MAX_PREDICTORS = 50
+
+
+def parse_args():
+    """
+    Parse command line
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rej-sizes', type=lambda s: [int(n) for n in s.split(',')], default=REJ_SIZES,
+                        help='comma separated numbers of predictors of the benchmarks with coverage')
+    parser.add_argument('--norej-sizes', type=lambda s: [int(n) for n in s.split(',')], default=NOREJ_SIZES,
+                        help='comma separated numbers of predictors of the benchmarks without coverage')
+    parser.add_argument('--kinds', type=lambda s: s.split(','), default=KINDS, help='comma separated kinds of sets')
+    parser.add_argument('--repeat', type=int, default=3, help='repetitions of each benchmark (the minimum is kept)')
+    parser.add_argument('--max-seconds', type=float, default=60,
+                        help='skip the larger sizes of a kind once a benchmark takes longer than this')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare the results with this JSON file')
+    parser.add_argument('--threshold', type=float, default=1.5,
+                        help='fail if a stage is this times slower than in the baseline')
+    parser.add_argument('--min-seconds', type=float, default=0.01,
+                        help='ignore regressions of stages faster than this in both results')
+    return parser.parse_args()
+
+
+def time_stage(timings, stage, function, *args):
+    """
+    Run a stage, add its time to the timings and return its result
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    timings[stage] = time.perf_counter() - start
+    return result
+
+
+def run_rej_stages(rho, predictors, precision):
+    """
+    Time each stage of the partition with coverage
+    """
+    timings = {}
+    nodes = time_stage(timings, 'get_nodes', get_nodes, rho, predictors, precision)
+    nodes = time_stage(timings, 'unmerge_nodes', unmerge_nodes, nodes)
+    nodes = time_stage(timings, 'merge_nodes', merge_nodes, nodes)
+    lines = time_stage(timings, 'sort_line_nodes', lambda n: sort_line_nodes(get_lines(n)), nodes)
+    interactions, search_edges, search_nodes = time_stage(timings, 'get_predictors_graph', get_predictors_graph,
+                                                          lines)
+    polygons = time_stage(timings, 'get_polygons', get_polygons, search_edges, search_nodes, nodes, interactions)
+    time_stage(timings, 'get_polygons_data', get_polygons_data, rho, predictors, polygons)
+    return timings
+
+
+def benchmark_rej(rho, predictors):
+    """
+    Time each stage of the partition with coverage, retrying with a higher precision as csp_rej does
+    """
+    try:
+        return run_rej_stages(rho, predictors, precision=8), False
+    except IndexError:
+        return run_rej_stages(rho, predictors, precision=10), True
+
+
+def benchmark_norej(rho, predictors):
+    """
+    Time each stage of the partition without coverage and of the batched partition
+    """
+    timings = {}
+    x_points = time_stage(timings, 'get_predictors_intersections', get_predictors_intersections, rho, predictors)
+    interval_best_predictors = time_stage(timings, 'get_interval_best_predictor', get_interval_best_predictor, rho,
+                                          predictors, x_points)
+    time_stage(timings, 'merge_intervals', merge_intervals, interval_best_predictors)
+    # The batched partition evaluates every pairwise intersection, so it's only benchmarked for small panels
+    if len(predictors) <= BATCH_MAX_PREDICTORS:
+        parameters = np.broadcast_to(np.array(list(predictors.values())), (BATCH_REPLICATES, len(predictors), 2))
+        time_stage(timings, 'get_batch_interval_lengths', get_batch_interval_lengths, parameters, rho)
+    return timings, False
+
+
+def run_benchmarks(rej_sizes, norej_sizes, kinds, repeat, max_seconds):
+    """
+    Get the minimum time of each stage of each benchmark keyed by mode/kind/size/stage
+    """
+    results = {}
+    for mode, sizes, benchmark in [('rej', rej_sizes, benchmark_rej), ('norej', norej_sizes, benchmark_norej)]:
+        for kind in kinds:
+            for n in sizes:
+                predictors = get_synthetic_predictors(kind, n, mode=mode, seed=n)
+                best_timings = {}
+                retry = False
+                for _ in range(repeat):
+                    try:
+                        timings, retry = benchmark(RHO, predictors)
+                    except Exception as e:
+                        print(f'{mode}/{kind}/{n}: failed ({type(e).__name__})', file=sys.stderr)
+                        break
+                    for stage, seconds in timings.items():
+                        best_timings[stage] = min(seconds, best_timings.get(stage, seconds))
+                    if sum(timings.values()) > max_seconds:
+                        break
+                for stage, seconds in best_timings.items():
+                    results[f'{mode}/{kind}/{n}/{stage}'] = seconds
+                total = sum(best_timings.values())
+                print(f'{mode}/{kind}/{n}: {total:.4f} s' + (' (precision retry)' if retry else ''), file=sys.stderr)
+                if total > max_seconds:
+                    break
+    return results
+
+
+def get_regressions(results, baseline, threshold, min_seconds):
+    """
+    Get the stages that are threshold times slower than in the baseline
+    """
+    regressions = {}
+    for key, seconds in results.items():
+        baseline_seconds = baseline.get(key)
+        if baseline_seconds is None or max(seconds, baseline_seconds) < min_seconds:
+            continue
+        if seconds > threshold * baseline_seconds:
+            regressions[key] = (baseline_seconds, seconds)
+    return regressions
+
+
+def main():
+    args = parse_args()
+    results = run_benchmarks(args.rej_sizes, args.norej_sizes, args.kinds, args.repeat, args.max_seconds)
+    report = {'python': platform.python_version(), 'machine': platform.machine(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=1, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=1, sort_keys=True))
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = get_regressions(results, baseline, args.threshold, args.min_seconds)
+        for key, (baseline_seconds, seconds) in sorted(regressions.items()):
+            print(f'REGRESSION {key}: {baseline_seconds:.4f} s -> {seconds:.4f} s', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
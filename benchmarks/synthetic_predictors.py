@@ -0,0 +1,79 @@
+"""
+Reproducible synthetic sets of predictors to benchmark the cost space partition
+"""
+
+import numpy as np
+
+KINDS = ['random', 'near_degenerate', 'concurrent', 'dominated']
+CONCURRENT_POINT = (0.3, 0.3)
+REFERENCE_PREDICTOR = (0.9, 0.8, 0.9)
+
+
+def get_random_parameters(rng, n, n_parameters):
+    """
+    Predictors with independent uniform parameters
+    """
+    return rng.uniform(0.5, 1.0, (n, n_parameters))
+
+
+def get_near_degenerate_parameters(rng, n, n_parameters):
+    """
+    Predictors that differ in a few thousandths from a common predictor, whose planes and lines are near parallel
+    """
+    base = rng.uniform(0.6, 0.95, n_parameters)
+    return np.clip(base + rng.uniform(-0.003, 0.003, (n, n_parameters)), 0, 1)
+
+
+def get_concurrent_parameters(rng, n, n_parameters, rho):
+    """
+    Predictors with the cost of a reference predictor on a common point,
+    so their intersection lines (rej) or points (norej) are concurrent
+    """
+    x0, y0 = CONCURRENT_POINT
+    sens_0, spec_0, cov_0 = REFERENCE_PREDICTOR
+    parameters = []
+    while len(parameters) < n:
+        sens, cov = rng.uniform(0.5, 1.0, 2)
+        if n_parameters == 3:
+            cost = (x0 * (rho * cov_0 * (1 - sens_0) + cov_0 - 1) + y0 * ((1 - rho) * cov_0 * (1 - spec_0) + cov_0 - 1)
+                    + 1 - cov_0)
+            y_coefficient = (cost - x0 * (rho * cov * (1 - sens) + cov - 1) - (1 - cov)) / y0
+            spec = 1 - (y_coefficient - cov + 1) / ((1 - rho) * cov)
+            values = [sens, spec, cov]
+        else:
+            cost = x0 * ((1 - spec_0) + rho * (sens_0 + spec_0 - 2)) + rho * (1 - sens_0)
+            slope = (cost - rho * (1 - sens)) / x0
+            spec = (slope - 1 - rho * sens + 2 * rho) / (rho - 1)
+            values = [sens, spec]
+        if 0 <= spec <= 1:
+            parameters.append(values)
+    return np.array(parameters)
+
+
+def get_dominated_parameters(rng, n, n_parameters):
+    """
+    A predictor that dominates the rest, which have lower sensitivity and specificity and the same coverage
+    """
+    best = rng.uniform(0.7, 1.0, n_parameters)
+    parameters = np.tile(best, (n, 1))
+    parameters[1:, :2] = best[:2] * rng.uniform(0.6, 1.0, (n - 1, 2))
+    return parameters
+
+
+def get_synthetic_predictors(kind, n, mode='rej', seed=0, rho=0.5):
+    """
+    Get a dict of n predictors of the given kind with their parameters rounded to 3 decimals as in the config file
+    """
+    rng = np.random.default_rng(seed)
+    n_parameters = 3 if mode == 'rej' else 2
+    if kind == 'random':
+        parameters = get_random_parameters(rng, n, n_parameters)
+    elif kind == 'near_degenerate':
+        parameters = get_near_degenerate_parameters(rng, n, n_parameters)
+    elif kind == 'concurrent':
+        parameters = get_concurrent_parameters(rng, n, n_parameters, rho)
+    elif kind == 'dominated':
+        parameters = get_dominated_parameters(rng, n, n_parameters)
+    else:
+        raise Exception(f'ERROR: synthetic predictors kind {kind} unknown')
+    return {f'predictor{i + 1}': [round(float(value), 3) for value in values] for i, values in enumerate(parameters)}
@@ -0,0 +1,123 @@
+"""
+Approximate the areas of the cost space partition over an adaptive triangular grid with a rigorous error bound
+
+The region where a predictor is the best one is convex (intersection of half-planes), so a grid cell whose three
+vertices have the same best predictor belongs entirely to it. The rest of cells are refined, and when the refinement
+stops, each one is assigned to the best predictor of its centroid and its area is added to the error bound of every
+predictor that could be the best one somewhere inside the cell.
+"""
+
+import time
+import numpy as np
+from obtain_polygon_data import get_predictors_cost_matrix, get_predictor_area
+
+TRIANGLE_AREA = 0.5
+CHUNK_COSTS = 2 ** 22
+
+
+def get_triangle_grid(depth):
+    """
+    Get the 4^depth congruent cells (cells x vertices x 2 array) that tile the cost space triangle
+    """
+    n = 2 ** depth
+    i, j = np.array([(i, j) for i in range(n) for j in range(n - i)]).reshape(-1, 2).T
+    upward = np.stack([np.stack([i, j], 1), np.stack([i + 1, j], 1), np.stack([i, j + 1], 1)], 1)
+    i, j = np.array([(i, j) for i in range(n) for j in range(n - i - 1)]).reshape(-1, 2).T
+    downward = np.stack([np.stack([i + 1, j], 1), np.stack([i + 1, j + 1], 1), np.stack([i, j + 1], 1)], 1)
+    return np.concatenate([upward, downward]).astype(float) / n
+
+
+def split_cells(cells):
+    """
+    Split each cell in the 4 cells defined by the middle points of its edges
+    """
+    v0, v1, v2 = cells[:, 0], cells[:, 1], cells[:, 2]
+    m01, m12, m20 = (v0 + v1) / 2, (v1 + v2) / 2, (v2 + v0) / 2
+    return np.concatenate([np.stack([v0, m01, m20], 1), np.stack([m01, v1, m12], 1),
+                           np.stack([m20, m12, v2], 1), np.stack([m01, m12, m20], 1)])
+
+
+def get_cells_area(cells):
+    """
+    Get the area of each cell
+    """
+    (x0, y0), (x1, y1), (x2, y2) = np.moveaxis(cells, (1, 2), (0, 1))
+    return np.abs((x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0)) / 2
+
+
+def get_cells_candidates(cell_costs, vertex_labels):
+    """
+    Get the predictors that can be the best one somewhere inside each cell
+    The cost difference of two predictors is linear, so a predictor can only beat the best predictor of a vertex
+    somewhere in the cell if it beats it in one of the cell vertices
+    """
+    vertex_best_costs = np.take_along_axis(cell_costs, vertex_labels[:, None, :], axis=2)
+    differences = cell_costs[:, :, None, :] - vertex_best_costs[:, :, :, None]
+    return (differences.min(axis=1) <= 0).all(axis=1)
+
+
+def classify_cells(cells, rho, predictors):
+    """
+    Get the best predictor of each cell whose vertices share it (-1 otherwise),
+    and the best predictor of the centroid and the candidate best predictors of the rest of cells
+    """
+    vertex_costs = get_predictors_cost_matrix(cells[..., 0], cells[..., 1], rho, predictors)
+    vertex_labels = vertex_costs.argmin(axis=2)
+    uniform = (vertex_labels == vertex_labels[:, :1]).all(axis=1)
+    labels = np.where(uniform, vertex_labels[:, 0], -1)
+    centroids = cells[~uniform].mean(axis=1)
+    centroid_labels = get_predictors_cost_matrix(centroids[:, 0], centroids[:, 1], rho, predictors).argmin(axis=1)
+    candidates = get_cells_candidates(vertex_costs[~uniform], vertex_labels[~uniform])
+    return labels, centroid_labels, candidates
+
+
+def get_approximate_areas(rho, predictors, tolerance, max_depth=20, initial_depth=4, chunk_size=None, deadline=None):
+    """
+    Get the approximate area of each predictor and the bound of its error
+    Cells are refined until the bound of the relative areas is below tolerance, the grid reaches max_depth or the
+    time.perf_counter() deadline is over, processing chunk_size cells at a time to bound the memory of the
+    (cells x vertices x predictors) costs
+    """
+    if not 0 < tolerance < 1:
+        raise Exception(f'ERROR: approximate tolerance {tolerance} should be between 0 and 1')
+    n_predictors = len(predictors)
+    if chunk_size is None:
+        chunk_size = max(1, CHUNK_COSTS // (9 * n_predictors))
+    areas = np.zeros(n_predictors)
+    error_bounds = np.zeros(n_predictors)
+    cells = get_triangle_grid(initial_depth)
+    depth = initial_depth
+    while len(cells):
+        cells_area = get_cells_area(cells[:1])[0]
+        mixed_cells = []
+        mixed_centroid_labels = []
+        mixed_candidates = np.zeros(n_predictors)
+        for start in range(0, len(cells), chunk_size):
+            chunk = cells[start:start + chunk_size]
+            labels, centroid_labels, candidates = classify_cells(chunk, rho, predictors)
+            resolved = labels >= 0
+            areas += cells_area * np.bincount(labels[resolved], minlength=n_predictors)
+            mixed_cells.append(chunk[~resolved])
+            mixed_centroid_labels.append(centroid_labels)
+            mixed_candidates += cells_area * candidates.sum(axis=0)
+        cells = np.concatenate(mixed_cells)
+        if depth >= max_depth or mixed_candidates.max(initial=0) / TRIANGLE_AREA <= tolerance or \
+                (deadline is not None and time.perf_counter() > deadline):
+            centroid_labels = np.concatenate(mixed_centroid_labels)
+            areas += cells_area * np.bincount(centroid_labels, minlength=n_predictors)
+            error_bounds += mixed_candidates
+            break
+        cells = split_cells(cells)
+        depth += 1
+    return areas, error_bounds
+
+
+def get_approximate_partition(rho, predictors, tolerance, max_depth=20, deadline=None):
+    """
+    Get the approximate areas, relative areas and bound of the relative areas error of each predictor
+    """
+    areas, error_bounds = get_approximate_areas(rho, predictors, tolerance, max_depth, deadline=deadline)
+    best_predictor_areas = dict(zip(predictors, areas.tolist()))
+    predictor_areas, predictor_relative_areas = get_predictor_area(best_predictor_areas, predictors)
+    relative_error_bounds = dict(zip(predictors, (error_bounds / TRIANGLE_AREA).tolist()))
+    return predictor_areas, predictor_relative_areas, relative_error_bounds
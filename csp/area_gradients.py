@@ -0,0 +1,122 @@
+"""
+Analytic gradients of the areas of the cost space partition with respect to the predictor's parameters and rho
+
+The region of predictor p is where its cost plane is the lowest one, so when a parameter changes, each boundary edge
+between the regions of p and q moves with the normal velocity -dg/dparameter / |grad g| of g = cost_p - cost_q.
+The derivative of the area of p is the integral of that velocity along its boundary edges, which is exact for the
+linear costs from the length and the middle point of each edge (the edges of the triangle don't move).
+"""
+
+import numpy as np
+from csp_rej import get_partition_arrays
+from plane_envelope import get_plane_coefficients
+from obtain_polygon_data import get_predictor_area
+from partition_format import get_partition_areas
+from result_cache import DEFAULT_CACHE_SIZE
+
+PARAMETERS = ['sensitivity', 'specificity', 'coverage']
+
+
+def get_coefficient_derivatives(rho, parameters):
+    """
+    Get the derivatives of the (a, b, c) cost coefficients of each predictor with respect to its sensitivity,
+    specificity and coverage (predictors x parameters x coefficients), and with respect to rho (predictors x
+    coefficients)
+    """
+    sens, spec, cov = np.asarray(parameters, dtype=float).T
+    zeros = np.zeros(len(sens))
+    derivatives = np.stack([
+        np.stack([-rho * cov, zeros, zeros], axis=1),
+        np.stack([zeros, -(1 - rho) * cov, zeros], axis=1),
+        np.stack([rho * (1 - sens) + 1, (1 - rho) * (1 - spec) + 1, -np.ones(len(sens))], axis=1)
+    ], axis=1)
+    rho_derivatives = np.stack([cov * (1 - sens), -cov * (1 - spec), zeros], axis=1)
+    return derivatives, rho_derivatives
+
+
+def get_boundary_edges(arrays):
+    """
+    Get the edges between polygons with different best predictors: the best predictors p and q of both sides,
+    and the length and middle point of each edge
+    """
+    coords = np.asarray(arrays['polygon_coords'], dtype=float)
+    offsets = np.asarray(arrays['polygon_offsets'])
+    polygon_ids = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    # The edges of a polygon join each point to the next one, except its last point (the first one repeated)
+    starts = np.flatnonzero(np.arange(len(coords)) < offsets[polygon_ids + 1] - 1)
+    edges = np.sort(np.stack([coords[starts], coords[starts + 1]], axis=1).view(complex)[..., 0], axis=1)
+    _, inverse, counts = np.unique(edges, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+
+    # Interior edges are shared by two polygons, which are consecutive once sorted by edge
+    order = np.argsort(inverse, kind='stable')
+    shared = np.flatnonzero((counts[inverse[order]] == 2)[:-1] & (inverse[order][1:] == inverse[order][:-1]))
+    first, second = order[shared], order[shared + 1]
+    predictors = np.asarray(arrays['polygon_predictors'])[polygon_ids[starts]]
+    boundary = predictors[first] != predictors[second]
+    first, second = first[boundary], second[boundary]
+    lengths = np.abs(edges[first, 1] - edges[first, 0])
+    middle_points = (edges[first, 0] + edges[first, 1]) / 2
+    return predictors[first], predictors[second], lengths, np.stack([middle_points.real, middle_points.imag], axis=1)
+
+
+def get_area_gradients(rho, predictors, arrays):
+    """
+    Get the derivative of the area of each predictor with respect to the sensitivity, specificity and coverage of
+    each predictor ({predictor: {other predictor: [derivatives]}}), and with respect to rho ({predictor: derivative})
+    from the arrays of the partition
+    """
+    names = arrays['predictors'].tolist()
+    parameters = np.array([predictors[name] for name in names], dtype=float).reshape(-1, 3)
+    coefficients = get_plane_coefficients(rho, parameters)
+    derivatives, rho_derivatives = get_coefficient_derivatives(rho, parameters)
+
+    p, q, lengths, middle_points = get_boundary_edges(arrays)
+    points = np.column_stack([middle_points, np.ones(len(p))])
+    gradients = coefficients[p, :2] - coefficients[q, :2]
+    weights = lengths / np.hypot(gradients[:, 0], gradients[:, 1])
+
+    # Moving the boundary of the region of p (g <= 0) outwards adds to the area of p what it takes from q
+    n = len(names)
+    parameter_gradients = np.zeros((n, n, len(PARAMETERS)))
+    p_velocities = -weights[:, None] * np.einsum('ekc,ec->ek', derivatives[p], points)
+    q_velocities = weights[:, None] * np.einsum('ekc,ec->ek', derivatives[q], points)
+    np.add.at(parameter_gradients, (p, p), p_velocities)
+    np.add.at(parameter_gradients, (q, p), -p_velocities)
+    np.add.at(parameter_gradients, (p, q), q_velocities)
+    np.add.at(parameter_gradients, (q, q), -q_velocities)
+    rho_velocities = -weights * np.einsum('ec,ec->e', rho_derivatives[p] - rho_derivatives[q], points)
+    rho_gradients = np.bincount(p, rho_velocities, n) - np.bincount(q, rho_velocities, n)
+
+    ids = {name: i for i, name in enumerate(names)}
+    return ({predictor: {other: parameter_gradients[ids[predictor], ids[other]].tolist() for other in predictors}
+             for predictor in predictors},
+            {predictor: rho_gradients[ids[predictor]].item() for predictor in predictors})
+
+
+def get_partition_gradients(rho, predictors, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Get the areas, relative areas and gradients of the areas of the predictors from a single partition
+    """
+    arrays = get_partition_arrays(rho, predictors, cache_dir, cache_size)
+    predictor_areas, predictor_relative_areas = get_predictor_area(get_partition_areas(arrays), predictors)
+    return (predictor_areas, predictor_relative_areas, *get_area_gradients(rho, predictors, arrays))
+
+
+def print_gradients(rho, predictors, parameter_gradients, rho_gradients):
+    spaces_predictors = len(max(list(predictors) + ['Predictor'], key=lambda p: len(p)))
+    spaces_parameters = spaces_predictors + len(' sensitivity')
+    print('\nGradients of the absolute values (rho={}):\n'.format(rho))
+    print('{: <{spaces}}\t{: <{parameter_spaces}}\tDerivative'.format(
+        'Predictor', 'With respect to', spaces=spaces_predictors, parameter_spaces=spaces_parameters))
+    print('{: <{spaces}}\t{: <{parameter_spaces}}\t----------'.format(
+        '---------', '---------------', spaces=spaces_predictors, parameter_spaces=spaces_parameters))
+    for predictor in predictors:
+        print('{: <{spaces}}\t{: <{parameter_spaces}}\t{:.6g}'.format(
+            predictor, 'rho', rho_gradients[predictor], spaces=spaces_predictors, parameter_spaces=spaces_parameters))
+        for other, derivatives in parameter_gradients[predictor].items():
+            for parameter, derivative in zip(PARAMETERS, derivatives):
+                if derivative != 0:
+                    print('{: <{spaces}}\t{: <{parameter_spaces}}\t{:.6g}'.format(
+                        predictor, other + ' ' + parameter, derivative, spaces=spaces_predictors,
+                        parameter_spaces=spaces_parameters))
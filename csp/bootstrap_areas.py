@@ -0,0 +1,181 @@
+"""
+Bootstrap the benchmark counts of the predictors to get confidence intervals of the cost space partition with coverage
+"""
+
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+from csp_rej import read_config, parse_rho, get_partition, get_best_combination, print_float
+
+COUNTS = ['TP', 'FN', 'TN', 'FP', 'rejected']
+
+
+def parse_counts_config(filename):
+    """
+    Parse the rho and predictor's true positives, false negatives, true negatives, false positives and rejected
+    variants from the config file
+    """
+    config = read_config(filename)
+    rho = parse_rho(config)
+    try:
+        counts = dict(config.items('counts'))
+    except Exception as e:
+        sys.exit(e)
+
+    if len(counts) == 0:
+        sys.exit('The predictor(s) counts are missing')
+    for predictor, values in counts.items():
+        values = values.replace(' ', '').split(',')
+        if len(values) != len(COUNTS):
+            sys.exit(predictor + ' counts should contain ' + ', '.join(COUNTS[:-1]) + ' and ' + COUNTS[-1] +
+                     ' but it has ' + str(len(values)) + ' elements')
+        for i, value in enumerate(values):
+            if not value.isdigit():
+                sys.exit(predictor + ' ' + COUNTS[i] + ' is ' + str(value) + ' but should be a non-negative integer')
+        values = [int(value) for value in values]
+        tp, fn, tn, fp, rejected = values
+        if tp + fn == 0 or tn + fp == 0:
+            sys.exit(predictor + ' counts should contain at least one positive (TP, FN) and one negative (TN, FP)')
+        counts[predictor] = values
+
+    return rho, counts
+
+
+def get_counts_parameters(counts):
+    """
+    Get the sensitivity, specificity and coverage (rounded to 3 decimals as in the config file) from an array of
+    counts whose last axis is TP, FN, TN, FP and rejected
+    """
+    counts = np.asarray(counts, dtype=float)
+    tp, fn, tn, fp, rejected = np.moveaxis(counts, -1, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sens = tp / (tp + fn)
+        spec = tn / (tn + fp)
+        cov = (tp + fn + tn + fp) / (tp + fn + tn + fp + rejected)
+    return np.round(np.stack([sens, spec, cov], axis=-1), 3)
+
+
+def get_bootstrap_parameters(counts, replicates, seed=None):
+    """
+    Resample the benchmark of each predictor (multinomial over its counts) and get the parameters of each replicate
+    A parameter without resampled variants in its denominator keeps the value of the original counts
+    """
+    rng = np.random.default_rng(seed)
+    observed = np.array(list(counts.values()), dtype=np.int64)
+    totals = observed.sum(axis=1)
+    resampled = np.stack([rng.multinomial(total, row / total, size=replicates)
+                          for total, row in zip(totals, observed)], axis=1)
+    parameters = get_counts_parameters(resampled)
+    observed_parameters = np.broadcast_to(get_counts_parameters(observed), parameters.shape)
+    return np.where(np.isnan(parameters), observed_parameters, parameters)
+
+
+def get_replicate_areas(rho, predictors):
+    """
+    Get the areas and relative areas of a replicate, or None if the geometry of its partition fails
+    """
+    try:
+        return get_partition(rho, predictors)
+    except (IndexError, RecursionError):
+        return None
+
+
+def iter_replicate_areas(rho, names, parameters, processes=None, chunksize=4):
+    """
+    Stream the areas of the replicates, in order, computing them in a pool of processes
+    """
+    replicate_predictors = ({name: values.tolist() for name, values in zip(names, replicate)}
+                            for replicate in parameters)
+    if processes == 1:
+        yield from map(get_replicate_areas, repeat(rho), replicate_predictors)
+        return
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        yield from executor.map(get_replicate_areas, repeat(rho), replicate_predictors, chunksize=chunksize)
+
+
+def get_bootstrap_areas(rho, counts, replicates, seed=None, processes=None):
+    """
+    Get the areas, relative areas and membership to the best combination of the predictors in each replicate
+    Failed replicates are kept as NaN rows and their number is reported
+    """
+    names = list(counts)
+    parameters = get_bootstrap_parameters(counts, replicates, seed)
+    areas = np.full((replicates, len(names)), np.nan)
+    relative_areas = np.full((replicates, len(names)), np.nan)
+    in_best_combination = np.zeros((replicates, len(names)), dtype=bool)
+    for replicate, result in enumerate(iter_replicate_areas(rho, names, parameters, processes)):
+        if result is None:
+            continue
+        predictor_areas, predictor_relative_areas = result
+        areas[replicate] = [predictor_areas[name] for name in names]
+        relative_areas[replicate] = [predictor_relative_areas[name] for name in names]
+        best_combination = get_best_combination(predictor_relative_areas)
+        in_best_combination[replicate] = [name in best_combination for name in names]
+    dropped = int(np.isnan(areas).any(axis=1).sum())
+    if dropped:
+        print('{} of {} replicates dropped: their partition failed'.format(dropped, replicates), file=sys.stderr)
+    return areas, relative_areas, in_best_combination
+
+
+def get_bootstrap_summary(names, areas, relative_areas, in_best_combination, confidence=0.95):
+    """
+    Get the percentile confidence intervals of the areas and relative areas of each predictor
+    and its probability of being in the best combination
+    """
+    valid = ~np.isnan(areas).any(axis=1)
+    tail = 100 * (1 - confidence) / 2
+    percentiles = [tail, 100 - tail]
+    summary = {}
+    if not valid.any():
+        return summary, 0
+    area_intervals = np.percentile(areas[valid], percentiles, axis=0)
+    relative_area_intervals = np.percentile(relative_areas[valid], percentiles, axis=0)
+    best_probability = in_best_combination[valid].mean(axis=0)
+    for i, name in enumerate(names):
+        summary[name] = {'area': tuple(area_intervals[:, i].tolist()),
+                         'relative_area': tuple(relative_area_intervals[:, i].tolist()),
+                         'best_probability': float(best_probability[i])}
+    return summary, int(valid.sum())
+
+
+def print_output(rho, counts, replicates, valid_replicates, predictor_relative_areas, summary, confidence=0.95):
+    sorted_predictors = sorted(counts, key=lambda p: (-predictor_relative_areas[p], p))
+    spaces_predictors = len(max(list(counts) + ['Predictor'], key=lambda p: len(p)))
+    interval = '{:g}% CI'.format(100 * confidence)
+    print('\nCLINICAL SPACE PARTITION BOOTSTRAP')
+    print('----------------------------------\n')
+    print('Parameters considered: sensitivity, specificity and coverage\n')
+    print('Methods compared: {}\n'.format(', '.join(counts)))
+    print('Replicates (rho={}): {} of {} computed\n'.format(rho, valid_replicates, replicates))
+    print('List of clinical space fraction {} and probability of being in the best combination:\n'.format(interval))
+    print('{: <{spaces}}\tAbsolute value\tRelative value\tBest combination'.format('Predictor',
+                                                                              spaces=spaces_predictors))
+    print('{: <{spaces}}\t--------------\t--------------\t----------------'.format('---------',
+                                                                              spaces=spaces_predictors))
+    for predictor in sorted_predictors:
+        if predictor not in summary:
+            continue
+        area_low, area_high = summary[predictor]['area']
+        relative_low, relative_high = summary[predictor]['relative_area']
+        area_interval = '{} - {}'.format(print_float(area_low), print_float(area_high))
+        relative_interval = '{} - {}'.format(print_float(relative_low), print_float(relative_high))
+        print('{: <{spaces}}\t{: <14}\t{: <14}\t{}'.format(predictor, area_interval, relative_interval,
+                                                           print_float(summary[predictor]['best_probability']),
+                                                           spaces=spaces_predictors))
+
+
+def main(rho, counts, replicates, seed=None, processes=None, confidence=0.95):
+    """
+    Get the bootstrap confidence intervals of the cost space partition of given predictors with coverage
+    """
+    names = list(counts)
+    observed_parameters = get_counts_parameters(list(counts.values()))
+    predictors = {name: values.tolist() for name, values in zip(names, observed_parameters)}
+    _, predictor_relative_areas = get_partition(rho, predictors)
+
+    areas, relative_areas, in_best_combination = get_bootstrap_areas(rho, counts, replicates, seed, processes)
+    summary, valid_replicates = get_bootstrap_summary(names, areas, relative_areas, in_best_combination, confidence)
+
+    # Output
+    print_output(rho, counts, replicates, valid_replicates, predictor_relative_areas, summary, confidence)
@@ -0,0 +1,153 @@
+"""
+Re-entrant cost space partition engine that returns immutable results instead of printing them
+
+The engine copies its inputs and the partition functions don't modify their arguments, so one engine can be used
+from many threads. Results can be shared with other processes through memory-mapped buffers: once a result is
+shared, pickling it only sends the path of its buffers.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+import numpy as np
+from csp_rej import get_partition_arrays, get_best_combination, print_output
+from csp_norej import get_partition as get_norej_partition, print_output as print_norej_output
+from obtain_polygon_data import get_predictor_area
+from partition_format import save_partition, load_partition, get_partition_areas
+from result_cache import DEFAULT_CACHE_SIZE
+
+MODE_PARAMETERS = {'rej': 3, 'norej': 2}
+
+
+def get_frozen_arrays(arrays):
+    """
+    Get a read-only mapping of read-only views of the arrays
+    """
+    frozen_arrays = {}
+    for name, array in arrays.items():
+        array = array.view()
+        array.setflags(write=False)
+        frozen_arrays[name] = array
+    return MappingProxyType(frozen_arrays)
+
+
+@dataclass(frozen=True)
+class PartitionResult:
+    """
+    Areas and relative areas of each predictor, and for the partition with coverage its arrays in the partition format
+    """
+    mode: str
+    rho: float
+    predictors: tuple
+    areas: MappingProxyType
+    relative_areas: MappingProxyType
+    arrays: MappingProxyType = field(default=None, compare=False)
+    path: str = field(default=None, compare=False)
+
+    @property
+    def best_combination(self):
+        return get_best_combination(self.relative_areas)
+
+    def print_output(self):
+        predictors = dict(self.predictors)
+        if self.mode == 'rej':
+            print_output(self.rho, predictors, dict(self.areas), dict(self.relative_areas))
+        else:
+            print_norej_output(self.rho, predictors, dict(self.relative_areas))
+
+    def share(self, path):
+        """
+        Write the arrays as .npy buffers in the path directory and get the result backed by their memory maps
+        """
+        save_partition(path, dict(self.arrays))
+        return replace(self, arrays=get_frozen_arrays(load_partition(path)), path=path)
+
+    def __getstate__(self):
+        return {
+            'mode': self.mode,
+            'rho': self.rho,
+            'predictors': self.predictors,
+            'areas': dict(self.areas),
+            'relative_areas': dict(self.relative_areas),
+            'arrays': None if self.path is not None or self.arrays is None else dict(self.arrays),
+            'path': self.path
+        }
+
+    def __setstate__(self, state):
+        arrays = load_partition(state['path']) if state['path'] is not None else state['arrays']
+        state.update({'areas': MappingProxyType(state['areas']),
+                      'relative_areas': MappingProxyType(state['relative_areas']),
+                      'arrays': None if arrays is None else get_frozen_arrays(arrays)})
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+
+class CSPEngine:
+    """
+    Cost space partition engine with or without coverage (mode rej or norej) that keeps the last results
+    """
+
+    def __init__(self, mode='rej', cache_dir=None, cache_size=DEFAULT_CACHE_SIZE, max_results=128):
+        if mode not in MODE_PARAMETERS:
+            raise ValueError('ERROR: engine mode ' + str(mode) + ' unknown')
+        self.mode = mode
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.max_results = max_results
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # The results and the lock stay in the process of the engine
+        return {'mode': self.mode, 'cache_dir': self.cache_dir, 'cache_size': self.cache_size,
+                'max_results': self.max_results}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def get_predictors(self, predictors):
+        """
+        Get an immutable copy of the predictors with their parameters rounded to 3 decimals as parse_config
+        """
+        copied_predictors = []
+        for predictor, values in predictors.items():
+            values = tuple(round(float(value), 3) for value in values)
+            if len(values) != MODE_PARAMETERS[self.mode]:
+                raise ValueError(predictor + ' should have ' + str(MODE_PARAMETERS[self.mode]) + ' parameters')
+            copied_predictors.append((predictor, values))
+        return tuple(copied_predictors)
+
+    def partition(self, rho, predictors):
+        """
+        Get the result of the cost space partition of given predictors
+        """
+        rho = float(rho)
+        predictors = self.get_predictors(predictors)
+        key = (rho, predictors)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        # The partition runs outside the lock, so threads compute different partitions at the same time
+        predictors_dict = {predictor: list(values) for predictor, values in predictors}
+        if self.mode == 'rej':
+            arrays = get_partition_arrays(rho, predictors_dict, self.cache_dir, self.cache_size)
+            predictor_areas, predictor_relative_areas = get_predictor_area(get_partition_areas(arrays),
+                                                                           predictors_dict)
+            arrays = get_frozen_arrays({name: np.asarray(array) for name, array in arrays.items()})
+        else:
+            merged_intervals = get_norej_partition(rho, predictors_dict, self.cache_dir, self.cache_size)
+            predictor_relative_areas = {predictor: merged_intervals.get(predictor, 0.0)
+                                        for predictor in predictors_dict}
+            predictor_areas = dict(predictor_relative_areas)
+            arrays = None
+        result = PartitionResult(self.mode, rho, predictors, MappingProxyType(predictor_areas),
+                                 MappingProxyType(predictor_relative_areas), arrays)
+
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return result
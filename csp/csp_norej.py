@@ -2,13 +2,19 @@
 Cost space partition without coverage
 """
 
-from csp_rej import parse_args, parse_config, print_float
+import sys
+from contextlib import nullcontext, redirect_stdout
+import numpy as np
+from csp_rej import parse_args, parse_input, check_options, print_float
+from stage_stats import stage, count, set_stat, collect_stats, write_stats
+from result_cache import DEFAULT_CACHE_SIZE, get_canonical_order, load_entry, store_entry
 from obtain_predictor_intervals import get_predictors_intersections, get_interval_best_predictor, merge_intervals
 
 
 def print_output(rho, predictors, merged_intervals):
-    merged_intervals.update({predictor: 0 for predictor in predictors if predictor not in merged_intervals})
-    sorted_intervals = sorted(merged_intervals.items(), key=lambda x: (-x[1], x[0]))
+    predictor_intervals = dict(merged_intervals)
+    predictor_intervals.update({predictor: 0 for predictor in predictors if predictor not in merged_intervals})
+    sorted_intervals = sorted(predictor_intervals.items(), key=lambda x: (-x[1], x[0]))
     predictors_area_round3 = [predictor for predictor, interval in sorted_intervals if round(interval, 3) > 0]
     spaces_predictors = len(max(list(predictors) + ['Predictor'], key=lambda p: len(p)))
     print('\nCLINICAL SPACE PARTITION')
@@ -23,26 +29,138 @@ def print_output(rho, predictors, merged_intervals):
         print('{: <{spaces}}\t{}'.format(best_predictor, print_float(merged_interval), spaces=spaces_predictors))
 
 
-def main(rho, predictors):
+def get_merged_intervals(rho, predictors):
     """
-    Get the cost space partition of given predictors without coverage
+    Get the intersection points, the best predictor of each interval and the merged intervals of each best predictor
     """
     # Get the intersection points of predictors
-    x_points = get_predictors_intersections(rho, predictors)
+    with stage('get_predictors_intersections'):
+        x_points = get_predictors_intersections(rho, predictors)
+        count('x_points', len(x_points))
 
     # Get the best predictor in each interval
-    interval_best_predictors = get_interval_best_predictor(rho, predictors, x_points)
+    with stage('get_interval_best_predictor'):
+        interval_best_predictors = get_interval_best_predictor(rho, predictors, x_points)
+        count('intervals', len(interval_best_predictors))
 
     # Merge intervals with the same best predictor
-    merged_intervals = merge_intervals(interval_best_predictors)
+    with stage('merge_intervals'):
+        merged_intervals = merge_intervals(interval_best_predictors)
+    return x_points, interval_best_predictors, merged_intervals
+
+
+def get_partition_points(rho, predictors, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Get the intersection points and the merged intervals of each best predictor,
+    reusing the partition cached in cache_dir if given
+    """
+    if cache_dir is not None:
+        entry = load_entry(cache_dir, rho, predictors, 'norej')
+        set_stat('cache_hit', entry is not None)
+        if entry is not None:
+            canonical_order = get_canonical_order(predictors)
+            return entry['x_points'].tolist(), {canonical_order[predictor_id]: length
+                                                for predictor_id, length in zip(entry['merged_predictors'].tolist(),
+                                                                                entry['merged_lengths'].tolist())}
+
+    x_points, interval_best_predictors, merged_intervals = get_merged_intervals(rho, predictors)
+
+    if cache_dir is not None:
+        predictor_ids = {predictor: predictor_id
+                         for predictor_id, predictor in enumerate(get_canonical_order(predictors))}
+        arrays = {
+            'x_points': np.array(x_points, dtype=float),
+            'interval_predictors': np.array([predictor_ids[p] for p in interval_best_predictors.values()],
+                                            dtype=np.int64),
+            'merged_predictors': np.array([predictor_ids[p] for p in merged_intervals], dtype=np.int64),
+            'merged_lengths': np.array(list(merged_intervals.values()), dtype=float)
+        }
+        store_entry(cache_dir, rho, predictors, 'norej', arrays, cache_size)
+    return x_points, merged_intervals
+
+
+def get_partition(rho, predictors, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Get the merged intervals of each best predictor, reusing the partition cached in cache_dir if given
+    """
+    return get_partition_points(rho, predictors, cache_dir, cache_size)[1]
+
+
+def get_cost_partition(rho, predictors, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Get the merged intervals of each best predictor and the expected costs (of each predictor and of the best
+    combination) from the same intersection points
+    """
+    from expected_costs import get_interval_costs
+    x_points, merged_intervals = get_partition_points(rho, predictors, cache_dir, cache_size)
+    with stage('get_interval_costs'):
+        return merged_intervals, get_interval_costs(rho, predictors, x_points)
+
+
+def main(rho, predictors, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Get the cost space partition of given predictors without coverage
+    """
+    merged_intervals = get_partition(rho, predictors, cache_dir, cache_size)
 
     # Output
     print_output(rho, predictors, merged_intervals)
 
 
 if __name__ == '__main__':
-    # Parse predictors and rho
-    user_rho, user_predictors = parse_config(parse_args(), mode='norej')
+    # Parse predictors and rho of the config file or of each group of a table
+    user_args = parse_args(mode='norej')
+    user_runs = parse_input(user_args, mode='norej')
+    check_options(user_args)
+    if user_args.density:
+        from density_weights import parse_density_config, get_density_intervals
+        user_density = parse_density_config(user_args.density, mode='norej')
 
-    # Execute CSP without coverage
-    main(user_rho, user_predictors)
+    from output_writers import open_writer, open_text_output, get_side_output
+    with collect_stats() if user_args.stats else nullcontext() as user_stats:
+        if user_args.curves:
+            # Execute CSP without coverage of the curves of the predictors
+            from threshold_curves import get_curve_partition, print_curve_output
+            with open_text_output(user_args.output, user_args.group_by) as print_group:
+                for user_group, user_rho, user_curves in user_runs:
+                    print_group(user_group)
+                    print_curve_output(user_rho, user_curves, *get_curve_partition(user_rho, user_curves))
+        elif user_args.pairwise:
+            # Compare each pair of predictors
+            from pairwise_wins import get_pairwise_wins, print_pairwise_wins
+            with open_text_output(user_args.output, user_args.group_by) as print_group:
+                for user_group, user_rho, user_predictors in user_runs:
+                    print_group(user_group)
+                    print_pairwise_wins(user_rho, user_predictors,
+                                        get_pairwise_wins(user_rho, user_predictors, mode='norej'))
+        elif user_args.stability:
+            # Get how far each parameter can change before the best combination changes
+            from stability_radius import get_stability_radii, print_stability_radii
+            with open_text_output(user_args.output, user_args.group_by) as print_group:
+                for user_group, user_rho, user_predictors in user_runs:
+                    print_group(user_group)
+                    print_stability_radii(user_rho, user_predictors,
+                                          *get_stability_radii(user_rho, user_predictors, mode='norej'))
+        else:
+            # Execute CSP without coverage
+            with open_writer(user_args.output_format, user_args.output, 'norej', user_args.round,
+                             user_args.group_by, costs=user_args.costs) as write_run:
+                for user_group, user_rho, user_predictors in user_runs:
+                    if user_args.costs:
+                        # With the expected costs
+                        merged_intervals, user_costs = get_cost_partition(user_rho, user_predictors,
+                                                                          user_args.cache_dir, user_args.cache_size)
+                        write_run(user_group, user_rho, user_predictors, None, merged_intervals,
+                                  expected_costs=user_costs)
+                        continue
+                    if user_args.density:
+                        # Weighted by the density
+                        with stage('get_density_intervals'):
+                            merged_intervals = get_density_intervals(user_rho, user_predictors, user_density)
+                    else:
+                        merged_intervals = get_partition(user_rho, user_predictors, user_args.cache_dir,
+                                                         user_args.cache_size)
+                    write_run(user_group, user_rho, user_predictors, None, merged_intervals)
+    if user_args.stats:
+        with redirect_stdout(get_side_output(user_args.output_format, user_args.output)):
+            write_stats(user_stats, user_args.stats)
@@ -2,42 +2,182 @@
 Cost space partition with coverage
 """
 
+import os
 import sys
 import argparse
 import configparser
+from contextlib import nullcontext, redirect_stdout
 from find_predictor_intersections import get_predictors_intersection
 from build_intersection_graph import get_predictors_graph
-from search_graph_polygons import get_polygons
-from obtain_polygon_data import get_polygons_data
+from search_graph_polygons import get_polygons, iter_polygons
+from obtain_polygon_data import get_polygon_best_predictor, get_best_predictor_area, accumulate_best_predictor_area, \
+    get_predictor_area
+from stage_stats import stage, count, set_stat, collect_stats, write_stats
+from result_cache import DEFAULT_CACHE_SIZE, get_canonical_order, load_entry, store_entry
+from partition_format import encode_partition, save_partition, get_partition_areas
+from tabular_input import is_table, parse_table
+from partition_budget import BudgetExceeded, parse_budget, get_deadline, limit_budget, check_budget
+from raster_tiles import DEFAULT_RASTER_SIZE, MAX_RASTER_SIZE
 import decimal
+import numpy as np
 
+BUDGET_TOLERANCE = 0.001
+# The options that each mode of the command line takes (the modes other than the partition are written as a text
+# table), and the pairs of options of the partition that exclude each other
+MODE_OPTIONS = {
+    'curves': [],
+    'pairwise': [],
+    'stability': [],
+    'top_k': ['cache_dir'],
+    'gradients': ['cache_dir'],
+    'partition': ['output_format', 'cache_dir', 'density', 'costs', 'approximate', 'budget', 'export', 'spill_faces',
+                  'raster', 'verify']
+}
+OPTION_CONFLICTS = [('approximate', 'budget'), ('density', 'approximate'), ('density', 'budget'),
+                    ('density', 'export'), ('density', 'spill_faces'), ('density', 'verify'), ('costs', 'density'),
+                    ('costs', 'approximate'), ('costs', 'budget'), ('costs', 'spill_faces'),
+                    ('spill_faces', 'cache_dir'), ('spill_faces', 'export'), ('spill_faces', 'approximate')]
 
-def parse_args():
+
+def parse_args(mode='rej'):
     """
     Parse command line
     """
     parser = argparse.ArgumentParser()
     parser.add_argument('file', type=argparse.FileType('r'), help='select the config file')
+    parser.add_argument('--stats', nargs='?', const='-', metavar='FILE',
+                        help='write the time, peak memory and counts of each stage as JSON to FILE '
+                             '(or after the output)')
+    parser.add_argument('--rho', type=float, help='rho of a CSV, TSV or Parquet table (otherwise its rho column)')
+    parser.add_argument('--group-by', metavar='COLUMN', help='run the partition of each group of rows of a table')
+    parser.add_argument('--output-format', choices=['text', 'json', 'jsonl', 'csv', 'parquet'], default='text',
+                        help='write the results as a text table (default), JSON, JSON lines, CSV or Parquet')
+    parser.add_argument('--output', metavar='FILE', help='write the results to FILE instead of the standard output')
+    parser.add_argument('--round', type=int, metavar='DECIMALS',
+                        help='round the values of the structured formats (full precision by default)')
+    parser.add_argument('--cache-dir', help='reuse the results cached in this directory and cache the new ones')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, metavar='BYTES',
+                        help='evict the least recently used results once the cache is larger than BYTES')
+    if mode == 'rej':
+        parser.add_argument('--gradients', action='store_true',
+                            help='write the derivatives of the absolute values with respect to the sensitivity, '
+                                 'specificity and coverage of each predictor and rho')
+        parser.add_argument('--top-k', type=int, metavar='K',
+                            help='write the area of each rank of each predictor and of each ordering of the best K '
+                                 'predictors')
+    parser.add_argument('--density', metavar='FILE',
+                        help='weight the clinical space by the polynomial, piecewise-constant or empirical density '
+                             'of the [density] section of FILE')
+    parser.add_argument('--costs', action='store_true',
+                        help='add the expected cost of each predictor and of the best combination, and the regret '
+                             'of each predictor')
+    parser.add_argument('--stability', action='store_true',
+                        help='write how far each parameter and rho can change before the predictors with a non-zero '
+                             'clinical space fraction change instead of the partition')
+    parser.add_argument('--pairwise', action='store_true',
+                        help='write the fraction of the clinical space where each predictor beats each other one '
+                             'instead of the partition')
+    parser.add_argument('--curves', action='store_true',
+                        help='read a curve of operating points of each predictor from a table with a row for each '
+                             'threshold (threshold column) and get the best threshold along the cost space')
+    if mode == 'rej':
+        parser.add_argument('--bootstrap', type=int, metavar='N',
+                            help='resample the [counts] of the config file N times to get confidence intervals')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='random seed of the bootstrap replicates and verification samples')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='number of processes used to compute the bootstrap replicates')
+        parser.add_argument('--approximate', type=float, metavar='TOLERANCE',
+                            help='approximate the partition with a bound of the relative values error below TOLERANCE')
+        parser.add_argument('--verify', type=int, metavar='SAMPLES',
+                            help='verify the areas with a quasi-Monte Carlo estimation of SAMPLES points')
+        parser.add_argument('--export', metavar='PATH',
+                            help='write the nodes, lines and polygons of the partition as an .npz file, '
+                                 'or as memory-mappable .npy buffers in the PATH directory')
+        parser.add_argument('--budget', type=parse_budget, metavar='BUDGET',
+                            help='approximate the partition if the exact one takes more than BUDGET seconds, '
+                                 'or has more than nodes=N nodes or faces=N faces (e.g. 30,nodes=5000)')
+        parser.add_argument('--spill-faces', metavar='FILE',
+                            help='write each polygon, its best predictor and area as a JSON line to FILE '
+                                 'as they are found')
+        parser.add_argument('--raster', metavar='DIR',
+                            help='write the best predictor of each pixel of the clinical space as memory-mappable '
+                                 'uint16 .npy levels in the DIR directory')
+        parser.add_argument('--raster-size', type=int, default=DEFAULT_RASTER_SIZE, metavar='PIXELS',
+                            help='number of pixels of each side of the full resolution raster (default {})'.format(
+                                DEFAULT_RASTER_SIZE))
     args = parser.parse_args()
-    filename = args.file.name
-    return filename
+    return args
 
 
-def parse_config(filename, mode):
+def is_option_given(args, option):
+    if option == 'output_format':
+        return args.output_format != 'text'
+    return getattr(args, option, None) not in [None, False]
+
+
+def get_option_flag(args, option):
+    if option == 'output_format':
+        return '--output-format ' + args.output_format
+    return '--' + option.replace('_', '-')
+
+
+def check_options(args):
     """
-    Parse the rho and predictor's sensitivity, specificity and coverage from the config file
+    Exit if the options of the command line can't be combined: only one mode is given, with the options it takes,
+    and the options of the partition don't exclude each other
+    """
+    options = [option for option in list(MODE_OPTIONS) + MODE_OPTIONS['partition'] if is_option_given(args, option)]
+    modes = [option for option in options if option in MODE_OPTIONS] or ['partition']
+    if len(modes) > 1:
+        sys.exit('Only one of ' + ', '.join(get_option_flag(args, mode) for mode in modes) + ' can be given')
+    ignored_options = [option for option in options if option not in MODE_OPTIONS and
+                       option not in MODE_OPTIONS[modes[0]]]
+    if ignored_options:
+        sys.exit(get_option_flag(args, modes[0]) + ' can not be combined with ' +
+                 ', '.join(get_option_flag(args, option) for option in ignored_options))
+    for first, second in OPTION_CONFLICTS:
+        if first in options and second in options:
+            sys.exit(get_option_flag(args, first) + ' can not be combined with ' + get_option_flag(args, second))
+
+
+def read_config(filename):
+    """
+    Read the config file keeping the case of the predictor's names
     """
     config = configparser.ConfigParser()
     config.optionxform = str
     try:
         config.read(filename)
+    except Exception as e:
+        sys.exit(e)
+    return config
+
+
+def parse_rho(config):
+    """
+    Parse and check the rho value of the config file
+    """
+    try:
         rho = float(config.get('rho', 'rho'))
-        predictors = dict(config.items('predictors'))
     except Exception as e:
         sys.exit(e)
 
     if not 0.00001 <= rho <= 1:
         sys.exit('The rho value ' + str(rho) + ' should be between 0.00001 - 1')
+    return rho
+
+
+def parse_config(filename, mode):
+    """
+    Parse the rho and predictor's sensitivity, specificity and coverage from the config file
+    """
+    config = read_config(filename)
+    rho = parse_rho(config)
+    try:
+        predictors = dict(config.items('predictors'))
+    except Exception as e:
+        sys.exit(e)
 
     if len(predictors) == 0:
         sys.exit('The predictor(s) are missing')
@@ -67,20 +207,78 @@ def parse_config(filename, mode):
     return rho, predictors
 
 
-def predictors_2_polygons(rho, predictors, precision):
+def parse_input(args, mode):
     """
-    Get the polygons from the intersection of predictors
+    Parse the group, rho and predictors of each run: the config file, or each group of rows of a table
+    """
+    curves = getattr(args, 'curves', False)
+    if is_table(args.file.name):
+        return parse_table(args.file.name, mode, args.rho, args.group_by, curves=curves)
+    if curves:
+        sys.exit('The curves of the predictors are read from a CSV, TSV or Parquet table')
+    rho, predictors = parse_config(args.file.name, mode)
+    return [(None, rho, predictors)]
+
+
+def get_group_path(path, group):
+    """
+    Get the path of the output of a group of rows
+    """
+    if path is None or group is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return root + '-' + group + extension
+
+
+def predictors_2_graph(rho, predictors, precision):
+    """
+    Get the nodes, lines and graph elements to search the polygons from the intersection of predictors
     """
     # Get the lines and nodes of the intersection of predictor's planes and lines
     nodes, lines = get_predictors_intersection(rho, predictors, precision)
 
     # Get graph elements to search the polygons
-    interactions, search_edges, search_nodes = get_predictors_graph(lines)
+    with stage('get_predictors_graph', precision=precision):
+        interactions, search_edges, search_nodes = get_predictors_graph(lines)
+        count('edges', len(set(search_edges)))
+        # Faces of the connected planar graph (Euler's formula without the outer face)
+        check_budget('faces', len(set(search_edges)) - len(nodes) + 1)
+    return nodes, lines, interactions, search_edges, search_nodes
+
+
+def predictors_2_arrangement(rho, predictors, precision):
+    """
+    Get the nodes, lines and polygons from the intersection of predictors
+    """
+    nodes, lines, interactions, search_edges, search_nodes = predictors_2_graph(rho, predictors, precision)
 
     # Search the polygons
-    polygons = get_polygons(search_edges, search_nodes, nodes, interactions)
+    with stage('get_polygons', precision=precision):
+        polygons = get_polygons(search_edges, search_nodes, nodes, interactions)
+
+    return nodes, lines, polygons
 
-    return polygons
+
+def predictors_2_polygons(rho, predictors, precision):
+    """
+    Get the polygons from the intersection of predictors
+    """
+    return predictors_2_arrangement(rho, predictors, precision)[2]
+
+
+def predictors_2_areas(rho, predictors, precision, spill_faces=None):
+    """
+    Get the area of each best predictor from the intersection of predictors, adding each polygon as it's found,
+    and writing the polygons as JSON lines to spill_faces if given
+    """
+    nodes, lines, interactions, search_edges, search_nodes = predictors_2_graph(rho, predictors, precision)
+
+    # Search the polygons and add them to the areas of their best predictors
+    with stage('get_polygons', precision=precision), \
+            open(spill_faces, 'w') if spill_faces is not None else nullcontext() as spill:
+        polygons = iter_polygons(search_edges, search_nodes, nodes, interactions)
+        best_predictor_areas = accumulate_best_predictor_area(rho, predictors, polygons, spill)
+    return best_predictor_areas
 
 
 def print_float(num):
@@ -90,43 +288,287 @@ def print_float(num):
     return decimal.Decimal(str(round(num, 3))).normalize()
 
 
-def print_output(rho, predictors, predictor_areas, predictor_relative_areas):
+def get_best_combination(predictor_relative_areas):
+    """
+    Get the predictors with a non-zero relative area sorted from the largest to the smallest area
+    """
     sorted_predictor_areas = sorted(predictor_relative_areas.items(), key=lambda x: (-x[1], x[0]))
-    predictors_area_round3 = [predictor for predictor, area in sorted_predictor_areas if round(area, 3) > 0]
+    return [predictor for predictor, area in sorted_predictor_areas if round(area, 3) > 0]
+
+
+def print_output(rho, predictors, predictor_areas, predictor_relative_areas, relative_error_bounds=None):
+    sorted_predictor_areas = sorted(predictor_relative_areas.items(), key=lambda x: (-x[1], x[0]))
+    predictors_area_round3 = get_best_combination(predictor_relative_areas)
     spaces_predictors = len(max(list(predictors) + ['Predictor'], key=lambda p: len(p)))
     print('\nCLINICAL SPACE PARTITION')
     print('------------------------\n')
     print('Parameters considered: sensitivity, specificity and coverage\n')
     print('Methods compared: {}\n'.format(', '.join(predictors)))
+    if relative_error_bounds is not None:
+        print('Approximate partition: relative values within the error bound of each predictor\n')
     print('Best combination of methods (rho={}): {}\n'.format(rho, ', '.join(predictors_area_round3)))
     print('List of clinical space fraction for each predictor:\n')
-    print('{: <{spaces}}\tAbsolute value\tRelative value'.format('Predictor', spaces=spaces_predictors))
-    print('{: <{spaces}}\t--------------\t--------------'.format('---------', spaces=spaces_predictors))
+    if relative_error_bounds is None:
+        print('{: <{spaces}}\tAbsolute value\tRelative value'.format('Predictor', spaces=spaces_predictors))
+        print('{: <{spaces}}\t--------------\t--------------'.format('---------', spaces=spaces_predictors))
+    else:
+        print('{: <{spaces}}\tAbsolute value\tRelative value\tError bound'.format('Predictor',
+                                                                                  spaces=spaces_predictors))
+        print('{: <{spaces}}\t--------------\t--------------\t-----------'.format('---------',
+                                                                                  spaces=spaces_predictors))
     for predictor, _ in sorted_predictor_areas:
-        print('{: <{spaces}}\t{}\t\t{}'.format(predictor, print_float(predictor_areas.get(predictor, 0)),
-                                               print_float(predictor_relative_areas.get(predictor, 0)),
-                                               spaces=spaces_predictors))
+        line = '{: <{spaces}}\t{}\t\t{}'.format(predictor, print_float(predictor_areas.get(predictor, 0)),
+                                                print_float(predictor_relative_areas.get(predictor, 0)),
+                                                spaces=spaces_predictors)
+        if relative_error_bounds is not None:
+            line += '\t\t{:.1e}'.format(relative_error_bounds.get(predictor, 0))
+        print(line)
 
 
-def main(rho, predictors):
+def retry_precision(function, rho, predictors, *args):
     """
-    Get the cost space partition of given predictors with coverage
+    Call function with the precision 8, retrying with the precision 10 if the polygons can't be found
     """
     try:
-        polygons = predictors_2_polygons(rho, predictors, precision=8)
+        return function(rho, predictors, 8, *args)
     except IndexError:
-        polygons = predictors_2_polygons(rho, predictors, precision=10)
+        set_stat('retry', True)
+        return function(rho, predictors, 10, *args)
+
+
+def get_partition_arrangement(rho, predictors):
+    """
+    Get the nodes, lines and polygons of the cost space partition,
+    retrying with a higher precision if the polygons can't be found
+    """
+    return retry_precision(predictors_2_arrangement, rho, predictors)
+
+
+def get_partition_polygons(rho, predictors):
+    """
+    Get the polygons of the cost space partition, retrying with a higher precision if the polygons can't be found
+    """
+    return get_partition_arrangement(rho, predictors)[2]
+
+
+def get_partition_arrays(rho, predictors, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Get the arrays of the arrangement, the best predictor of each polygon and the area of each predictor
+    of the cost space partition, reusing the partition cached in cache_dir if given
+    """
+    canonical_order = get_canonical_order(predictors)
+    if cache_dir is not None:
+        arrays = load_entry(cache_dir, rho, predictors, 'rej')
+        set_stat('cache_hit', arrays is not None)
+        if arrays is not None:
+            arrays['predictors'] = np.array(canonical_order, dtype=str)
+            return arrays
+
+    nodes, lines, polygons = get_partition_arrangement(rho, predictors)
+    with stage('get_polygons_data'):
+        polygon_best_predictor = get_polygon_best_predictor(rho, predictors, polygons)
+        best_predictor_areas = get_best_predictor_area(polygons, polygon_best_predictor)
+    arrays = encode_partition(canonical_order, nodes, lines, polygons, polygon_best_predictor, best_predictor_areas)
+
+    if cache_dir is not None:
+        store_entry(cache_dir, rho, predictors, 'rej', arrays, cache_size)
+    return arrays
+
+
+def get_partition(rho, predictors, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE, spill_faces=None):
+    """
+    Get the areas and relative areas of the cost space partition of given predictors with coverage,
+    reusing the partition cached in cache_dir if given, or otherwise without keeping all the polygons in memory
+    (they are written as JSON lines to spill_faces if given)
+    """
+    if cache_dir is not None:
+        arrays = get_partition_arrays(rho, predictors, cache_dir, cache_size)
+        return get_predictor_area(get_partition_areas(arrays), predictors)
+
+    best_predictor_areas = retry_precision(predictors_2_areas, rho, predictors, spill_faces)
+    return get_predictor_area(best_predictor_areas, predictors)
+
+
+def run_partition(rho, predictors, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE, export=None, spill_faces=None):
+    """
+    Get the areas and relative areas of the cost space partition, writing its arrays to export
+    or its polygons to spill_faces if given
+    """
+    if export is None:
+        return get_partition(rho, predictors, cache_dir, cache_size, spill_faces)
+    arrays = get_partition_arrays(rho, predictors, cache_dir, cache_size)
+    save_partition(export, arrays)
+    return get_predictor_area(get_partition_areas(arrays), predictors)
+
+
+def run_cost_partition(rho, predictors, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE, export=None):
+    """
+    Get the areas, relative areas and expected costs (of each predictor and of the best combination) of the cost
+    space partition from the same arrays, writing them to export if given
+    """
+    from expected_costs import get_partition_costs
+    arrays = get_partition_arrays(rho, predictors, cache_dir, cache_size)
+    if export is not None:
+        save_partition(export, arrays)
+    with stage('get_partition_costs'):
+        expected_costs = get_partition_costs(rho, predictors, arrays)
+    return (*get_predictor_area(get_partition_areas(arrays), predictors), expected_costs)
 
-    # Get best predictors, areas and relative areas
-    predictor_areas, predictor_relative_areas = get_polygons_data(rho, predictors, polygons)
+
+def get_budget_partition(rho, predictors, budget, tolerance=BUDGET_TOLERANCE, cache_dir=None,
+                         cache_size=DEFAULT_CACHE_SIZE, export=None, spill_faces=None):
+    """
+    Get the areas and relative areas of the exact cost space partition (and None) if it's within the budget,
+    otherwise the approximate areas, relative areas and bound of the relative areas error, refined until the seconds
+    of the budget run out
+    """
+    deadline = get_deadline(budget)
+    try:
+        with limit_budget(budget):
+            return (*run_partition(rho, predictors, cache_dir, cache_size, export, spill_faces), None)
+    except (BudgetExceeded, RecursionError) as error:
+        set_stat('budget_exceeded', str(error))
+        print('Budget exceeded: {}, approximating the partition'.format(error), file=sys.stderr)
+
+    from approximate_areas import get_approximate_partition
+    with stage('get_approximate_partition'):
+        return get_approximate_partition(rho, predictors, tolerance, deadline=deadline)
+
+
+def run_user_partition(args, rho, predictors, group=None, density=None):
+    """
+    Get the areas and relative areas (and error bounds if approximate) of the partition selected in the command line
+    """
+    if density is not None:
+        # Execute CSP coverage weighted by the density
+        from density_weights import get_density_areas
+        with stage('get_density_areas'):
+            best_predictor_areas = get_density_areas(rho, predictors, density, args.cache_dir, args.cache_size)
+        return get_predictor_area(best_predictor_areas, predictors)
+    if args.approximate:
+        # Execute the approximate CSP coverage
+        from approximate_areas import get_approximate_partition
+        with stage('get_approximate_partition'):
+            return get_approximate_partition(rho, predictors, args.approximate)
+    if args.budget:
+        # Execute CSP coverage within the budget, otherwise the approximate CSP coverage
+        return get_budget_partition(rho, predictors, args.budget, BUDGET_TOLERANCE, args.cache_dir, args.cache_size,
+                                    get_group_path(args.export, group), get_group_path(args.spill_faces, group))
+    # Execute CSP coverage
+    return run_partition(rho, predictors, args.cache_dir, args.cache_size, get_group_path(args.export, group),
+                         get_group_path(args.spill_faces, group))
+
+
+def main(rho, predictors, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE, export=None):
+    """
+    Get the cost space partition of given predictors with coverage, writing its arrays to export if given
+    """
+    predictor_areas, predictor_relative_areas = run_partition(rho, predictors, cache_dir, cache_size, export)
 
     # Output
     print_output(rho, predictors, predictor_areas, predictor_relative_areas)
+    return predictor_areas, predictor_relative_areas
 
 
 if __name__ == '__main__':
-    # Parse predictors and rho
-    user_rho, user_predictors = parse_config(parse_args(), mode='rej')
+    user_args = parse_args(mode='rej')
 
-    # Execute CSP coverage
-    main(user_rho, user_predictors)
+    if user_args.bootstrap is not None and user_args.bootstrap < 1:
+        sys.exit('The number of bootstrap replicates should be at least 1 but it is ' + str(user_args.bootstrap))
+    if user_args.bootstrap:
+        # Parse benchmark counts and rho and execute the CSP coverage bootstrap
+        from bootstrap_areas import parse_counts_config, main as bootstrap_main
+        user_rho, user_counts = parse_counts_config(user_args.file.name)
+        bootstrap_main(user_rho, user_counts, user_args.bootstrap, user_args.seed, user_args.processes)
+    else:
+        # Parse predictors and rho of the config file or of each group of a table
+        user_runs = parse_input(user_args, mode='rej')
+        if user_args.approximate is not None and not 0 < user_args.approximate < 1:
+            sys.exit('The tolerance of the approximate partition should be between 0 and 1 (both excluded) but it is '
+                     + str(user_args.approximate))
+        if user_args.top_k is not None and user_args.top_k < 1:
+            sys.exit('The number of ranked predictors should be at least 1 but it is ' + str(user_args.top_k))
+        if not 1 <= user_args.raster_size <= MAX_RASTER_SIZE:
+            sys.exit('The raster size should be between 1 and {} pixels'.format(MAX_RASTER_SIZE))
+        check_options(user_args)
+
+        if user_args.density:
+            from density_weights import parse_density_config
+            user_density = parse_density_config(user_args.density, mode='rej')
+        else:
+            user_density = None
+
+        from output_writers import open_writer, open_text_output, get_side_output
+        with collect_stats() if user_args.stats else nullcontext() as user_stats:
+            if user_args.curves:
+                # Execute CSP coverage of the curves of the predictors
+                from plane_envelope import get_curve_partition, print_curve_output
+                with open_text_output(user_args.output, user_args.group_by) as print_group:
+                    for user_group, user_rho, user_curves in user_runs:
+                        print_group(user_group)
+                        print_curve_output(user_rho, user_curves, *get_curve_partition(user_rho, user_curves))
+            elif user_args.pairwise:
+                # Compare each pair of predictors
+                from pairwise_wins import get_pairwise_wins, print_pairwise_wins
+                with open_text_output(user_args.output, user_args.group_by) as print_group:
+                    for user_group, user_rho, user_predictors in user_runs:
+                        print_group(user_group)
+                        print_pairwise_wins(user_rho, user_predictors,
+                                            get_pairwise_wins(user_rho, user_predictors, mode='rej'))
+            elif user_args.stability:
+                # Get how far each parameter can change before the best combination changes
+                from stability_radius import get_stability_radii, print_stability_radii
+                with open_text_output(user_args.output, user_args.group_by) as print_group:
+                    for user_group, user_rho, user_predictors in user_runs:
+                        print_group(user_group)
+                        print_stability_radii(user_rho, user_predictors,
+                                              *get_stability_radii(user_rho, user_predictors, mode='rej'))
+            elif user_args.top_k:
+                # Execute CSP coverage and rank the best predictors
+                from rank_levels import get_rank_partition, print_rank_output
+                with open_text_output(user_args.output, user_args.group_by) as print_group:
+                    for user_group, user_rho, user_predictors in user_runs:
+                        print_group(user_group)
+                        print_rank_output(user_rho, user_predictors, *get_rank_partition(
+                            user_rho, user_predictors, user_args.top_k, user_args.cache_dir, user_args.cache_size))
+            elif user_args.gradients:
+                # Execute CSP coverage and the gradients of its areas
+                from area_gradients import get_partition_gradients, print_gradients
+                with open_text_output(user_args.output, user_args.group_by) as print_group:
+                    for user_group, user_rho, user_predictors in user_runs:
+                        print_group(user_group)
+                        *user_areas, user_parameter_gradients, user_rho_gradients = get_partition_gradients(
+                            user_rho, user_predictors, user_args.cache_dir, user_args.cache_size)
+                        print_output(user_rho, user_predictors, *user_areas)
+                        print_gradients(user_rho, user_predictors, user_parameter_gradients, user_rho_gradients)
+            else:
+                with open_writer(user_args.output_format, user_args.output, 'rej', user_args.round,
+                                 user_args.group_by, error_bounds=bool(user_args.approximate or user_args.budget),
+                                 costs=user_args.costs) as write_run:
+                    for user_group, user_rho, user_predictors in user_runs:
+                        if user_args.costs:
+                            # Execute CSP coverage and its expected costs
+                            *user_areas, user_costs = run_cost_partition(
+                                user_rho, user_predictors, user_args.cache_dir, user_args.cache_size,
+                                get_group_path(user_args.export, user_group))
+                            write_run(user_group, user_rho, user_predictors, *user_areas, expected_costs=user_costs)
+                        else:
+                            user_areas = run_user_partition(user_args, user_rho, user_predictors, user_group,
+                                                            user_density)
+                            write_run(user_group, user_rho, user_predictors, *user_areas)
+
+                        if user_args.raster:
+                            # Write the raster of the best predictors
+                            from raster_tiles import write_raster
+                            write_raster(get_group_path(user_args.raster, user_group), user_rho, user_predictors,
+                                         user_args.raster_size)
+
+                        if user_args.verify:
+                            # Verify the CSP coverage areas
+                            from verify_areas import main as verify_main
+                            with redirect_stdout(get_side_output(user_args.output_format, user_args.output)):
+                                verify_main(user_rho, user_predictors, user_areas[0], user_args.verify,
+                                            user_args.seed)
+        if user_args.stats:
+            with redirect_stdout(get_side_output(user_args.output_format, user_args.output)):
+                write_stats(user_stats, user_args.stats)
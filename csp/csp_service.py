@@ -0,0 +1,367 @@
+"""
+Local cost space partition service: JSON requests over localhost HTTP or a Unix socket answered by warm workers
+
+POST /partition with {"rho": 0.5, "predictors": {"name": [sens, spec, cov], ...}, "mode": "rej"} returns the areas,
+GET /metrics returns the latency histograms and counters in the Prometheus text format and GET /health returns "ok".
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from csp_rej import get_partition, get_best_combination
+from csp_norej import get_partition as get_norej_partition
+from result_cache import DEFAULT_CACHE_SIZE, get_cache_key, get_canonical_order
+
+LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60]
+MAX_BODY_SIZE = 2 ** 20
+MODE_PARAMETERS = {'rej': ['sensitivity', 'specificity', 'coverage'], 'norej': ['sensitivity', 'specificity']}
+STATUS_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                  413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable',
+                  504: 'Gateway Timeout'}
+WARM_PREDICTORS = {'rej': {'a': [0.9, 0.8, 0.7], 'b': [0.8, 0.9, 0.8]}, 'norej': {'a': [0.9, 0.8], 'b': [0.8, 0.9]}}
+
+
+def parse_args():
+    """
+    Parse command line
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1', help='listen on this host')
+    parser.add_argument('--port', type=int, default=8765, help='listen on this port')
+    parser.add_argument('--unix', metavar='PATH', help='listen on this Unix socket instead of a port')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help='reject the requests once this many are being computed (twice the workers by default)')
+    parser.add_argument('--timeout', type=float, default=30, help='seconds before a request times out')
+    parser.add_argument('--cache-entries', type=int, default=1024, help='results kept in memory')
+    parser.add_argument('--cache-ttl', type=float, default=3600, help='seconds a result is kept in memory')
+    parser.add_argument('--cache-dir', help='also reuse the results cached in this directory')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, metavar='BYTES',
+                        help='evict the least recently used results once the directory is larger than BYTES')
+    return parser.parse_args()
+
+
+def parse_request(request):
+    """
+    Parse and check the rho, predictors and mode of a request, rounding the parameters to 3 decimals as parse_config
+    """
+    if not isinstance(request, dict):
+        raise ValueError('The request should be a JSON object')
+    mode = request.get('mode', 'rej')
+    if mode not in MODE_PARAMETERS:
+        raise ValueError('The mode ' + str(mode) + ' should be rej or norej')
+    try:
+        rho = float(request['rho'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('The rho value is missing or is not a number')
+    if not 0.00001 <= rho <= 1:
+        raise ValueError('The rho value ' + str(rho) + ' should be between 0.00001 - 1')
+    predictors = request.get('predictors')
+    if not isinstance(predictors, dict) or len(predictors) == 0:
+        raise ValueError('The predictor(s) are missing')
+
+    info = MODE_PARAMETERS[mode]
+    errors = []
+    parsed_predictors = {}
+    for predictor, values in predictors.items():
+        if not isinstance(values, list) or len(values) != len(info):
+            errors.append(predictor + ' information should contain ' + ', '.join(info[:-1]) + ' and ' + info[-1])
+            continue
+        for i, value in enumerate(values):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                errors.append(predictor + ' ' + info[i] + ' is ' + str(value) + ' but should be a number')
+            elif not 0 <= round(value, 3) <= 1:
+                errors.append(predictor + ' ' + info[i] + ' is ' + str(value) + ' but should be between 0 - 1')
+        parsed_predictors[predictor] = [round(float(value), 3) for value in values
+                                        if not isinstance(value, bool) and isinstance(value, (int, float))]
+    if errors:
+        raise ValueError('; '.join(errors))
+    return rho, parsed_predictors, mode
+
+
+def compute_partition(rho, predictors, mode, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Get the areas and relative areas of the partition (run in the worker processes)
+    """
+    if mode == 'rej':
+        predictor_areas, predictor_relative_areas = get_partition(rho, predictors, cache_dir, cache_size)
+    else:
+        merged_intervals = get_norej_partition(rho, predictors, cache_dir, cache_size)
+        predictor_relative_areas = {predictor: merged_intervals.get(predictor, 0.0) for predictor in predictors}
+        predictor_areas = dict(predictor_relative_areas)
+    return {'areas': predictor_areas, 'relative_areas': predictor_relative_areas}
+
+
+def warm_worker():
+    """
+    Import the partition modules and run a small partition of each mode in a new worker process
+    """
+    for mode, predictors in WARM_PREDICTORS.items():
+        compute_partition(0.5, predictors, mode)
+
+
+def get_executor(workers):
+    """
+    Get a pool of worker processes, each one warmed when it starts
+    """
+    return ProcessPoolExecutor(max_workers=workers, initializer=warm_worker)
+
+
+def restart_workers(service, executor):
+    """
+    Replace a broken pool of workers with a new one, once whatever the number of requests it broke
+    """
+    if service['executor'] is executor:
+        executor.shutdown(wait=False)
+        service['executor'] = get_executor(service['workers'])
+        service['counters']['worker_restarts'] += 1
+
+
+def get_service(workers, max_pending=None, timeout=30, cache_entries=1024, cache_ttl=3600, cache_dir=None,
+                cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Get the state of the service: the warm worker pool, the result cache and the metrics
+    """
+    return {
+        'executor': get_executor(workers),
+        'workers': workers,
+        'max_pending': max_pending or 2 * workers,
+        'pending': 0,
+        'in_flight': {},
+        'timeout': timeout,
+        'cache': OrderedDict(),
+        'cache_entries': cache_entries,
+        'cache_ttl': cache_ttl,
+        'cache_dir': cache_dir,
+        'cache_size': cache_size,
+        'latencies': {},
+        'counters': {'requests': 0, 'cache_hits': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0,
+                     'worker_restarts': 0}
+    }
+
+
+def get_cached_result(service, key, now):
+    """
+    Get the cached result of a key if it hasn't expired, marking it as the most recently used
+    """
+    cache = service['cache']
+    if key not in cache:
+        return None
+    expiry, result = cache[key]
+    if expiry < now:
+        del cache[key]
+        return None
+    cache.move_to_end(key)
+    return result
+
+
+def set_cached_result(service, key, result, now):
+    """
+    Cache a result, evicting the least recently used results
+    """
+    cache = service['cache']
+    cache[key] = (now + service['cache_ttl'], result)
+    cache.move_to_end(key)
+    while len(cache) > service['cache_entries']:
+        cache.popitem(last=False)
+
+
+def observe_latency(service, mode, seconds):
+    """
+    Add the latency of a request to the histogram of its mode
+    """
+    histogram = service['latencies'].setdefault(mode, {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0,
+                                                       'count': 0})
+    for i, bucket in enumerate(LATENCY_BUCKETS):
+        if seconds <= bucket:
+            histogram['buckets'][i] += 1
+    histogram['sum'] += seconds
+    histogram['count'] += 1
+
+
+def get_metrics(service):
+    """
+    Get the latency histograms and counters in the Prometheus text format
+    """
+    lines = ['# TYPE csp_request_seconds histogram']
+    for mode, histogram in sorted(service['latencies'].items()):
+        for bucket, bucket_count in zip(LATENCY_BUCKETS, histogram['buckets']):
+            lines.append('csp_request_seconds_bucket{{mode="{}",le="{:g}"}} {}'.format(mode, bucket, bucket_count))
+        lines.append('csp_request_seconds_bucket{{mode="{}",le="+Inf"}} {}'.format(mode, histogram['count']))
+        lines.append('csp_request_seconds_sum{{mode="{}"}} {}'.format(mode, histogram['sum']))
+        lines.append('csp_request_seconds_count{{mode="{}"}} {}'.format(mode, histogram['count']))
+    for name, value in service['counters'].items():
+        lines.append('# TYPE csp_{}_total counter'.format(name))
+        lines.append('csp_{}_total {}'.format(name, value))
+    lines.append('csp_pending_requests {}'.format(service['pending']))
+    return '\n'.join(lines) + '\n'
+
+
+def release_slot(service, key, executor=None, computation=None):
+    """
+    Release the slot of a finished computation, restarting the workers if one of them died
+    """
+    service['pending'] -= 1
+    service['in_flight'].pop(key, None)
+    if computation is not None and not computation.cancelled() and \
+            isinstance(computation.exception(), BrokenProcessPool):
+        restart_workers(service, executor)
+
+
+async def get_partition_result(service, rho, predictors, mode):
+    """
+    Get the result of a request from the cache, from an identical computation in flight or from a worker,
+    raising OverflowError if too many computations are pending and TimeoutError if it takes too long
+    If a worker dies, the computations of its pool fail and the pool is restarted
+    """
+    # Results are computed and cached for the predictors in canonical order, whatever their names
+    key = get_cache_key(rho, predictors, mode)
+    canonical_order = get_canonical_order(predictors)
+    result = get_cached_result(service, key, time.monotonic())
+    if result is not None:
+        service['counters']['cache_hits'] += 1
+    else:
+        computation = service['in_flight'].get(key)
+        if computation is None:
+            if service['pending'] >= service['max_pending']:
+                raise OverflowError('Too many pending requests')
+            service['pending'] += 1
+            canonical_predictors = {str(i): predictors[p] for i, p in enumerate(canonical_order)}
+            arguments = (compute_partition, rho, canonical_predictors, mode, service['cache_dir'],
+                         service['cache_size'])
+            executor = service['executor']
+            try:
+                computation = asyncio.get_running_loop().run_in_executor(executor, *arguments)
+            except BrokenProcessPool:
+                # A worker died while the pool was idle, so the request runs on a new pool
+                restart_workers(service, executor)
+                executor = service['executor']
+                computation = asyncio.get_running_loop().run_in_executor(executor, *arguments)
+            service['in_flight'][key] = computation
+            # The slot is released when the worker finishes, even if the request has timed out
+            computation.add_done_callback(lambda done: release_slot(service, key, executor, done))
+        try:
+            result = await asyncio.wait_for(asyncio.shield(computation), service['timeout'])
+        except asyncio.TimeoutError:
+            raise TimeoutError('The partition took longer than {:g} seconds'.format(service['timeout']))
+        set_cached_result(service, key, result, time.monotonic())
+
+    predictor_areas = {p: result['areas'][str(i)] for i, p in enumerate(canonical_order)}
+    predictor_relative_areas = {p: result['relative_areas'][str(i)] for i, p in enumerate(canonical_order)}
+    return {
+        'mode': mode,
+        'rho': rho,
+        'areas': {p: predictor_areas[p] for p in predictors},
+        'relative_areas': {p: predictor_relative_areas[p] for p in predictors},
+        'best_combination': get_best_combination(predictor_relative_areas)
+    }
+
+
+async def handle_request(service, method, path, body):
+    """
+    Get the status and the response of an HTTP request
+    """
+    if path == '/health':
+        return 200, 'ok\n'
+    if path == '/metrics':
+        return 200, get_metrics(service)
+    if path != '/partition':
+        return 404, {'error': 'Not found'}
+    if method != 'POST':
+        return 405, {'error': 'Use POST'}
+
+    service['counters']['requests'] += 1
+    start = time.monotonic()
+    try:
+        rho, predictors, mode = parse_request(json.loads(body or b'null'))
+    except ValueError as e:
+        service['counters']['errors'] += 1
+        return 400, {'error': str(e)}
+    try:
+        result = await get_partition_result(service, rho, predictors, mode)
+    except OverflowError as e:
+        service['counters']['rejected'] += 1
+        return 503, {'error': str(e)}
+    except TimeoutError as e:
+        service['counters']['timeouts'] += 1
+        return 504, {'error': str(e)}
+    except Exception as e:
+        service['counters']['errors'] += 1
+        return 500, {'error': type(e).__name__ + ': ' + str(e)}
+    observe_latency(service, mode, time.monotonic() - start)
+    return 200, result
+
+
+async def handle_connection(service, reader, writer):
+    """
+    Read an HTTP request of a connection and write its response
+    """
+    try:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if len(request_line) < 2:
+            return
+        method, path = request_line[0], request_line[1].split('?')[0]
+        content_length = int(headers.get('content-length', 0))
+        if content_length > MAX_BODY_SIZE:
+            status, response = 413, {'error': 'The request is larger than {} bytes'.format(MAX_BODY_SIZE)}
+        else:
+            body = await reader.readexactly(content_length) if content_length else b''
+            status, response = await handle_request(service, method, path, body)
+        if isinstance(response, str):
+            content, content_type = response.encode(), 'text/plain; version=0.0.4'
+        else:
+            content, content_type = json.dumps(response).encode(), 'application/json'
+        writer.write('HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'.format(
+            status, STATUS_REASONS[status], content_type, len(content)).encode() + content)
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(service, host='127.0.0.1', port=8765, unix=None):
+    """
+    Start listening on a Unix socket or on a host and port
+    """
+    async def handle(reader, writer):
+        await handle_connection(service, reader, writer)
+
+    if unix:
+        return await asyncio.start_unix_server(handle, path=unix)
+    return await asyncio.start_server(handle, host=host, port=port)
+
+
+async def serve(args):
+    service = get_service(args.workers, args.max_pending, args.timeout, args.cache_entries, args.cache_ttl,
+                          args.cache_dir, args.cache_size)
+    # Start the workers before accepting requests
+    await asyncio.gather(*[asyncio.get_running_loop().run_in_executor(service['executor'], time.sleep, 0)
+                           for _ in range(args.workers)])
+    server = await start_server(service, args.host, args.port, args.unix)
+    print('Listening on ' + (args.unix or '{}:{}'.format(args.host, args.port)), file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service['executor'].shutdown(cancel_futures=True)
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,252 @@
+"""
+Weight the cost space partition by a density over the clinical space: polynomial, piecewise-constant or an empirical
+sample of scenarios
+
+Polynomial densities are integrated exactly over the fan triangles of every polygon at once with a collapsed
+(Duffy) Gauss-Legendre rule, piecewise-constant densities with the areas of the polygons clipped by the cells, and
+empirical densities with the best predictor of each scenario. The density is normalized so the triangle weighs its
+area (0.5) and [0, 1] its length, so the relative values are the probability of each best predictor.
+"""
+
+import os
+import sys
+import numpy as np
+import shapely
+from shapely import GeometryType
+from csp_rej import read_config, get_partition_arrays
+from csp_norej import get_merged_intervals
+from obtain_polygon_data import get_predictors_cost_matrix
+from obtain_predictor_intervals import get_batch_predictor_lines
+from result_cache import DEFAULT_CACHE_SIZE
+
+TRIANGLE_AREA = 0.5
+DENSITY_TYPES = ['polynomial', 'piecewise', 'empirical']
+CHECK_POINTS = 401
+
+
+def parse_monomial(monomial, mode):
+    """
+    Parse the powers of x and y of a monomial such as 1, x, y^2 or x^2*y
+    """
+    powers = {'x': 0, 'y': 0}
+    for factor in monomial.replace(' ', '').lower().split('*'):
+        if factor == '1':
+            continue
+        variable, _, power = factor.partition('^')
+        if variable not in powers or (mode == 'norej' and variable == 'y') or not (power or '1').isdigit():
+            sys.exit('The density term ' + monomial + ' should be a product of powers of x' +
+                     (' and y' if mode == 'rej' else '') + ' such as ' + ('x^2*y' if mode == 'rej' else 'x^2'))
+        powers[variable] += int(power or '1')
+    return powers['x'], powers['y']
+
+
+def get_polynomial_minimum(terms, mode, points=CHECK_POINTS):
+    """
+    Get the minimum of a polynomial density over a grid of the cost space (with its vertices)
+    """
+    grid = np.linspace(0, 1, points)
+    if mode == 'rej':
+        x, y = [values.ravel() for values in np.meshgrid(grid, grid, indexing='ij')]
+        inside = x + y <= 1
+        x, y = x[inside], y[inside]
+    else:
+        x, y = grid, np.zeros_like(grid)
+    return sum(coefficient * x ** i * y ** j for i, j, coefficient in terms).min()
+
+
+def parse_values(density, name):
+    """
+    Parse a list of numbers of the density section
+    """
+    try:
+        return np.array([float(value) for value in density[name].replace(' ', '').split(',')])
+    except KeyError:
+        sys.exit('The ' + name + ' of the density are missing')
+    except ValueError:
+        sys.exit('The ' + name + ' of the density should be numbers separated by commas')
+
+
+def parse_density_config(filename, mode):
+    """
+    Parse the polynomial terms, the piecewise-constant cells or the empirical samples of the [density] section
+    of a config file
+    """
+    config = read_config(filename)
+    try:
+        density = dict(config.items('density'))
+    except Exception as e:
+        sys.exit(e)
+    density_type = density.pop('type', '').strip().lower()
+    if density_type not in DENSITY_TYPES:
+        sys.exit('The density type should be ' + ', '.join(DENSITY_TYPES[:-1]) + ' or ' + DENSITY_TYPES[-1])
+
+    if density_type == 'polynomial':
+        terms = []
+        for monomial, coefficient in density.items():
+            try:
+                terms.append((*parse_monomial(monomial, mode), float(coefficient)))
+            except ValueError:
+                sys.exit('The coefficient of ' + monomial + ' is ' + coefficient + ' but should be a number')
+        if not terms:
+            sys.exit('The terms of the polynomial density are missing')
+        if get_polynomial_minimum(terms, mode) < 0:
+            sys.exit('The polynomial density should be non-negative over the cost space')
+        return {'type': density_type, 'terms': terms}
+
+    if density_type == 'piecewise':
+        breaks = [parse_values(density, 'x_breaks')] + ([parse_values(density, 'y_breaks')] if mode == 'rej' else [])
+        values = parse_values(density, 'values')
+        for variable, variable_breaks in zip('xy', breaks):
+            if len(variable_breaks) < 2 or np.any(np.diff(variable_breaks) <= 0):
+                sys.exit('The ' + variable + '_breaks of the density should be at least 2 increasing numbers')
+        shape = tuple(len(variable_breaks) - 1 for variable_breaks in breaks)
+        if len(values) != np.prod(shape) or np.any(values < 0):
+            sys.exit('The values of the density should be ' + str(np.prod(shape)) +
+                     ' non-negative numbers, one for each cell')
+        return {'type': density_type, 'breaks': breaks, 'values': values.reshape(shape)}
+
+    path = density.get('samples')
+    if path is None:
+        sys.exit('The samples of the density are missing')
+    path = os.path.join(os.path.dirname(os.path.abspath(filename)), path)
+    try:
+        samples = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+    except (OSError, ValueError) as e:
+        sys.exit(e)
+    n_columns = 2 if mode == 'rej' else 1
+    if samples.shape[1] != n_columns or len(samples) == 0:
+        sys.exit('The samples of the density should have the ' + ('x and y columns' if mode == 'rej' else
+                                                                     'x column') + ' and at least one row')
+    outside = (samples < 0).any(axis=1) | (samples.sum(axis=1) > 1)
+    if outside.any():
+        sys.exit('The samples of the density should be inside the cost space but row ' +
+                 str(np.flatnonzero(outside)[0] + 2) + ' is not')
+    return {'type': density_type, 'samples': samples}
+
+
+def get_duffy_rule(degree):
+    """
+    Get the (u, v) nodes and weights of the collapsed Gauss-Legendre rule that integrates exactly the polynomials
+    of degree over the triangle (0, 0), (1, 0), (0, 1), with x = u and y = v * (1 - u)
+    """
+    nodes, weights = np.polynomial.legendre.leggauss(degree // 2 + 2)
+    nodes, weights = (nodes + 1) / 2, weights / 2
+    u, v = [grid.ravel() for grid in np.meshgrid(nodes, nodes, indexing='ij')]
+    return u, v, np.outer(weights, weights).ravel() * (1 - u)
+
+
+def evaluate_polynomial(x, y, terms):
+    """
+    Evaluate the polynomial of (x power, y power, coefficient) terms on the points x and y
+    """
+    return sum(coefficient * x ** i * y ** j for i, j, coefficient in terms)
+
+
+def integrate_triangles(triangles, terms):
+    """
+    Get the exact integral of the polynomial over each triangle (triangles x vertices x 2 array)
+    """
+    u, v, weights = get_duffy_rule(max(i + j for i, j, _ in terms))
+    a, b, c = triangles[:, 0, None, :], triangles[:, 1, None, :], triangles[:, 2, None, :]
+    points = a + u[:, None] * (b - a) + (v * (1 - u))[:, None] * (c - a)
+    jacobians = np.abs((b - a)[..., 0] * (c - a)[..., 1] - (c - a)[..., 0] * (b - a)[..., 1])
+    return (evaluate_polynomial(points[..., 0], points[..., 1], terms) * weights).sum(axis=1) * jacobians[:, 0]
+
+
+def get_fan_triangles(coords, offsets):
+    """
+    Get the fan triangles of the closed polygons of the flat coordinates and the polygon of each triangle
+    """
+    coords = np.asarray(coords)
+    offsets = np.asarray(offsets)
+    polygon_ids = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    index = np.arange(len(coords))
+    # A polygon of k points (the first one repeated at the end) has the triangles (0, i, i + 1) for i in 1..k-3
+    fan = (index > offsets[polygon_ids]) & (index < offsets[polygon_ids + 1] - 2)
+    triangles = np.stack([coords[offsets[polygon_ids[fan]]], coords[index[fan]], coords[index[fan] + 1]], axis=1)
+    return triangles, polygon_ids[fan]
+
+
+def get_cell_boxes(breaks):
+    """
+    Get the boxes of the cells of the piecewise-constant density, flattened as its values
+    """
+    x_breaks, y_breaks = breaks
+    x0, y0 = [grid.ravel() for grid in np.meshgrid(x_breaks[:-1], y_breaks[:-1], indexing='ij')]
+    x1, y1 = [grid.ravel() for grid in np.meshgrid(x_breaks[1:], y_breaks[1:], indexing='ij')]
+    return shapely.box(x0, y0, x1, y1)
+
+
+def get_polygon_weights(coords, offsets, density):
+    """
+    Get the integral of the density (not normalized) over each of the polygons of the flat coordinates
+    """
+    n_polygons = len(offsets) - 1
+    if density['type'] == 'polynomial':
+        triangles, polygon_ids = get_fan_triangles(coords, offsets)
+        return np.bincount(polygon_ids, integrate_triangles(triangles, density['terms']), n_polygons)
+    polygons = shapely.from_ragged_array(GeometryType.POLYGON, np.asarray(coords, dtype=float),
+                                         (np.asarray(offsets), np.arange(n_polygons + 1)))
+    cell_areas = shapely.area(shapely.intersection(polygons[:, None], get_cell_boxes(density['breaks'])[None, :]))
+    return cell_areas @ density['values'].ravel()
+
+
+def get_triangle_weight(density):
+    """
+    Get the integral of the density (not normalized) over the cost space triangle
+    """
+    triangle = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0], [0.0, 0.0]])
+    return get_polygon_weights(triangle, np.array([0, 4]), density)[0]
+
+
+def get_density_areas(rho, predictors, density, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Get the weighted area of each best predictor of the partition with coverage
+    """
+    if density['type'] == 'empirical':
+        samples = density['samples']
+        best_predictors = get_predictors_cost_matrix(samples[:, 0], samples[:, 1], rho, predictors).argmin(axis=1)
+        weights = np.bincount(best_predictors, minlength=len(predictors)) * TRIANGLE_AREA / len(samples)
+        return dict(zip(predictors, weights.tolist()))
+
+    arrays = get_partition_arrays(rho, predictors, cache_dir, cache_size)
+    total_weight = get_triangle_weight(density)
+    if total_weight <= 0:
+        sys.exit('The density should have a positive integral over the cost space')
+    polygon_weights = get_polygon_weights(arrays['polygon_coords'], arrays['polygon_offsets'], density)
+    weights = np.bincount(arrays['polygon_predictors'], polygon_weights, len(arrays['predictors']))
+    return dict(zip(arrays['predictors'].tolist(), (weights * TRIANGLE_AREA / total_weight).tolist()))
+
+
+def get_interval_weights(starts, ends, density):
+    """
+    Get the integral of the density (not normalized) over each interval of [0, 1]
+    """
+    if density['type'] == 'polynomial':
+        return sum(coefficient * (ends ** (i + 1) - starts ** (i + 1)) / (i + 1) for i, _, coefficient in
+                   density['terms'])
+    x_breaks = density['breaks'][0]
+    overlaps = np.clip(np.minimum(ends[:, None], x_breaks[None, 1:]) - np.maximum(starts[:, None], x_breaks[None, :-1]),
+                       0, None)
+    return overlaps @ density['values']
+
+
+def get_density_intervals(rho, predictors, density):
+    """
+    Get the weighted length of the intervals of each best predictor of the partition without coverage
+    """
+    if density['type'] == 'empirical':
+        slopes, intercepts = get_batch_predictor_lines(np.array(list(predictors.values()))[None], rho)
+        best_predictors = (density['samples'] * slopes + intercepts).argmin(axis=1)
+        weights = np.bincount(best_predictors, minlength=len(predictors)) / len(density['samples'])
+        return {predictor: weight for predictor, weight in zip(predictors, weights.tolist()) if weight > 0}
+
+    _, interval_best_predictors, _ = get_merged_intervals(rho, predictors)
+    starts, ends = np.array(list(interval_best_predictors), dtype=float).T
+    total_weight = get_interval_weights(np.zeros(1), np.ones(1), density)[0]
+    if total_weight <= 0:
+        sys.exit('The density should have a positive integral over the cost space')
+    merged_intervals = {}
+    for predictor, weight in zip(interval_best_predictors.values(), get_interval_weights(starts, ends, density)):
+        merged_intervals[predictor] = merged_intervals.get(predictor, 0.0) + weight.item() / total_weight
+    return merged_intervals
@@ -0,0 +1,87 @@
+"""
+Expected cost of each predictor and of the best combination over the clinical space, and the regret of each predictor
+
+The costs are linear, so the integral of a cost over a polygon (or interval) is its area (or length) times the cost
+on its centroid (or middle point). The integrals of every predictor over every polygon of a partition come at once
+from the (polygons x predictors) matrix of the costs on the centroids, and the best combination uses the lowest cost
+of each polygon. The expected costs are the integrals over the area of the cost space (0.5, or 1 without coverage).
+"""
+
+import numpy as np
+from csp_rej import print_float
+from obtain_polygon_data import get_predictors_cost_matrix
+from obtain_predictor_intervals import get_batch_predictor_lines
+from partition_format import get_polygon_areas
+
+TRIANGLE_AREA = 0.5
+
+
+def get_polygon_centroids(arrays):
+    """
+    Get the centroid and area of each polygon with the shoelace formula over the flat coordinates
+    """
+    coords = np.asarray(arrays['polygon_coords'], dtype=float)
+    offsets = np.asarray(arrays['polygon_offsets'])
+    areas = get_polygon_areas(arrays)
+    x, y = coords[:, 0], coords[:, 1]
+    cross = np.zeros(len(coords))
+    cross[:-1] = x[:-1] * y[1:] - x[1:] * y[:-1]
+    cross[offsets[1:] - 1] = 0
+    sums = np.stack([np.add.reduceat((x + np.roll(x, -1)) * cross, offsets[:-1]),
+                     np.add.reduceat((y + np.roll(y, -1)) * cross, offsets[:-1]),
+                     np.add.reduceat(cross, offsets[:-1])], axis=1)
+    # Polygons without area don't add to the integrals, so any of their points is their centroid
+    signed_areas = np.where(areas > 0, sums[:, 2], 1.0)
+    centroids = np.where((areas > 0)[:, None], sums[:, :2] / (3 * signed_areas[:, None]),
+                         coords[offsets[:-1]])
+    return centroids, areas
+
+
+def get_expected_costs(costs, sizes, total):
+    """
+    Get the expected cost of each predictor and of the best combination from the (polygons x predictors) costs
+    on the centroids and the area of each polygon (or the costs on the middle points and the length of each interval)
+    """
+    return sizes @ costs / total, sizes @ costs.min(axis=1) / total
+
+
+def get_partition_costs(rho, predictors, arrays):
+    """
+    Get the expected cost of each predictor ({predictor: expected cost}) and of the best combination
+    from the arrays of the partition with coverage
+    """
+    centroids, areas = get_polygon_centroids(arrays)
+    costs = get_predictors_cost_matrix(centroids[:, 0], centroids[:, 1], rho, predictors)
+    predictor_costs, best_cost = get_expected_costs(costs, areas, TRIANGLE_AREA)
+    return dict(zip(predictors, predictor_costs.tolist())), best_cost.item()
+
+
+def get_interval_costs(rho, predictors, x_points):
+    """
+    Get the expected cost of each predictor ({predictor: expected cost}) and of the best combination
+    from the intersection points of the partition without coverage
+    """
+    points = np.unique(np.concatenate([[0.0, 1.0], np.asarray(x_points, dtype=float)]))
+    slopes, intercepts = get_batch_predictor_lines(np.array(list(predictors.values()), dtype=float)[None], rho)
+    costs = ((points[:-1] + points[1:]) / 2)[:, None] * slopes + intercepts
+    predictor_costs, best_cost = get_expected_costs(costs, np.diff(points), 1.0)
+    return dict(zip(predictors, predictor_costs.tolist())), best_cost.item()
+
+
+def get_regrets(predictor_costs, best_cost):
+    """
+    Get the regret of each predictor: its expected cost minus the expected cost of the best combination
+    """
+    return {predictor: cost - best_cost for predictor, cost in predictor_costs.items()}
+
+
+def print_expected_costs(predictors, predictor_costs, best_cost):
+    regrets = get_regrets(predictor_costs, best_cost)
+    spaces_predictors = len(max(list(predictors) + ['Predictor'], key=lambda p: len(p)))
+    print('\nExpected cost of the best combination: {}\n'.format(print_float(best_cost)))
+    print('Expected cost of each predictor:\n')
+    print('{: <{spaces}}\tExpected cost\tRegret'.format('Predictor', spaces=spaces_predictors))
+    print('{: <{spaces}}\t-------------\t------'.format('---------', spaces=spaces_predictors))
+    for predictor in sorted(predictors, key=lambda p: (regrets[p], p)):
+        print('{: <{spaces}}\t{}\t\t{}'.format(predictor, print_float(predictor_costs[predictor]),
+                                               print_float(regrets[predictor]), spaces=spaces_predictors))
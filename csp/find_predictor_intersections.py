@@ -5,7 +5,10 @@ Get the lines and nodes from the predictor's intersection
 from collections import defaultdict
 from itertools import combinations
 import math
+import numpy as np
 import sympy
+from stage_stats import stage, count
+from partition_budget import check_budget
 
 TRIANGLE_LINES = {'x_axis', 'hypotenuse', 'y_axis'}
 
@@ -35,6 +38,48 @@ def get_linear_equation_parameters(rho, sens_1, spec_1, cov_1, sens_2, spec_2, c
         return None, None
 
 
+def get_plane_terms(rho, predictors):
+    """
+    Get the x term, y term and constant of the plane of each predictor (the terms of equation A3.3)
+    """
+    sens, spec, cov = np.array(list(predictors.values()), dtype=float).reshape(-1, 3).T
+    return cov * rho * (1 - sens) + cov - 1, cov * (1 - rho) * (1 - spec) + cov - 1, 1 - cov
+
+
+def round_values(values, precision):
+    """
+    Round the values as round() does: the values close to halfway between two roundings, which np.round can round
+    the other way once scaled, are rounded one by one (close within a few ulps of the scaled value, as the ulps of
+    large values are wider than the fixed tolerance)
+    """
+    rounded = np.round(values, precision)
+    scaled = values * 10.0 ** precision
+    halfway = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6 + 4 * np.spacing(np.abs(scaled))
+    rounded[halfway] = [round(value, precision) for value in values[halfway].tolist()]
+    return rounded
+
+
+def get_candidate_lines(rho, predictors, precision):
+    """
+    Get the distinct rounded (slope, intercept) lines of the intersection of each pair of predictor's planes,
+    in the order of the pairs, without the parallel planes and the lines equal to the x axis and the hypotenuse
+    """
+    x_terms, y_terms, constants = get_plane_terms(rho, predictors)
+    first, second = np.triu_indices(len(x_terms), k=1)
+    denominators = y_terms[first] - y_terms[second]
+    parallel = denominators == 0
+    first, second, denominators = first[~parallel], second[~parallel], denominators[~parallel]
+    lines = np.stack([(x_terms[second] - x_terms[first]) / denominators,
+                      (constants[second] - constants[first]) / denominators], axis=1)
+    # Adding 0 turns -0.0 into 0.0, so both are the same line
+    lines = round_values(lines, precision) + 0.0
+    lines = lines[~(np.all(lines == [0.0, 0.0], axis=1) | np.all(lines == [-1.0, 1.0], axis=1))]
+    # Each line is a complex number to find the first of the equal lines with a 1-dimensional sort
+    _, first_ids = np.unique(np.ascontiguousarray(lines).view(complex).ravel(), return_index=True)
+    lines = lines[np.sort(first_ids)]
+    return list(zip(lines[:, 0].tolist(), lines[:, 1].tolist()))
+
+
 def initialize_nodes():
     """
     Get the initial nodes and lines that form the triangle cost space
@@ -146,19 +191,13 @@ def get_nodes(rho, predictors, precision):
     """
     Get nodes
     """
-    potential_lines = []
-    for group in combinations(predictors, 2):
-        slope, intercept = get_linear_equation_parameters(rho, *predictors[group[0]], *predictors[group[1]])
-        if slope is not None and intercept is not None:
-            line = (round(slope, precision), round(intercept, precision))
-            if line in [(0.0, 0.0), (-1.0, 1.0)]:  # Discard lines equal to x_axis and hypotenuse
-                continue
-            elif line not in potential_lines:
-                potential_lines.append(line)
+    potential_lines = get_candidate_lines(rho, predictors, precision)
+    count('candidate_lines', len(potential_lines))
     nodes = initialize_nodes()
     for line in potential_lines:
         if line in TRIANGLE_LINES:
             continue
+        check_budget('nodes', len(nodes))
         nodes = get_intersections(line, potential_lines, nodes, precision)
     return nodes
 
@@ -167,6 +206,7 @@ def unmerge_nodes(nodes):
     """
     Unmerge nodes with more than 2 lines with higher precision
     """
+    nodes = {node: set(lines) for node, lines in nodes.items()}
     lines2node = {tuple(sorted(map(str, lines))): node for node, lines in nodes.items()}
     for node, lines in dict(nodes).items():
         if len(lines) > 2:
@@ -211,6 +251,7 @@ def merge_nodes_geometrically_recursion(nodes, merge, tag):
     """
     Merge nodes recursively according to geometrical restrictions
     """
+    check_budget()
     triangle_lines = ('x_axis' or 'hypotenuse' or 'y_axis')
     for n1, n2 in combinations(sorted(nodes), 2):
         if len(nodes[n1] & nodes[n2]) >= 2:
@@ -232,6 +273,7 @@ def merge_nodes_geometrically(nodes, tag):
     """
     Merge nodes according to geometrical restrictions
     """
+    nodes = {node: set(lines) for node, lines in nodes.items()}
     geometry_nodes, merge, tag = merge_nodes_geometrically_recursion(nodes, {}, tag)
     geometry_nodes = {k: l for k, l in geometry_nodes.items() if len(l) != 0}
     return geometry_nodes, merge, tag
@@ -382,9 +424,18 @@ def get_predictors_intersection(rho, predictors, precision):
     """
     Get lines and nodes of predictors's planes intersection
     """
-    nodes = get_nodes(rho, predictors, precision)
-    nodes = unmerge_nodes(nodes)
-    nodes = merge_nodes(nodes)
-    lines = get_lines(nodes)
-    sorted_lines = sort_line_nodes(lines)
+    with stage('get_nodes', precision=precision):
+        nodes = get_nodes(rho, predictors, precision)
+        count('nodes', len(nodes))
+        check_budget('nodes', len(nodes))
+    with stage('unmerge_nodes', precision=precision):
+        nodes = unmerge_nodes(nodes)
+        count('nodes', len(nodes))
+    with stage('merge_nodes', precision=precision):
+        nodes = merge_nodes(nodes)
+        count('nodes', len(nodes))
+    with stage('sort_line_nodes', precision=precision):
+        lines = get_lines(nodes)
+        sorted_lines = sort_line_nodes(lines)
+        count('lines', len(sorted_lines))
     return nodes, sorted_lines
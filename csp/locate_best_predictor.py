@@ -0,0 +1,121 @@
+"""
+Locate the best predictor of batches of points of the cost space with a slab decomposition of the partition polygons
+"""
+
+import numpy as np
+from csp_rej import get_partition_polygons
+from obtain_polygon_data import get_predictors_cost_matrix
+from obtain_predictor_intervals import get_predictors_intersections, get_interval_best_predictor
+
+BOUNDARY_MARGIN = 1e-12
+
+
+def get_polygons_segments(polygons):
+    """
+    Get the non vertical edges of the polygons as segments with x1 < x2
+    """
+    segments = set()
+    for polygon in polygons:
+        for n1, n2 in zip(polygon[:-1], polygon[1:]):
+            if n1[0] != n2[0]:
+                segments.add(tuple(sorted([n1, n2])))
+    return np.array(sorted(segments), dtype=float).reshape(-1, 2, 2)
+
+
+def get_slab_segments(slab_x, segments):
+    """
+    Get, for each slab between consecutive x values, the segments that cross it sorted from bottom to top
+    """
+    x1, y1, x2, y2 = segments[:, 0, 0], segments[:, 0, 1], segments[:, 1, 0], segments[:, 1, 1]
+    slopes = (y2 - y1) / (x2 - x1)
+    intercepts = y1 - slopes * x1
+    first_slab = np.searchsorted(slab_x, x1)
+    last_slab = np.searchsorted(slab_x, x2)
+    n_slabs = last_slab - first_slab
+    segment_ids = np.repeat(np.arange(len(segments)), n_slabs)
+    slab_ids = np.repeat(first_slab - np.cumsum(n_slabs) + n_slabs, n_slabs) + np.arange(n_slabs.sum())
+    middle_x = (slab_x[slab_ids] + slab_x[slab_ids + 1]) / 2
+    middle_y = slopes[segment_ids] * middle_x + intercepts[segment_ids]
+    order = np.lexsort((middle_y, slab_ids))
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(slab_ids, minlength=len(slab_x) - 1))])
+    return offsets, slopes[segment_ids[order]], intercepts[segment_ids[order]], middle_y[order]
+
+
+def get_slab_labels(rho, predictors, slab_x, offsets, middle_y):
+    """
+    Get the best predictor of the region above each segment of a slab (-1 above the top segment)
+    """
+    slab_ids = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    middle_x = (slab_x[slab_ids] + slab_x[slab_ids + 1]) / 2
+    region_y = (middle_y[:-1] + middle_y[1:]) / 2
+    labels = np.argmin(get_predictors_cost_matrix(middle_x[:-1], region_y, rho, predictors), axis=1)
+    labels = np.append(labels, -1)
+    labels[offsets[1:] - 1] = -1
+    return labels
+
+
+def build_point_index(rho, predictors, polygons):
+    """
+    Build the slab decomposition index of the partition polygons to locate the best predictor of points (x, y)
+    """
+    segments = get_polygons_segments(polygons)
+    slab_x = np.unique(np.array([node[0] for polygon in polygons for node in polygon], dtype=float))
+    offsets, slopes, intercepts, middle_y = get_slab_segments(slab_x, segments)
+    labels = get_slab_labels(rho, predictors, slab_x, offsets, middle_y)
+    return {'predictors': list(predictors), 'slab_x': slab_x, 'offsets': offsets, 'slopes': slopes,
+            'intercepts': intercepts, 'labels': labels}
+
+
+def build_partition_index(rho, predictors):
+    """
+    Compute the partition of the predictors with coverage and build its point index
+    """
+    return build_point_index(rho, predictors, get_partition_polygons(rho, predictors))
+
+
+def locate_points(index, x, y):
+    """
+    Get the index of the best predictor of each point (x, y), or -1 if the point is outside the cost space
+    Each point is located with a binary search of its slab and a binary search of the segments of the slab
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    slab_x, offsets, slopes, intercepts = index['slab_x'], index['offsets'], index['slopes'], index['intercepts']
+    inside = (slab_x[0] <= x) & (x <= slab_x[-1])
+    slab = np.clip(np.searchsorted(slab_x, x, side='right') - 1, 0, len(slab_x) - 2)
+    first, low, high = offsets[slab], offsets[slab], offsets[slab + 1]
+    for _ in range(int(np.diff(offsets).max()).bit_length()):
+        middle = (low + high) // 2
+        searching = low < high
+        segment = np.minimum(middle, len(slopes) - 1)
+        below = slopes[segment] * x + intercepts[segment] <= y + BOUNDARY_MARGIN
+        low = np.where(searching & below, middle + 1, low)
+        high = np.where(searching & ~below, middle, high)
+    segment = low - 1
+    labels = np.where((segment >= first) & inside, index['labels'][np.maximum(segment, 0)], -1)
+    # Points on the top segment of the slab (hypotenuse) belong to the region below it
+    on_top = inside & (segment == offsets[slab + 1] - 1) & (segment > first)
+    top_y = slopes[np.maximum(segment, 0)] * x + intercepts[np.maximum(segment, 0)]
+    on_top &= np.abs(y - top_y) <= BOUNDARY_MARGIN
+    labels = np.where(on_top, index['labels'][np.maximum(segment - 1, 0)], labels)
+    return labels.reshape(x.shape)
+
+
+def build_interval_index(rho, predictors):
+    """
+    Build the index of the intervals of the partition without coverage to locate the best predictor of x values
+    """
+    x_points = get_predictors_intersections(rho, predictors)
+    interval_best_predictors = get_interval_best_predictor(rho, predictors, x_points)
+    names = list(predictors)
+    labels = np.array([names.index(predictor) for _, predictor in sorted(interval_best_predictors.items())])
+    return {'predictors': names, 'x_points': np.array(x_points, dtype=float), 'labels': labels}
+
+
+def locate_intervals(index, x):
+    """
+    Get the index of the best predictor of each x value, or -1 if the value is outside [0, 1]
+    """
+    x = np.asarray(x, dtype=float)
+    interval = np.searchsorted(index['x_points'], x, side='right')
+    return np.where((0 <= x) & (x <= 1), index['labels'][interval], -1)
@@ -2,6 +2,8 @@
 Calculate the middle points, areas and best predictors of the polygons and the relative areas of the best predictors
 """
 
+import json
+import numpy as np
 from shapely.geometry.polygon import Polygon
 
 
@@ -12,6 +14,24 @@ def get_predictor_cost(x, y, rho, sens, spec, cov):
     return x * ((rho * cov * (1 - sens)) + cov - 1) + y * (((1 - rho) * cov * (1 - spec)) + cov - 1) + 1 - cov
 
 
+def get_predictors_cost_matrix(x, y, rho, predictors):
+    """
+    Calculate the (points x predictors) cost matrix of the predictors on the arrays of points x and y
+    """
+    sens, spec, cov = np.array(list(predictors.values()), dtype=float).reshape(-1, 3).T
+    x = np.asarray(x, dtype=float)[..., None]
+    y = np.asarray(y, dtype=float)[..., None]
+    return get_predictor_cost(x, y, rho, sens, spec, cov)
+
+
+def get_point_best_predictor(x, y, rho, predictors):
+    """
+    Calculate the predictor with the best cost on a point (ties keep the config order)
+    """
+    cost_predictors = {predictor: get_predictor_cost(x, y, rho, *predictors[predictor]) for predictor in predictors}
+    return min(cost_predictors, key=cost_predictors.get)
+
+
 def get_polygon_best_predictor(rho, predictors, polygons):
     """
     Calculate the predictor with the best cost in a polygon
@@ -19,10 +39,7 @@ def get_polygon_best_predictor(rho, predictors, polygons):
     polygon_best_predictor = []
     for polygon_id, polygon in enumerate(polygons):
         centroid = Polygon(polygon).centroid
-        cost_predictors = {predictor: get_predictor_cost(centroid.x, centroid.y, rho, *predictors[predictor])
-                           for predictor in predictors}
-        best_predictor = min(cost_predictors, key=cost_predictors.get)
-        polygon_best_predictor.append(best_predictor)
+        polygon_best_predictor.append(get_point_best_predictor(centroid.x, centroid.y, rho, predictors))
     return polygon_best_predictor
 
 
@@ -36,6 +53,23 @@ def get_best_predictor_area(polygons, polygon_best_predictor):
     return best_predictor_areas
 
 
+def accumulate_best_predictor_area(rho, predictors, polygons, spill=None):
+    """
+    Calculate the total area of the best predictors adding each polygon as it comes from the polygons iterable,
+    writing the polygon, its best predictor and area as a JSON line to the spill file if given
+    """
+    best_predictor_areas = {}
+    for polygon in polygons:
+        shape = Polygon(polygon)
+        centroid = shape.centroid
+        best_predictor = get_point_best_predictor(centroid.x, centroid.y, rho, predictors)
+        area = shape.area
+        best_predictor_areas[best_predictor] = best_predictor_areas.get(best_predictor, 0.0) + area
+        if spill is not None:
+            spill.write(json.dumps({'polygon': polygon, 'best_predictor': best_predictor, 'area': area}) + '\n')
+    return best_predictor_areas
+
+
 def get_predictor_area(best_predictor_areas, predictors):
     """
     Calculate the area and relative areas of predictors
@@ -6,6 +6,8 @@ import numpy as np
 from collections import defaultdict
 from itertools import combinations
 
+BATCH_CHUNK_COSTS = 2 ** 22
+
 
 def get_intersection_point(x_1, y_1, x_2, y_2):
     """
@@ -92,3 +94,52 @@ def merge_intervals(interval_best_predictors):
     merged_intervals = {best_predictor: max(interval_points) - min(interval_points)
                         for best_predictor, interval_points in predictor2intervals.items()}
     return merged_intervals
+
+
+def get_batch_predictor_lines(parameters, rho):
+    """
+    Get the slope and intercept of the cost line of each predictor of each replicate
+    """
+    parameters = np.asarray(parameters, dtype=float)
+    rho = np.broadcast_to(np.asarray(rho, dtype=float), parameters.shape[:1])[:, None]
+    sens, spec = parameters[..., 0], parameters[..., 1]
+    slopes = (1 - spec) + rho * (sens + spec - 2)
+    intercepts = rho * (1 - sens)
+    return slopes, intercepts
+
+
+def get_batch_intersections(slopes, intercepts):
+    """
+    Get the sorted points of each replicate where the best predictor can change: 0, 1 and the intersections
+    of each pair of predictors inside (0, 1], the rest of pairs are moved to 1 as empty intervals
+    """
+    first, second = np.triu_indices(slopes.shape[1], k=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_points = (intercepts[:, second] - intercepts[:, first]) / (slopes[:, first] - slopes[:, second])
+    x_points[~((0 < x_points) & (x_points <= 1))] = 1.0
+    limits = np.broadcast_to([0.0, 1.0], (slopes.shape[0], 2))
+    return np.sort(np.concatenate([limits, x_points], axis=1), axis=1)
+
+
+def get_batch_interval_lengths(parameters, rho, chunk_size=None):
+    """
+    Get the length of the interval of [0, 1] in which each predictor is the best one for a batch of replicates
+    parameters: (replicates x predictors x 2) array with the sensitivity and specificity of the predictors
+    rho: a value or a vector with the rho of each replicate
+    Replicates are computed in chunks of chunk_size to bound the memory of the (chunk x intervals x predictors) costs
+    """
+    slopes, intercepts = get_batch_predictor_lines(parameters, rho)
+    replicates, n_predictors = slopes.shape
+    if chunk_size is None:
+        n_intervals = n_predictors * (n_predictors - 1) // 2 + 1
+        chunk_size = max(1, BATCH_CHUNK_COSTS // (n_intervals * n_predictors))
+    interval_lengths = np.zeros((replicates, n_predictors))
+    for start in range(0, replicates, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        x_points = get_batch_intersections(slopes[chunk], intercepts[chunk])
+        middle_points = (x_points[:, :-1] + x_points[:, 1:]) / 2
+        costs = middle_points[..., None] * slopes[chunk, None, :] + intercepts[chunk, None, :]
+        best_predictors = np.argmin(costs, axis=2)
+        rows = np.broadcast_to(np.arange(best_predictors.shape[0])[:, None], best_predictors.shape)
+        np.add.at(interval_lengths[chunk], (rows, best_predictors), np.diff(x_points, axis=1))
+    return interval_lengths
@@ -0,0 +1,192 @@
+"""
+Write the results of the cost space partition as they are computed: text table, JSON, JSON lines, CSV or Parquet
+
+The structured formats keep the full precision of the values unless they are rounded to a number of decimals.
+"""
+
+import sys
+import csv
+import json
+from contextlib import contextmanager, redirect_stdout
+from csp_rej import print_output, get_best_combination
+from csp_norej import print_output as print_norej_output
+from expected_costs import get_regrets, print_expected_costs
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+OUTPUT_FORMATS = ['text', 'json', 'jsonl', 'csv', 'parquet']
+PARAMETER_COLUMNS = {'rej': ['sensitivity', 'specificity', 'coverage'], 'norej': ['sensitivity', 'specificity']}
+
+
+def get_columns(mode, group_by=None, error_bounds=False, costs=False):
+    """
+    Get the columns of the rows of the CSV and Parquet formats
+    """
+    columns = ([group_by] if group_by else []) + ['rho', 'predictor'] + PARAMETER_COLUMNS[mode]
+    columns += (['absolute_value'] if mode == 'rej' else []) + ['relative_value', 'best_rank']
+    columns += ['error_bound'] if error_bounds else []
+    return columns + (['expected_cost', 'regret', 'best_cost'] if costs else [])
+
+
+def round_value(value, decimals):
+    """
+    Round a value to a number of decimals if given
+    """
+    return value if decimals is None or value is None else round(value, decimals)
+
+
+def get_run_record(mode, group, rho, predictors, predictor_areas, predictor_relative_areas,
+                   relative_error_bounds=None, decimals=None, expected_costs=None):
+    """
+    Get the record of a run with the values of each predictor sorted from the largest to the smallest area
+    """
+    best_combination = get_best_combination(predictor_relative_areas)
+    if expected_costs is not None:
+        predictor_costs, best_cost = expected_costs
+        regrets = get_regrets(predictor_costs, best_cost)
+    sorted_predictors = sorted(predictors, key=lambda p: (-predictor_relative_areas.get(p, 0), p))
+    records = []
+    for predictor in sorted_predictors:
+        record = {'predictor': predictor}
+        record.update(zip(PARAMETER_COLUMNS[mode], predictors[predictor]))
+        if mode == 'rej':
+            record['absolute_value'] = round_value(predictor_areas.get(predictor, 0.0), decimals)
+        record['relative_value'] = round_value(predictor_relative_areas.get(predictor, 0.0), decimals)
+        record['best_rank'] = best_combination.index(predictor) + 1 if predictor in best_combination else None
+        if relative_error_bounds is not None:
+            record['error_bound'] = round_value(relative_error_bounds.get(predictor, 0.0), decimals)
+        if expected_costs is not None:
+            record['expected_cost'] = round_value(predictor_costs[predictor], decimals)
+            record['regret'] = round_value(regrets[predictor], decimals)
+        records.append(record)
+    run_record = {'group': group} if group is not None else {}
+    run_record.update({'mode': mode, 'rho': rho, 'best_combination': best_combination})
+    if expected_costs is not None:
+        run_record['best_cost'] = round_value(best_cost, decimals)
+    run_record['predictors'] = records
+    return run_record
+
+
+def get_run_rows(run_record, columns, group_by=None):
+    """
+    Get the rows of the CSV and Parquet formats of a run, one for each predictor
+    """
+    run_values = {'rho': run_record['rho'], 'best_cost': run_record.get('best_cost')}
+    if group_by:
+        run_values[group_by] = run_record.get('group')
+    return [[{**run_values, **record}.get(column) for column in columns] for record in run_record['predictors']]
+
+
+@contextmanager
+def open_output(filename):
+    """
+    Open the output file, or use the standard output if filename is None or '-'
+    """
+    if filename is None or filename == '-':
+        yield sys.stdout
+    else:
+        with open(filename, 'w', newline='') as output:
+            yield output
+
+
+def get_side_output(output_format, filename):
+    """
+    Get the stream of the outputs printed besides the partition (verification and stats to '-'): the standard error
+    if a structured format is written to the standard output, so that it can still be parsed
+    """
+    if output_format != 'text' and (filename is None or filename == '-'):
+        return sys.stderr
+    return sys.stdout
+
+
+@contextmanager
+def open_text_output(filename, group_by=None):
+    """
+    Redirect the standard output to the output file, getting a function that prints the header of a group
+    """
+    with open_output(filename) as output, redirect_stdout(output):
+        def print_group(group):
+            if group is not None:
+                print('\n{}: {}'.format(group_by, group))
+
+        yield print_group
+
+
+@contextmanager
+def open_writer(output_format, filename, mode, decimals=None, group_by=None, error_bounds=False, costs=False):
+    """
+    Get a function that writes each run (group, rho, predictors, areas, relative areas, and optional relative error
+    bounds and expected costs) as soon as it's called, closing the output at the end of the context
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise Exception(f'ERROR: output format {output_format} unknown')
+    if output_format == 'parquet':
+        with parquet_writer(filename, mode, decimals, group_by, error_bounds, costs) as write_run:
+            yield write_run
+        return
+
+    with open_output(filename) as output:
+        first_run = [True]
+
+        def write_run(group, rho, predictors, predictor_areas, predictor_relative_areas, relative_error_bounds=None,
+                      expected_costs=None):
+            if output_format == 'text':
+                with redirect_stdout(output):
+                    if group is not None:
+                        print('\n{}: {}'.format(group_by, group))
+                    if mode == 'rej':
+                        print_output(rho, predictors, predictor_areas, predictor_relative_areas, relative_error_bounds)
+                    else:
+                        print_norej_output(rho, predictors, predictor_relative_areas)
+                    if expected_costs is not None:
+                        print_expected_costs(predictors, *expected_costs)
+            else:
+                run_record = get_run_record(mode, group, rho, predictors, predictor_areas, predictor_relative_areas,
+                                            relative_error_bounds, decimals, expected_costs)
+                if output_format == 'json':
+                    output.write(('[\n' if first_run[0] else ',\n') + json.dumps(run_record))
+                elif output_format == 'jsonl':
+                    output.write(json.dumps(run_record) + '\n')
+                else:
+                    columns = get_columns(mode, group_by, error_bounds, costs)
+                    writer = csv.writer(output, lineterminator='\n')
+                    if first_run[0]:
+                        writer.writerow(columns)
+                    writer.writerows(get_run_rows(run_record, columns, group_by))
+            first_run[0] = False
+            output.flush()
+
+        yield write_run
+        if output_format == 'json':
+            output.write('[]\n' if first_run[0] else '\n]\n')
+
+
+@contextmanager
+def parquet_writer(filename, mode, decimals=None, group_by=None, error_bounds=False, costs=False):
+    """
+    Get a function that writes each run as a row group of a Parquet file
+    """
+    if pq is None:
+        sys.exit('Writing Parquet files requires pyarrow')
+    if filename is None or filename == '-':
+        sys.exit('The Parquet output requires an output file')
+    columns = get_columns(mode, group_by, error_bounds, costs)
+    types = {'predictor': pa.string(), 'best_rank': pa.int32()}
+    if group_by:
+        types[group_by] = pa.string()
+    schema = pa.schema([(column, types.get(column, pa.float64())) for column in columns])
+    with pq.ParquetWriter(filename, schema) as writer:
+        def write_run(group, rho, predictors, predictor_areas, predictor_relative_areas, relative_error_bounds=None,
+                      expected_costs=None):
+            run_record = get_run_record(mode, group, rho, predictors, predictor_areas, predictor_relative_areas,
+                                        relative_error_bounds, decimals, expected_costs)
+            rows = get_run_rows(run_record, columns, group_by)
+            writer.write_table(pa.Table.from_arrays([pa.array(values, type=schema.field(column).type)
+                                                     for column, values in zip(columns, zip(*rows))], schema=schema))
+
+        yield write_run
@@ -0,0 +1,99 @@
+"""
+Head-to-head comparison of every pair of predictors: the fraction of the clinical space where each one beats another
+
+The region where predictor A beats B is the cost space clipped by the half-plane (or half-line without coverage)
+where the difference of their costs is negative, so the whole matrix is computed in closed form at once from the
+values of the differences on the vertices of the triangle (or the ends of [0, 1]).
+"""
+
+import numpy as np
+from obtain_polygon_data import get_predictor_cost
+from obtain_predictor_intervals import get_batch_predictor_lines
+from csp_rej import print_float
+from stage_stats import stage, count
+
+MODE_PARAMETERS = {'rej': 3, 'norej': 2}
+
+
+def get_vertex_costs(rho, predictors, mode):
+    """
+    Get the cost of each predictor on the vertices of the triangle (predictors x 3) or the ends of [0, 1]
+    (predictors x 2)
+    """
+    parameters = np.array(list(predictors.values()), dtype=float).reshape(-1, MODE_PARAMETERS[mode])
+    if mode == 'rej':
+        vertices = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+        return get_predictor_cost(vertices[:, 0], vertices[:, 1], rho, *parameters.T[:, :, None])
+    slopes, intercepts = get_batch_predictor_lines(parameters[None], rho)
+    return np.stack([intercepts[0], slopes[0] + intercepts[0]], axis=1)
+
+
+def get_negative_fraction(values):
+    """
+    Get the fraction of the triangle (3 vertex values) or of [0, 1] (2 end values) where the linear function
+    with the values on its vertices is negative, for the arrays of values in the last axis
+    """
+    negative = values < 0
+    n_negative = negative.sum(axis=-1)
+    if values.shape[-1] == 2:
+        # The function crosses 0 at the negative end over its difference with the other end
+        negative_values = np.where(negative[..., 0], values[..., 0], values[..., 1])
+        other_values = np.where(negative[..., 0], values[..., 1], values[..., 0])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing = negative_values / (negative_values - other_values)
+        return np.select([n_negative == 2, n_negative == 1], [1.0, crossing], 0.0)
+
+    # The vertex with a different sign cuts a triangle similar to the whole one scaled along its two edges
+    single = np.where(n_negative == 1, negative.argmax(axis=-1), (~negative).argmax(axis=-1))
+    single_values = np.take_along_axis(values, single[..., None], axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scales = single_values / (single_values - values)
+        corner = np.where(np.arange(3) == single[..., None], 1.0, scales).prod(axis=-1)
+    return np.select([n_negative == 3, n_negative == 1, n_negative == 2], [1.0, corner, 1 - corner], 0.0)
+
+
+def get_win_matrix(rho, predictors, mode='rej'):
+    """
+    Get the (predictors x predictors) matrix of the fraction of the clinical space where the predictor of the row
+    has a lower cost than the predictor of the column
+    """
+    if mode not in MODE_PARAMETERS:
+        raise Exception(f'ERROR: pairwise mode {mode} unknown')
+    with stage('get_win_matrix'):
+        count('pairs', len(predictors) ** 2)
+        vertex_costs = get_vertex_costs(rho, predictors, mode)
+        return get_negative_fraction(vertex_costs[:, None, :] - vertex_costs[None, :, :])
+
+
+def get_pairwise_wins(rho, predictors, mode='rej'):
+    """
+    Get the fraction of the clinical space where each predictor beats each other one
+    ({predictor: {other predictor: fraction}})
+    """
+    win_matrix = get_win_matrix(rho, predictors, mode)
+    return {predictor: dict(zip(predictors, row)) for predictor, row in zip(predictors, win_matrix.tolist())}
+
+
+def print_pairwise_wins(rho, predictors, pairwise_wins):
+    spaces_predictors = len(max(list(predictors) + ['Predictor'], key=lambda p: len(p)))
+    print('\nPAIRWISE COMPARISON')
+    print('-------------------\n')
+    print('Fraction of the clinical space where the predictor of the row beats the one of the column '
+          '(rho={}):\n'.format(rho))
+    print('{: <{spaces}}\t'.format('Predictor', spaces=spaces_predictors) +
+          '\t'.join('{: <{spaces}}'.format(predictor, spaces=len(predictor)) for predictor in predictors))
+    for predictor in predictors:
+        print('{: <{spaces}}\t'.format(predictor, spaces=spaces_predictors) +
+              '\t'.join('{: <{spaces}}'.format(str(print_float(pairwise_wins[predictor][other])), spaces=len(other))
+                        for other in predictors))
+
+
+def main(rho, predictors, mode='rej'):
+    """
+    Get the fraction of the clinical space where each predictor beats each other one
+    """
+    pairwise_wins = get_pairwise_wins(rho, predictors, mode)
+
+    # Output
+    print_pairwise_wins(rho, predictors, pairwise_wins)
+    return pairwise_wins
@@ -0,0 +1,83 @@
+"""
+Budget of the exact cost space partition: wall time and number of nodes or faces of the arrangement
+
+The exact pipeline of the current thread checks the budget while it runs, on the nodes and faces it has found so
+far, raising BudgetExceeded so the caller can fall back to the approximate partition, which stops refining at the
+deadline of the same budget.
+"""
+
+import time
+import argparse
+import threading
+from contextlib import contextmanager
+
+THREAD_BUDGET = threading.local()
+BUDGET_LIMITS = ['seconds', 'nodes', 'faces']
+
+
+class BudgetExceeded(Exception):
+    """
+    The exact partition exceeds its budget
+    """
+
+
+def parse_budget(value):
+    """
+    Parse a budget of seconds and/or the limits nodes=N and faces=N separated by commas (e.g. 30,nodes=5000)
+    """
+    budget = {}
+    for item in value.split(','):
+        name, _, limit = item.strip().rpartition('=')
+        name = name.strip().lower() or 'seconds'
+        try:
+            limit = float(limit) if name == 'seconds' else int(limit)
+        except ValueError:
+            limit = None
+        if name not in BUDGET_LIMITS or limit is None or limit <= 0:
+            raise argparse.ArgumentTypeError('the budget ' + item + ' should be a number of seconds, nodes=N '
+                                             'or faces=N with a positive N')
+        budget[name] = limit
+    return budget
+
+
+def get_deadline(budget):
+    """
+    Get the time.perf_counter() time at which the seconds of the budget run out (None without seconds)
+    """
+    return time.perf_counter() + budget['seconds'] if 'seconds' in budget else None
+
+
+@contextmanager
+def limit_budget(budget):
+    """
+    Check the budget at the checkpoints of the exact partition run inside the context in the current thread
+    """
+    previous_budget = getattr(THREAD_BUDGET, 'active', None)
+    THREAD_BUDGET.active = {**budget, 'deadline': get_deadline(budget)}
+    try:
+        yield
+    finally:
+        THREAD_BUDGET.active = previous_budget
+
+
+def check_budget(name=None, value=None):
+    """
+    Raise BudgetExceeded if the time is over, or if value exceeds the limit of name (nodes or faces)
+    """
+    budget = getattr(THREAD_BUDGET, 'active', None)
+    if budget is None:
+        return
+    if budget['deadline'] is not None and time.perf_counter() > budget['deadline']:
+        raise BudgetExceeded('the exact partition exceeds the budget of {} seconds'.format(budget['seconds']))
+    if name in budget and value > budget[name]:
+        raise BudgetExceeded('the arrangement has {} {} but the budget is {}'.format(value, name, budget[name]))
+
+
+def estimate_arrangement(n_lines):
+    """
+    Get the upper bound of the nodes and faces of the arrangement of n_lines lines in the triangle, as if every pair
+    of lines crossed inside it (most crossings of real predictors are outside, so the budget is checked on the nodes
+    and faces that are found instead)
+    """
+    crossings = n_lines * (n_lines - 1) // 2
+    return {'nodes': crossings + 2 * n_lines + 3, 'faces': crossings + n_lines + 1}
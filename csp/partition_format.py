@@ -0,0 +1,151 @@
+"""
+Compact binary format of the cost space partition: flat coordinate arrays, offset arrays and predictor-id arrays
+
+A partition is a dict of arrays that is written as a single .npz file or as a directory of .npy buffers,
+which are memory-mapped when loaded so large partitions are shared between processes without copies.
+"""
+
+import os
+import glob
+import numpy as np
+
+TRIANGLE_LINE_KINDS = ['x_axis', 'y_axis', 'hypotenuse']
+
+
+def get_flat_arrays(groups, dtype):
+    """
+    Get the flat values and the offsets of each group of a list of groups
+    """
+    offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(group) for group in groups])
+    values = np.array([value for group in groups for value in group], dtype=dtype)
+    return values, offsets
+
+
+def get_groups(values, offsets):
+    """
+    Get the list of groups of the flat values and their offsets
+    """
+    return [values[start:end] for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def encode_arrangement(nodes, lines, polygons):
+    """
+    Get the arrays of the nodes (with their lines), the sorted nodes of each line and the polygons of a partition
+    """
+    line_ids = {line: line_id for line_id, line in enumerate(lines)}
+    node_ids = {node: node_id for node_id, node in enumerate(nodes)}
+    line_kinds = np.array([TRIANGLE_LINE_KINDS.index(line) + 1 if isinstance(line, str) else 0 for line in lines],
+                          dtype=np.int8)
+    line_parameters = np.array([(np.nan, np.nan) if isinstance(line, str) else line for line in lines],
+                               dtype=float).reshape(-1, 2)
+    node_line_ids, node_line_offsets = get_flat_arrays(
+        [sorted(line_ids[line] for line in node_lines) for node_lines in nodes.values()], np.int64)
+    line_node_ids, line_node_offsets = get_flat_arrays(
+        [[node_ids[node] for node in line_nodes] for line_nodes in lines.values()], np.int64)
+    polygon_coords, polygon_offsets = get_flat_arrays(polygons, float)
+    return {
+        'node_coords': np.array(list(nodes), dtype=float).reshape(-1, 2),
+        'node_line_ids': node_line_ids,
+        'node_line_offsets': node_line_offsets,
+        'line_kinds': line_kinds,
+        'line_parameters': line_parameters,
+        'line_node_ids': line_node_ids,
+        'line_node_offsets': line_node_offsets,
+        'polygon_coords': polygon_coords.reshape(-1, 2),
+        'polygon_offsets': polygon_offsets
+    }
+
+
+def decode_arrangement(arrays):
+    """
+    Get the nodes, sorted lines and polygons of the arrays of a partition
+    """
+    line_keys = [TRIANGLE_LINE_KINDS[kind - 1] if kind else tuple(parameters)
+                 for kind, parameters in zip(arrays['line_kinds'].tolist(), arrays['line_parameters'].tolist())]
+    node_keys = [tuple(node) for node in arrays['node_coords'].tolist()]
+    nodes = {node: {line_keys[line_id] for line_id in node_line_ids}
+             for node, node_line_ids in zip(node_keys, get_groups(arrays['node_line_ids'].tolist(),
+                                                                  arrays['node_line_offsets']))}
+    lines = {line: [node_keys[node_id] for node_id in line_node_ids]
+             for line, line_node_ids in zip(line_keys, get_groups(arrays['line_node_ids'].tolist(),
+                                                                   arrays['line_node_offsets']))}
+    polygons = [[tuple(point) for point in polygon]
+                for polygon in get_groups(arrays['polygon_coords'].tolist(), arrays['polygon_offsets'])]
+    return nodes, lines, polygons
+
+
+def encode_partition(predictor_order, nodes, lines, polygons, polygon_best_predictor, best_predictor_areas):
+    """
+    Get the arrays of the arrangement, the best predictor of each polygon and the area of each predictor,
+    with the predictors identified by their position in predictor_order
+    """
+    predictor_ids = {predictor: predictor_id for predictor_id, predictor in enumerate(predictor_order)}
+    arrays = encode_arrangement(nodes, lines, polygons)
+    arrays['predictors'] = np.array(predictor_order, dtype=str)
+    arrays['polygon_predictors'] = np.array([predictor_ids[p] for p in polygon_best_predictor], dtype=np.int32)
+    arrays['areas'] = np.array([best_predictor_areas.get(p, 0.0) for p in predictor_order], dtype=float)
+    return arrays
+
+
+def save_partition(path, arrays):
+    """
+    Write the arrays of a partition as an .npz file, or as .npy buffers in the path directory otherwise
+    """
+    if path.endswith('.npz'):
+        np.savez(path, **arrays)
+    else:
+        os.makedirs(path, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, name + '.npy'), array)
+
+
+def load_partition(path, mmap_mode='r'):
+    """
+    Read the arrays of a partition, memory-mapping the buffers of a directory
+    """
+    if os.path.isdir(path):
+        return {os.path.basename(filename)[:-4]: np.load(filename, mmap_mode=mmap_mode)
+                for filename in sorted(glob.glob(os.path.join(path, '*.npy')))}
+    with np.load(path) as partition:
+        return {name: partition[name] for name in partition.files}
+
+
+def get_polygon_coords(arrays, polygon_id):
+    """
+    Get the coordinates of a polygon (a view of the flat coordinates)
+    """
+    offsets = arrays['polygon_offsets']
+    return arrays['polygon_coords'][offsets[polygon_id]:offsets[polygon_id + 1]]
+
+
+def get_polygon_areas(arrays):
+    """
+    Get the area of each polygon with the shoelace formula over the flat coordinates
+    """
+    coords = np.asarray(arrays['polygon_coords'])
+    offsets = np.asarray(arrays['polygon_offsets'])
+    if len(offsets) < 2:
+        return np.zeros(0)
+    x, y = coords[:, 0], coords[:, 1]
+    cross = np.zeros(len(coords))
+    cross[:-1] = x[:-1] * y[1:] - x[1:] * y[:-1]
+    # The last point of a polygon isn't joined to the first point of the next one
+    cross[offsets[1:] - 1] = 0
+    return np.abs(np.add.reduceat(cross, offsets[:-1])) / 2
+
+
+def get_best_predictor_areas(arrays):
+    """
+    Get the total area of the polygons of each best predictor from the flat coordinates
+    """
+    areas = np.bincount(arrays['polygon_predictors'], weights=get_polygon_areas(arrays),
+                        minlength=len(arrays['predictors']))
+    return dict(zip(arrays['predictors'].tolist(), areas.tolist()))
+
+
+def get_partition_areas(arrays):
+    """
+    Get the stored area of each predictor
+    """
+    return dict(zip(arrays['predictors'].tolist(), arrays['areas'].tolist()))
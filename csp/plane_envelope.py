@@ -0,0 +1,155 @@
+"""
+Cost space partition with coverage of predictors given by a curve of operating points (one for each threshold)
+
+Each operating point is a cost plane over the triangle, and the best predictor and operating point of each region
+is the lowest plane. Instead of intersecting every pair of planes, the lower envelope is found over the adaptive grid
+of approximate_areas: cells whose vertices share the lowest plane belong to it, cells with many candidate planes are
+split, and the rest of cells are clipped by the half-planes where each candidate is the lowest one, so the areas are
+exact.
+"""
+
+import numpy as np
+from approximate_areas import TRIANGLE_AREA, CHUNK_COSTS, get_triangle_grid, split_cells, get_cells_area, \
+    classify_cells
+from obtain_polygon_data import get_predictor_cost, get_predictor_area
+from csp_rej import print_output, print_float
+from stage_stats import stage, count
+
+CLIP_CANDIDATES = 4
+
+
+def get_curve_planes(curves):
+    """
+    Get the (sensitivity, specificity, coverage) of each point of the curves, its predictor and its threshold
+    curves: dictionary of the [threshold, sensitivity, specificity, coverage] points of each predictor
+    """
+    points = np.concatenate([np.asarray(points, dtype=float).reshape(-1, 4) for points in curves.values()])
+    predictor_ids = np.repeat(np.arange(len(curves)), [len(points) for points in curves.values()])
+    return points[:, 1:], predictor_ids, points[:, 0]
+
+
+def get_plane_coefficients(rho, planes):
+    """
+    Get the (a, b, c) coefficients of the cost a * x + b * y + c of each plane
+    """
+    sens, spec, cov = planes.T
+    c = get_predictor_cost(0.0, 0.0, rho, sens, spec, cov)
+    a = get_predictor_cost(1.0, 0.0, rho, sens, spec, cov) - c
+    b = get_predictor_cost(0.0, 1.0, rho, sens, spec, cov) - c
+    return np.stack([a, b, c], axis=1)
+
+
+def clip_polygon(polygon, a, b, c):
+    """
+    Get the part of a convex polygon (list of points) where a * x + b * y + c <= 0
+    """
+    clipped = []
+    for (x1, y1), (x2, y2) in zip(polygon, polygon[1:] + polygon[:1]):
+        value1 = a * x1 + b * y1 + c
+        value2 = a * x2 + b * y2 + c
+        if value1 <= 0:
+            clipped.append((x1, y1))
+        if (value1 < 0 < value2) or (value2 < 0 < value1):
+            t = value1 / (value1 - value2)
+            clipped.append((x1 + t * (x2 - x1), y1 + t * (y2 - y1)))
+    return clipped
+
+
+def get_shoelace_area(polygon):
+    """
+    Get the area of a polygon (list of points)
+    """
+    return abs(sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(polygon, polygon[1:] + polygon[:1]))) / 2
+
+
+def get_clipped_areas(cell, coefficients):
+    """
+    Get the area of the cell in which each of the candidate planes (coefficients) is the lowest one
+    """
+    cell = [tuple(vertex) for vertex in cell.tolist()]
+    areas = np.zeros(len(coefficients))
+    for i, (a, b, c) in enumerate(coefficients.tolist()):
+        region = cell
+        for j, (other_a, other_b, other_c) in enumerate(coefficients.tolist()):
+            if j != i and region:
+                region = clip_polygon(region, a - other_a, b - other_b, c - other_c)
+        areas[i] = get_shoelace_area(region) if len(region) > 2 else 0.0
+    return areas
+
+
+def get_envelope_areas(rho, planes, max_depth=10, initial_depth=4, chunk_size=None):
+    """
+    Get the area in which each plane is the lowest one (ties keep the first plane)
+    Cells are split until they have at most CLIP_CANDIDATES candidate planes or the grid reaches max_depth,
+    processing chunk_size cells at a time to bound the memory of the (cells x vertices x planes) costs
+    """
+    n_planes = len(planes)
+    if chunk_size is None:
+        chunk_size = max(1, CHUNK_COSTS // (9 * n_planes))
+    # Only the first of identical planes can be the lowest one
+    _, unique_ids = np.unique(get_plane_coefficients(rho, planes), axis=0, return_index=True)
+    unique_ids = np.sort(unique_ids)
+    unique_planes = {plane_id: planes[plane_id] for plane_id in unique_ids.tolist()}
+    coefficients = get_plane_coefficients(rho, planes[unique_ids])
+
+    areas = np.zeros(len(unique_ids))
+    cells = get_triangle_grid(initial_depth)
+    depth = initial_depth
+    while len(cells):
+        cells_area = get_cells_area(cells[:1])[0]
+        split = []
+        for start in range(0, len(cells), chunk_size):
+            chunk = cells[start:start + chunk_size]
+            labels, _, candidates = classify_cells(chunk, rho, unique_planes)
+            resolved = labels >= 0
+            areas += cells_area * np.bincount(labels[resolved], minlength=len(unique_ids))
+            mixed_cells = chunk[~resolved]
+            clipped = (candidates.sum(axis=1) <= CLIP_CANDIDATES) | (depth >= max_depth)
+            count('clipped_cells', int(clipped.sum()))
+            for cell, cell_candidates in zip(mixed_cells[clipped], candidates[clipped]):
+                candidate_ids = np.flatnonzero(cell_candidates)
+                areas[candidate_ids] += get_clipped_areas(cell, coefficients[candidate_ids])
+            split.append(mixed_cells[~clipped])
+        cells = split_cells(np.concatenate(split))
+        depth += 1
+    plane_areas = np.zeros(n_planes)
+    plane_areas[unique_ids] = areas
+    return plane_areas
+
+
+def get_curve_partition(rho, curves):
+    """
+    Get the areas and relative areas of each predictor, and the area of each of its operating points
+    """
+    planes, predictor_ids, thresholds = get_curve_planes(curves)
+    with stage('get_envelope_areas'):
+        count('planes', len(planes))
+        plane_areas = get_envelope_areas(rho, planes)
+    best_predictor_areas = dict(zip(curves, np.bincount(predictor_ids, plane_areas, len(curves)).tolist()))
+    predictor_areas, predictor_relative_areas = get_predictor_area(best_predictor_areas, curves)
+    predictors = list(curves)
+    point_areas = [(predictors[predictor_id], threshold, area) for predictor_id, threshold, area
+                   in zip(predictor_ids.tolist(), thresholds.tolist(), plane_areas.tolist()) if area > 0]
+    return predictor_areas, predictor_relative_areas, point_areas
+
+
+def print_curve_output(rho, curves, predictor_areas, predictor_relative_areas, point_areas):
+    print_output(rho, curves, predictor_areas, predictor_relative_areas)
+    spaces_predictors = len(max(list(curves) + ['Predictor'], key=lambda p: len(p)))
+    print('\nBest operating points of each predictor:\n')
+    print('{: <{spaces}}\tThreshold\tAbsolute value\tRelative value'.format('Predictor', spaces=spaces_predictors))
+    print('{: <{spaces}}\t---------\t--------------\t--------------'.format('---------', spaces=spaces_predictors))
+    for predictor, threshold, area in point_areas:
+        print('{: <{spaces}}\t{}\t\t{}\t\t{}'.format(predictor, threshold, print_float(area),
+                                                    print_float(area / TRIANGLE_AREA), spaces=spaces_predictors))
+
+
+def main(rho, curves):
+    """
+    Get the cost space partition with coverage of the curves of the predictors
+    """
+    predictor_areas, predictor_relative_areas, point_areas = get_curve_partition(rho, curves)
+
+    # Output
+    print_curve_output(rho, curves, predictor_areas, predictor_relative_areas, point_areas)
+    return predictor_areas, predictor_relative_areas, point_areas
@@ -0,0 +1,112 @@
+"""
+Ranking of the predictors along the cost space partition with coverage: the top k predictors in order (k-levels)
+
+Every pair of predictors' planes is a line of the arrangement, so the whole ranking of the predictors is the same
+inside each polygon. The rankings of all the polygons of a single arrangement are found at once from the costs on
+an interior point of each polygon, partially sorting only the k lowest costs.
+"""
+
+import numpy as np
+from csp_rej import get_partition_arrays, print_float
+from obtain_polygon_data import get_predictors_cost_matrix
+from partition_format import get_polygon_areas
+from result_cache import DEFAULT_CACHE_SIZE
+from stage_stats import stage, count
+
+TRIANGLE_AREA = 0.5
+
+
+def get_polygon_points(arrays):
+    """
+    Get an interior point of each (convex) polygon: the mean of its points, without the first one repeated at the end
+    """
+    coords = np.asarray(arrays['polygon_coords'], dtype=float)
+    offsets = np.asarray(arrays['polygon_offsets'])
+    sums = np.add.reduceat(coords, offsets[:-1], axis=0) - coords[offsets[1:] - 1]
+    return sums / (np.diff(offsets) - 1)[:, None]
+
+
+def get_top_predictors(costs, k):
+    """
+    Get the ids of the k predictors with the lowest costs of each row, from the lowest one (ties keep the lowest id)
+    """
+    n = costs.shape[1]
+    if k < n:
+        top = np.argpartition(costs, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(n), costs.shape)
+    top_costs = np.take_along_axis(costs, top, axis=1)
+    top = np.take_along_axis(top, np.lexsort((top, top_costs), axis=1), axis=1)
+
+    # Rows tied at the k-th cost with a predictor left out are ranked with a stable sort instead
+    kth_costs = np.take_along_axis(costs, top[:, -1:], axis=1)
+    tied = np.flatnonzero((costs == kth_costs).sum(axis=1) > (np.take_along_axis(costs, top, axis=1) ==
+                                                               kth_costs).sum(axis=1))
+    top[tied] = np.argsort(costs[tied], axis=1, kind='stable')[:, :k]
+    return top
+
+
+def get_rank_levels(rho, predictors, arrays, k):
+    """
+    Get the area in which each predictor holds each rank ({rank: {predictor: area}}) and the area in which each
+    ordered tuple of k predictors are the best ones ({tuple: area}) from the arrays of the partition
+    """
+    names = list(predictors)
+    k = min(k, len(names))
+    points = get_polygon_points(arrays)
+    polygon_areas = get_polygon_areas(arrays)
+    top = get_top_predictors(get_predictors_cost_matrix(points[:, 0], points[:, 1], rho, predictors), k)
+
+    ranks = np.broadcast_to(np.arange(k), top.shape)
+    rank_areas = np.bincount((ranks * len(names) + top).ravel(), np.repeat(polygon_areas, k), k * len(names))
+    rank_areas = rank_areas.reshape(k, len(names))
+    tuples, inverse = np.unique(top, axis=0, return_inverse=True)
+    tuple_areas = np.bincount(inverse.ravel(), polygon_areas, len(tuples))
+    return ({rank + 1: dict(zip(names, rank_areas[rank].tolist())) for rank in range(k)},
+            {tuple(names[i] for i in ids): area for ids, area in zip(tuples.tolist(), tuple_areas.tolist())
+             if area > 0})
+
+
+def get_rank_partition(rho, predictors, k, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Get the area of each rank of each predictor and the area of each ordered tuple of the top k predictors
+    of the cost space partition with coverage
+    """
+    arrays = get_partition_arrays(rho, predictors, cache_dir, cache_size)
+    with stage('get_rank_levels'):
+        count('polygons', len(arrays['polygon_offsets']) - 1)
+        return get_rank_levels(rho, predictors, arrays, k)
+
+
+def print_rank_output(rho, predictors, rank_areas, tuple_areas):
+    spaces_predictors = len(max(list(predictors) + ['Predictor'], key=lambda p: len(p)))
+    print('\nCLINICAL SPACE RANKING')
+    print('----------------------\n')
+    print('Methods compared: {}\n'.format(', '.join(predictors)))
+    print('Clinical space fraction of each rank of each predictor (rho={}):\n'.format(rho))
+    print('Rank\t{: <{spaces}}\tAbsolute value\tRelative value'.format('Predictor', spaces=spaces_predictors))
+    print('----\t{: <{spaces}}\t--------------\t--------------'.format('---------', spaces=spaces_predictors))
+    for rank, predictor_areas in rank_areas.items():
+        for predictor, area in sorted(predictor_areas.items(), key=lambda x: (-x[1], x[0])):
+            if round(area / TRIANGLE_AREA, 3) > 0:
+                print('{}\t{: <{spaces}}\t{}\t\t{}'.format(rank, predictor, print_float(area),
+                                                           print_float(area / TRIANGLE_AREA),
+                                                           spaces=spaces_predictors))
+    print('\nClinical space fraction of each ranking of the best {} predictors:\n'.format(len(rank_areas)))
+    print('Absolute value\tRelative value\tRanking')
+    print('--------------\t--------------\t-------')
+    for ranking, area in sorted(tuple_areas.items(), key=lambda x: (-x[1], x[0])):
+        if round(area / TRIANGLE_AREA, 3) > 0:
+            print('{}\t\t{}\t\t{}'.format(print_float(area), print_float(area / TRIANGLE_AREA),
+                                           ' > '.join(ranking)))
+
+
+def main(rho, predictors, k, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Get the ranking of the top k predictors along the cost space partition with coverage
+    """
+    rank_areas, tuple_areas = get_rank_partition(rho, predictors, k, cache_dir, cache_size)
+
+    # Output
+    print_rank_output(rho, predictors, rank_areas, tuple_areas)
+    return rank_areas, tuple_areas
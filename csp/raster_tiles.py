@@ -0,0 +1,162 @@
+"""
+Raster label maps of the cost space partition with coverage for visualization
+
+The label of each pixel is the id of the best predictor on its center (the position in the `predictors` of the
+metadata, as in the partition format) or NODATA outside the triangle, found with the argmin of the costs of a whole
+tile at once. The full resolution level is written in parallel tiles to a memory-mapped uint16 .npy buffer, and each
+lower resolution level (half the size of the previous one) is written the first time it's loaded.
+"""
+
+import os
+import glob
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from numpy.lib.format import open_memmap
+from approximate_areas import CHUNK_COSTS
+from obtain_polygon_data import get_predictor_cost
+from result_cache import get_canonical_order
+from stage_stats import stage, count
+
+NODATA = np.iinfo(np.uint16).max
+MAX_RASTER_SIZE = 16384
+DEFAULT_RASTER_SIZE = 4096
+DEFAULT_TILE_SIZE = 512
+METADATA_FILE = 'raster.json'
+
+LEVEL_LOCK = threading.Lock()
+
+
+def get_level_size(size, level):
+    """
+    Get the number of pixels of each side of a level
+    """
+    return -(-size // 2 ** level)
+
+
+def get_level_count(size, tile_size):
+    """
+    Get the number of levels, down to the first one that fits in a single tile
+    """
+    level = 0
+    while get_level_size(size, level) > tile_size:
+        level += 1
+    return level + 1
+
+
+def get_level_path(path, level):
+    return os.path.join(path, 'level_{}.npy'.format(level))
+
+
+def get_tiles(size, tile_size):
+    """
+    Get the (first row, last row, first column, last column) of each tile of a level
+    """
+    starts = range(0, size, tile_size)
+    return [(row, min(row + tile_size, size), col, min(col + tile_size, size)) for row in starts for col in starts]
+
+
+def get_tile_labels(rho, parameters, labels, size, tile):
+    """
+    Get the labels of the pixels of a tile, processing rows of pixels in chunks to bound the memory of the costs
+    (rows from the top of the cost space, y = 1, to the bottom)
+    """
+    row_start, row_end, col_start, col_end = tile
+    x = (np.arange(col_start, col_end) + 0.5) / size
+    tile_labels = np.full((row_end - row_start, col_end - col_start), NODATA, dtype=np.uint16)
+    if x[0] + 1 - (row_end - 0.5) / size > 1:
+        return tile_labels
+
+    chunk_rows = max(1, CHUNK_COSTS // (len(x) * len(parameters)))
+    sens, spec, cov = parameters.T
+    for start in range(row_start, row_end, chunk_rows):
+        y = 1 - (np.arange(start, min(start + chunk_rows, row_end)) + 0.5) / size
+        costs = get_predictor_cost(x[None, :, None], y[:, None, None], rho, sens, spec, cov)
+        chunk_labels = labels[costs.argmin(axis=2)]
+        chunk_labels[x[None, :] + y[:, None] > 1] = NODATA
+        tile_labels[start - row_start:start - row_start + len(y)] = chunk_labels
+    return tile_labels
+
+
+def write_level(path, rho, parameters, labels, size, tile_size, workers=None):
+    """
+    Write the labels of a level of size x size pixels to a memory-mapped .npy buffer, computing its tiles in a pool
+    of threads (the buffer is written under a temporary name and then renamed)
+    """
+    temporary_path = path + '.tmp.npy'
+    level = open_memmap(temporary_path, mode='w+', dtype=np.uint16, shape=(size, size))
+
+    def write_tile(tile):
+        level[tile[0]:tile[1], tile[2]:tile[3]] = get_tile_labels(rho, parameters, labels, size, tile)
+
+    tiles = get_tiles(size, tile_size)
+    count('tiles', len(tiles))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(write_tile, tiles))
+    level.flush()
+    del level
+    os.replace(temporary_path, path)
+
+
+def read_metadata(path):
+    with open(os.path.join(path, METADATA_FILE)) as metadata_file:
+        return json.load(metadata_file)
+
+
+def get_metadata_inputs(metadata):
+    """
+    Get rho, the parameters of the predictors in the order of the costs and the label of each of them
+    """
+    parameters = np.array(metadata['parameters'], dtype=float).reshape(-1, 3)
+    return metadata['rho'], parameters, np.array(metadata['labels'], dtype=np.uint16)
+
+
+def write_raster(path, rho, predictors, size=DEFAULT_RASTER_SIZE, tile_size=DEFAULT_TILE_SIZE, workers=None):
+    """
+    Write the metadata and the full resolution labels of the partition in the path directory, removing the levels
+    of a previous raster
+    """
+    if not 1 <= size <= MAX_RASTER_SIZE:
+        raise Exception(f'ERROR: raster size {size} should be between 1 and {MAX_RASTER_SIZE}')
+    if len(predictors) >= NODATA:
+        raise Exception(f'ERROR: {len(predictors)} predictors can not be labeled in a uint16 raster')
+    canonical_order = get_canonical_order(predictors)
+    # The costs keep the config order, so the ties keep the best predictor of the partition
+    predictor_ids = {predictor: predictor_id for predictor_id, predictor in enumerate(canonical_order)}
+    metadata = {'rho': rho, 'predictors': canonical_order, 'size': size, 'tile_size': tile_size,
+                'levels': get_level_count(size, tile_size), 'nodata': int(NODATA),
+                'parameters': [list(parameters) for parameters in predictors.values()],
+                'labels': [predictor_ids[predictor] for predictor in predictors]}
+    os.makedirs(path, exist_ok=True)
+    with LEVEL_LOCK:
+        for level_path in glob.glob(os.path.join(path, 'level_*.npy')):
+            os.remove(level_path)
+    with open(os.path.join(path, METADATA_FILE), 'w') as metadata_file:
+        json.dump(metadata, metadata_file)
+    with stage('write_raster'):
+        write_level(get_level_path(path, 0), *get_metadata_inputs(metadata), size, tile_size, workers)
+    return metadata
+
+
+def load_raster_level(path, level=0, workers=None):
+    """
+    Memory-map the labels of a level of the raster in the path directory, writing them first if they are missing
+    """
+    metadata = read_metadata(path)
+    if not 0 <= level < metadata['levels']:
+        raise Exception(f'ERROR: raster level {level} should be between 0 and {metadata["levels"] - 1}')
+    level_path = get_level_path(path, level)
+    with LEVEL_LOCK:
+        if not os.path.exists(level_path):
+            write_level(level_path, *get_metadata_inputs(metadata), get_level_size(metadata['size'], level),
+                        metadata['tile_size'], workers)
+    return np.load(level_path, mmap_mode='r')
+
+
+def load_raster_tile(path, level, row, col):
+    """
+    Get the labels of a tile of a level of the raster (a view of the memory-mapped level)
+    """
+    tile_size = read_metadata(path)['tile_size']
+    return load_raster_level(path, level)[row * tile_size:(row + 1) * tile_size, col * tile_size:(col + 1) * tile_size]
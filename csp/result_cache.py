@@ -0,0 +1,139 @@
+"""
+Content-addressed disk cache of the cost space partition: areas and arrangement of each (rho, predictors, engine)
+
+Entries are .npz files named by the hash of the canonical input and the code version. They are written to a temporary
+file and renamed, so concurrent readers only see complete entries, and the least recently used entries are evicted
+under a file lock once the cache exceeds its size.
+"""
+
+import os
+import glob
+import json
+import hashlib
+import tempfile
+import zipfile
+from contextlib import contextmanager
+import numpy as np
+from partition_format import load_partition
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEFAULT_CACHE_SIZE = 2 ** 30
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_code_version():
+    """
+    Get the hash of the source files of the cost space partition
+    """
+    code_hash = hashlib.sha256()
+    for filename in sorted(glob.glob(os.path.join(SOURCE_DIR, '*.py'))):
+        with open(filename, 'rb') as source:
+            code_hash.update(os.path.basename(filename).encode() + b'\0' + source.read())
+    return code_hash.hexdigest()
+
+
+CODE_VERSION = get_code_version()
+
+
+def get_canonical_order(predictors):
+    """
+    Get the predictors sorted by their parameters (ties keep the config order, which breaks the cost ties)
+    """
+    return sorted(predictors, key=lambda p: predictors[p])
+
+
+def get_cache_key(rho, predictors, engine):
+    """
+    Get the hash of the canonical JSON of rho, the sorted predictor parameters, the engine and the code version
+    """
+    canonical = {
+        'rho': rho,
+        'predictors': [[round(float(value), 3) for value in predictors[p]] for p in get_canonical_order(predictors)],
+        'engine': engine,
+        'version': CODE_VERSION
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+def get_entry_path(cache_dir, key):
+    """
+    Get the path of the entry of a key
+    """
+    return os.path.join(cache_dir, key + '.npz')
+
+
+@contextmanager
+def cache_lock(cache_dir):
+    """
+    Hold the exclusive lock of the cache directory across processes
+    """
+    with open(os.path.join(cache_dir, '.lock'), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_entry(cache_dir, rho, predictors, engine):
+    """
+    Get the arrays of the cached entry, or None if it isn't cached
+    """
+    path = get_entry_path(cache_dir, get_cache_key(rho, predictors, engine))
+    try:
+        arrays = load_partition(path)
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        # A damaged entry is a miss that will be overwritten
+        return None
+    return arrays
+
+
+def evict_entries(cache_dir, cache_size):
+    """
+    Remove the least recently used entries until the cache size is below cache_size (called with the lock held)
+    """
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir, '*.npz')):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= cache_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+
+
+def store_entry(cache_dir, rho, predictors, engine, arrays, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Store the arrays of an entry atomically and evict the least recently used entries
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = get_entry_path(cache_dir, get_cache_key(rho, predictors, engine))
+    with tempfile.NamedTemporaryFile(dir=cache_dir, suffix='.tmp', delete=False) as temporal:
+        try:
+            np.savez_compressed(temporal, **arrays)
+            temporal.flush()
+            os.fsync(temporal.fileno())
+        except BaseException:
+            os.remove(temporal.name)
+            raise
+    os.chmod(temporal.name, 0o644)
+    os.replace(temporal.name, path)
+    with cache_lock(cache_dir):
+        evict_entries(cache_dir, cache_size)
@@ -6,12 +6,17 @@ from shapely.geometry import Point
 from shapely.geometry.polygon import Polygon
 from find_predictor_intersections import nodes2edge
 from itertools import combinations
+from collections import Counter, defaultdict
+from stage_stats import count
+from partition_budget import check_budget
 
 
 def get_polygon(first_node, nodes, interactions, search_edges, paths, covered_lines, found_polygons):
     """
     Get a polygon
     """
+    count('bfs_expansions')
+    check_budget()
     path = paths.pop(0)
     node = path[-1]
     path_lines = covered_lines.pop(0)
@@ -56,22 +61,41 @@ def get_polygon(first_node, nodes, interactions, search_edges, paths, covered_li
         return get_polygon(first_node, nodes, interactions, search_edges, paths, covered_lines, found_polygons)
 
 
-def get_polygons(search_edges, search_nodes, nodes, interactions):
+def iter_polygons(search_edges, search_nodes, nodes, interactions):
     """
-    Get the polygons
+    Get the polygons as they are found (search_edges and search_nodes are counted down in copies)
+
+    The found polygons are forgotten once one of their edges can't participate in more polygons, so the memory of
+    the search depends on the polygons around the frontier and not on all the polygons.
     """
-    polygons = []
-    found_polygons = []
+    search_edges = Counter(search_edges)
+    search_nodes = list(search_nodes)
+    found_polygons = set()
+    edge_polygons = defaultdict(list)
     while search_nodes:
         first_node = search_nodes[0]
         polygon = get_polygon(first_node, nodes, interactions, search_edges, [[first_node]], [set()], found_polygons)
-        polygons.append(polygon)
-        found_polygons.append(set(polygon))
+        count('faces')
+        yield polygon
+        polygon_nodes = frozenset(polygon)
+        found_polygons.add(polygon_nodes)
         # C4: Decrease polygon's nodes counters
         for node in polygon[:-1]:
             search_nodes.remove(node)
         # C3: Decrease polygon's edges counters
         for index, node in enumerate(polygon[:-1]):
             edge = nodes2edge(node, polygon[index + 1])
-            search_edges.remove(edge)
-    return polygons
+            edge_polygons[edge].append(polygon_nodes)
+            search_edges[edge] -= 1
+            if search_edges[edge] == 0:
+                # C5 can't discard the polygons of an exhausted edge because C3 discards them first
+                del search_edges[edge]
+                for found_polygon in edge_polygons.pop(edge):
+                    found_polygons.discard(found_polygon)
+
+
+def get_polygons(search_edges, search_nodes, nodes, interactions):
+    """
+    Get the polygons (search_edges and search_nodes are counted down in copies)
+    """
+    return list(iter_polygons(search_edges, search_nodes, nodes, interactions))
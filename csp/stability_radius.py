@@ -0,0 +1,401 @@
+"""
+Stability radius of the best combination: how far each parameter can decrease or increase before the predictors
+with a non-zero clinical space fraction change
+
+A predictor has a non-zero fraction when its margin, the largest difference between the lowest cost of the other
+predictors and its cost, is positive. That difference is concave and piecewise linear, so its largest value is on
+a vertex of the partition of the other predictors: a point where three costs are equal, where two costs are equal
+on an edge, or a vertex of the cost space (an intersection point or an end of [0, 1] without coverage), and the
+margins of every predictor come at once from the costs on those candidate points.
+
+A margin can only cross (or touch) zero where the partition is degenerate: where a cost goes through a vertex of the
+lowest cost of the others (four costs equal on a point, three on an edge or two on a vertex of the cost space). These
+conditions are zeros of determinants of the costs, which are affine in each parameter and cubic in rho, so the
+values where they hold are found exactly. The radius is the first of them (on the lowest cost) at which, or after
+which, the predictors with a non-zero fraction change.
+"""
+
+from itertools import combinations
+import numpy as np
+from approximate_areas import CHUNK_COSTS
+from obtain_polygon_data import get_predictor_cost
+from obtain_predictor_intervals import get_batch_predictor_lines
+from stage_stats import stage, count
+
+MODE_PARAMETERS = {'rej': ['sensitivity', 'specificity', 'coverage'], 'norej': ['sensitivity', 'specificity']}
+MARGIN_TOLERANCE = 1e-12
+POLYNOMIAL_TOLERANCE = 1e-12
+ROOT_TOLERANCE = 1e-7
+POINT_TOLERANCE = 1e-9
+# The number of predictors of each kind of condition of a degenerate partition, the (u, w) combinations of the
+# coefficients (a, b, c) of its costs along its edge, end or vertex (u * t + w) and its point (x0 + dx * t,
+# y0 + dy * t) as (x0, dx, y0, dy)
+CONDITION_KINDS = {
+    'rej': [(4, None, None),
+            (3, [[1, 0, 0], [0, 0, 1]], [0, 1, 0, 0]),
+            (3, [[0, 1, 0], [0, 0, 1]], [0, 0, 0, 1]),
+            (3, [[1, -1, 0], [0, 1, 1]], [0, 1, 1, -1]),
+            (2, [[0, 0, 0], [0, 0, 1]], [0, 0, 0, 0]),
+            (2, [[0, 0, 0], [1, 0, 1]], [1, 0, 0, 0]),
+            (2, [[0, 0, 0], [0, 1, 1]], [0, 0, 1, 0])],
+    'norej': [(3, [[1, 0, 0], [0, 0, 1]], [0, 1, 0, 0]),
+              (2, [[0, 0, 0], [0, 0, 1]], [0, 0, 0, 0]),
+              (2, [[0, 0, 0], [1, 0, 1]], [1, 0, 0, 0])]
+}
+
+
+def get_coefficients(rho, parameters, mode):
+    """
+    Get the (a, b, c) coefficients of the cost a * x + b * y + c of each predictor of each batch
+    (batches x predictors x 3, with b = 0 without coverage)
+    """
+    if mode == 'norej':
+        slopes, intercepts = get_batch_predictor_lines(parameters, rho)
+        return np.stack([slopes, np.zeros_like(slopes), intercepts], axis=-1)
+    rho = np.asarray(rho, dtype=float)[:, None]
+    sens, spec, cov = parameters[..., 0], parameters[..., 1], parameters[..., 2]
+    c = get_predictor_cost(0.0, 0.0, rho, sens, spec, cov)
+    a = get_predictor_cost(1.0, 0.0, rho, sens, spec, cov) - c
+    b = get_predictor_cost(0.0, 1.0, rho, sens, spec, cov) - c
+    return np.stack([a, b, c], axis=-1)
+
+
+def get_line_intersections(lines_1, lines_2):
+    """
+    Get the x and y of the intersection points of the lines A * x + B * y + C = 0 (NaN if they are parallel)
+    """
+    a1, b1, c1 = np.moveaxis(lines_1, -1, 0)
+    a2, b2, c2 = np.moveaxis(lines_2, -1, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        determinants = a1 * b2 - a2 * b1
+        return (b1 * c2 - b2 * c1) / determinants, (c1 * a2 - c2 * a1) / determinants
+
+
+def get_candidate_points(coefficients, mode):
+    """
+    Get the points of each batch where the margins can be the largest (batches x points x 2, NaN if they are
+    outside of the cost space): where three costs are equal, where two costs are equal on the edges of the cost
+    space and its vertices (or where two costs are equal and the ends of [0, 1])
+    """
+    n = coefficients.shape[1]
+    first, second = np.array(list(combinations(range(n), 2)), dtype=int).reshape(-1, 2).T
+    # Lines where two costs are equal (A * x + B * y + C = 0)
+    lines = coefficients[:, first] - coefficients[:, second]
+    if mode == 'norej':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = -lines[..., 2] / lines[..., 0]
+        x = np.concatenate([x, np.zeros((len(x), 1)), np.ones((len(x), 1))], axis=1)
+        x[~((x >= 0) & (x <= 1))] = np.nan
+        return np.stack([x, np.zeros_like(x)], axis=-1)
+
+    r, s, t = np.array(list(combinations(range(n), 3)), dtype=int).reshape(-1, 3).T
+    triple_x, triple_y = get_line_intersections(coefficients[:, r] - coefficients[:, s],
+                                                coefficients[:, r] - coefficients[:, t])
+    edges = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [1.0, 1.0, -1.0]])
+    edge_x, edge_y = get_line_intersections(lines[:, :, None, :], edges)
+    corners = np.broadcast_to(np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]]), (len(lines), 3, 2))
+    x = np.concatenate([triple_x, edge_x.reshape(len(lines), -1), corners[..., 0]], axis=1)
+    y = np.concatenate([triple_y, edge_y.reshape(len(lines), -1), corners[..., 1]], axis=1)
+    margin = 1e-9
+    with np.errstate(invalid='ignore'):
+        outside = ~((x >= -margin) & (y >= -margin) & (x + y <= 1 + margin))
+    x[outside] = np.nan
+    y[outside] = np.nan
+    return np.stack([x, y], axis=-1)
+
+
+def get_duplicates(coefficients):
+    """
+    Get whether each predictor of each batch has the same costs as a previous one (batches x predictors), within
+    the margin tolerance on the vertices of the cost space so that a slightly perturbed copy doesn't take the
+    fraction of the first one
+    """
+    n = coefficients.shape[1]
+    vertex_costs = coefficients[..., 2:] + np.concatenate([np.zeros(coefficients.shape[:2] + (1,)),
+                                                           coefficients[..., :2]], axis=-1)
+    same = (np.abs(vertex_costs[:, :, None] - vertex_costs[:, None, :]) <= MARGIN_TOLERANCE).all(axis=-1)
+    return (same & np.triu(np.ones((n, n), dtype=bool), 1)).any(axis=1)
+
+
+def get_support_margins(coefficients, mode):
+    """
+    Get the margin of each predictor of each batch (batches x predictors), positive if its fraction isn't zero
+    Only the first of predictors with the same costs can have a non-zero fraction, as in the partition
+    """
+    if coefficients.shape[1] == 1:
+        return np.full(coefficients.shape[:2], np.inf)
+    points = get_candidate_points(coefficients, mode)
+    valid = ~np.isnan(points[..., :1])
+    points = np.where(valid, points, 0.0)
+    costs = points[..., :1] * coefficients[:, None, :, 0] + points[..., 1:] * coefficients[:, None, :, 1] + \
+        coefficients[:, None, :, 2]
+    costs[np.broadcast_to(get_duplicates(coefficients)[:, None], costs.shape)] = np.inf
+    lowest_ids = costs.argmin(axis=-1)[..., None]
+    lowest = np.take_along_axis(costs, lowest_ids, axis=-1)
+    np.put_along_axis(costs, lowest_ids, np.inf, axis=-1)
+    # The lowest cost of the other predictors is the second lowest cost for the predictor with the lowest one
+    other_costs = np.broadcast_to(lowest, costs.shape).copy()
+    np.put_along_axis(other_costs, lowest_ids, costs.min(axis=-1, keepdims=True), axis=-1)
+    np.put_along_axis(costs, lowest_ids, lowest, axis=-1)
+    return np.where(valid, other_costs - costs, -np.inf).max(axis=1)
+
+
+def get_batch_margins(rho, parameters, mode):
+    """
+    Get the margins of each predictor of each batch, processing the batches in chunks to bound the memory of the
+    (batches x points x predictors) costs
+    """
+    n = parameters.shape[1]
+    n_lines = n * (n - 1) // 2
+    n_points = n * (n - 1) * (n - 2) // 6 + 3 * n_lines + 3 if mode == 'rej' else n_lines + 2
+    chunk_size = max(1, CHUNK_COSTS // (n_points * n))
+    margins = np.empty(parameters.shape[:2])
+    for start in range(0, len(parameters), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        margins[chunk] = get_support_margins(get_coefficients(rho[chunk], parameters[chunk], mode), mode)
+    return margins
+
+
+def get_support_distance(margins, support):
+    """
+    Get how far the margins of each batch are from changing the predictors with a non-zero fraction (positive if
+    they don't change)
+    """
+    return np.where(support, margins - MARGIN_TOLERANCE, MARGIN_TOLERANCE - margins).min(axis=1)
+
+
+def get_perturbations(rho, parameters):
+    """
+    Get the perturbed value (rho or a parameter of a predictor) and the direction and largest change of each
+    perturbation, ordered as the rows of the parameters (predictors x parameters) and then rho,
+    each one decreasing and then increasing
+    """
+    values = np.append(parameters.ravel(), rho)
+    directions = np.tile([-1.0, 1.0], len(values))
+    values = np.repeat(values, 2)
+    return np.repeat(np.arange(len(values) // 2), 2), directions, np.where(directions < 0, values, 1 - values)
+
+
+def get_perturbed_inputs(rho, parameters, perturbed, changes):
+    """
+    Get rho and the parameters of each batch, perturbing the value perturbed[i] by changes[i]
+    """
+    size = parameters.size
+    batch_parameters = np.repeat(parameters.ravel()[None], len(perturbed), axis=0)
+    batch_rho = np.full(len(perturbed), float(rho))
+    is_rho = perturbed == size
+    rows = np.flatnonzero(~is_rho)
+    batch_parameters[rows, perturbed[rows]] += changes[rows]
+    batch_rho[is_rho] += changes[is_rho]
+    return batch_rho, np.clip(batch_parameters, 0, 1).reshape((len(perturbed),) + parameters.shape)
+
+
+def get_conditions(n, mode):
+    """
+    Get the kind and the predictors of each condition of a degenerate partition (conditions x 4, repeating the last
+    predictor of the conditions of fewer predictors)
+    """
+    kinds = []
+    ids = []
+    for kind, (size, _, _) in enumerate(CONDITION_KINDS[mode]):
+        combination_ids = np.array(list(combinations(range(n), size)), dtype=int).reshape(-1, size)
+        kinds.append(np.full(len(combination_ids), kind))
+        ids.append(combination_ids[:, np.minimum(np.arange(4), size - 1)])
+    return np.concatenate(kinds), np.concatenate(ids)
+
+
+def get_condition_lines(costs, kinds, mode):
+    """
+    Get the slope u and intercept w of the costs (conditions x 4 x 3 coefficients) along the edge, end or vertex
+    of each condition
+    """
+    projections = np.array([projection or [[0, 0, 0], [0, 0, 0]] for _, projection, _ in CONDITION_KINDS[mode]],
+                           dtype=float)[kinds]
+    return np.einsum('...ij,...j->...i', costs, projections[..., 0, :]), \
+        np.einsum('...ij,...j->...i', costs, projections[..., 1, :])
+
+
+def get_degeneracy_values(coefficients, kinds, ids, mode):
+    """
+    Get the values of each batch that are zero when the partition is degenerate (batches x conditions): four costs
+    equal on a point, three costs equal on an edge of the cost space or two costs equal on one of its vertices
+    (three costs equal on a point or two costs equal on an end of [0, 1] without coverage)
+    """
+    costs = coefficients[:, ids]
+    sizes = np.array([size for size, _, _ in CONDITION_KINDS[mode]])[kinds]
+    u, w = get_condition_lines(costs, kinds, mode)
+    # Three lines are concurrent when the determinant of their rows (u, 1, w) is zero
+    values = np.where(sizes == 2, w[..., 1] - w[..., 0], (u[..., 1] - u[..., 0]) * (w[..., 2] - w[..., 0]) -
+                      (u[..., 2] - u[..., 0]) * (w[..., 1] - w[..., 0]))
+    if mode == 'rej':
+        # Four planes are concurrent when the lines where the first one equals each other one are concurrent
+        lines = costs[:, kinds == 0, 1:] - costs[:, kinds == 0, :1]
+        values[:, kinds == 0] = np.einsum('...i,...i', lines[..., 0, :], np.cross(lines[..., 1, :], lines[..., 2, :]))
+    return values
+
+
+def get_batch_degeneracy_values(rho, parameters, kinds, ids, mode):
+    """
+    Get the degeneracy values of each batch, processing the batches in chunks to bound the memory of the costs
+    of the predictors of each condition
+    """
+    chunk_size = max(1, CHUNK_COSTS // (12 * max(1, len(kinds))))
+    values = np.empty((len(parameters), len(kinds)))
+    for start in range(0, len(parameters), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        values[chunk] = get_degeneracy_values(get_coefficients(rho[chunk], parameters[chunk], mode), kinds, ids, mode)
+    return values
+
+
+def get_envelope_conditions(coefficients, kinds, ids, mode):
+    """
+    Get whether the point of the condition of each batch is in the cost space, with the lowest cost (only these
+    degenerate partitions can change the predictors with a non-zero fraction)
+    The point is the intersection of the best conditioned pair of lines where the first cost equals another one,
+    and the conditions without a point (lines that are all the same or parallel) are kept
+    """
+    costs = coefficients[np.arange(len(kinds))[:, None], ids]
+    u, w = get_condition_lines(costs, kinds, mode)
+    sizes = np.array([size for size, _, _ in CONDITION_KINDS[mode]])[kinds]
+    x0, dx, y0, dy = np.array([point or [0, 0, 0, 0] for _, _, point in CONDITION_KINDS[mode]], dtype=float)[kinds].T
+    slopes, intercepts = u[:, 1:3] - u[:, :1], w[:, 1:3] - w[:, :1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sines = np.abs(slopes) / np.hypot(slopes, intercepts)
+        best = np.nan_to_num(sines).argmax(axis=1)[:, None]
+        t = -np.take_along_axis(intercepts, best, axis=1)[:, 0] / np.take_along_axis(slopes, best, axis=1)[:, 0]
+        t[~(np.take_along_axis(sines, best, axis=1)[:, 0] > POINT_TOLERANCE)] = np.nan
+        t[sizes == 2] = 0.0
+        x, y = x0 + dx * t, y0 + dy * t
+    if mode == 'rej':
+        lines = costs[kinds == 0, 1:] - costs[kinds == 0, :1]
+        pairs = np.array([[0, 1], [0, 2], [1, 2]])
+        lines_1, lines_2 = lines[:, pairs[:, 0]], lines[:, pairs[:, 1]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sines = np.abs(lines_1[..., 0] * lines_2[..., 1] - lines_2[..., 0] * lines_1[..., 1]) / \
+                (np.hypot(lines_1[..., 0], lines_1[..., 1]) * np.hypot(lines_2[..., 0], lines_2[..., 1]))
+        best = np.nan_to_num(sines).argmax(axis=1)
+        rows = np.arange(len(lines))
+        quadruple_x, quadruple_y = get_line_intersections(lines_1[rows, best], lines_2[rows, best])
+        conditioned = sines[rows, best] > POINT_TOLERANCE
+        x[kinds == 0] = np.where(conditioned, quadruple_x, np.nan)
+        y[kinds == 0] = np.where(conditioned, quadruple_y, np.nan)
+    with np.errstate(invalid='ignore'):
+        lowest = (x[:, None] * coefficients[..., 0] + y[:, None] * coefficients[..., 1] +
+                  coefficients[..., 2]).min(axis=1)
+        cost = x * costs[:, 0, 0] + y * costs[:, 0, 1] + costs[:, 0, 2]
+        inside = (x >= -POINT_TOLERANCE) & (y >= -POINT_TOLERANCE) & (x + y <= 1 + POINT_TOLERANCE)
+    return np.isnan(x) | np.isnan(y) | (inside & (cost <= lowest + POINT_TOLERANCE))
+
+
+def get_critical_values(rho, parameters, mode):
+    """
+    Get the values of each parameter of each predictor and of rho (the others unchanged) in [0, 1] where the
+    partition is degenerate on the lowest cost, ordered as the rows of the parameters and then rho
+    The degeneracy values are affine in a parameter, so their zeros come from their values on 0 and 1, and cubic in
+    rho (a determinant of rows that are affine in rho), so their zeros come from their values on four points
+    """
+    size = parameters.size
+    kinds, ids = get_conditions(parameters.shape[0], mode)
+    values = np.append(parameters.ravel(), rho)
+    perturbed = np.repeat(np.arange(size), 2)
+    changes = np.tile([0.0, 1.0], size) - np.repeat(values[:-1], 2)
+    ends = get_batch_degeneracy_values(*get_perturbed_inputs(rho, parameters, perturbed, changes), kinds, ids, mode)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roots = ends[0::2] / (ends[0::2] - ends[1::2])
+    value_ids, conditions = np.nonzero((roots >= 0) & (roots <= 1))
+    roots = roots[value_ids, conditions]
+
+    rho_points = np.arange(4) / 3
+    rho_values = get_batch_degeneracy_values(*get_perturbed_inputs(rho, parameters, np.full(4, size),
+                                                                   rho_points - rho), kinds, ids, mode)
+    polynomials = np.linalg.solve(np.vander(rho_points, increasing=True), rho_values).T
+    polynomials[np.abs(polynomials) <= POLYNOMIAL_TOLERANCE * np.abs(polynomials).max(axis=1, keepdims=True)] = 0
+    rho_conditions = []
+    rho_roots = []
+    for condition in np.flatnonzero(polynomials.any(axis=1)):
+        polynomial_roots = np.roots(polynomials[condition, ::-1])
+        polynomial_roots = polynomial_roots.real[np.abs(polynomial_roots.imag) <= ROOT_TOLERANCE]
+        polynomial_roots = polynomial_roots[(polynomial_roots >= 0) & (polynomial_roots <= 1)]
+        rho_conditions.append(np.full(len(polynomial_roots), condition))
+        rho_roots.append(polynomial_roots)
+    value_ids = np.concatenate([value_ids, np.full(sum(map(len, rho_roots)), size)]).astype(int)
+    conditions = np.concatenate([conditions] + rho_conditions).astype(int)
+    roots = np.concatenate([roots] + rho_roots)
+
+    batch_rho, batch_parameters = get_perturbed_inputs(rho, parameters, value_ids, roots - values[value_ids])
+    envelope = get_envelope_conditions(get_coefficients(batch_rho, batch_parameters, mode), kinds[conditions],
+                                       ids[conditions], mode)
+    return [np.unique(roots[envelope & (value_ids == value_id)]) for value_id in range(size + 1)]
+
+
+def get_stability_radii(rho, predictors, mode='rej'):
+    """
+    Get the predictors with a non-zero fraction, the largest decrease and increase of each parameter of each
+    predictor that keeps them ({predictor: {parameter: [decrease, increase]}}) and the ones of rho ([decrease,
+    increase]), which are the distance to the bound of the value if the predictors never change
+    """
+    if mode not in MODE_PARAMETERS:
+        raise Exception(f'ERROR: stability mode {mode} unknown')
+    parameters = np.array(list(predictors.values()), dtype=float).reshape(len(predictors), -1)
+    support = get_batch_margins(np.array([float(rho)]), parameters[None], mode)[0] > MARGIN_TOLERANCE
+
+    with stage('get_stability_radii'):
+        perturbed, directions, largest_changes = get_perturbations(rho, parameters)
+        count('perturbations', len(perturbed))
+        values = np.append(parameters.ravel(), rho)
+        critical_values = get_critical_values(rho, parameters, mode)
+
+        # The predictors can only change on the critical changes, so they are checked on each of them and on the
+        # middle of each interval between them, from the smallest change
+        batches = []
+        for i, (value_id, direction, largest_change) in enumerate(zip(perturbed, directions, largest_changes)):
+            changes = direction * (critical_values[value_id] - values[value_id])
+            changes = np.unique(changes[(changes > 0) & (changes <= largest_change)])
+            ends = np.concatenate([[0.0], changes, [largest_change]])
+            middles = (ends[:-1] + ends[1:]) / 2
+            points = np.stack([middles, np.append(changes, np.nan)], axis=1).ravel()[:-1]
+            batches.append((np.full(len(points), i), points, np.repeat(ends[:-1], 2)[1:]))
+        batch_ids, batch_changes, batch_radii = [np.concatenate(arrays) for arrays in zip(*batches)]
+        count('checked_changes', len(batch_changes))
+        distances = get_support_distance(get_batch_margins(*get_perturbed_inputs(
+            rho, parameters, perturbed[batch_ids], directions[batch_ids] * batch_changes), mode), support)
+
+        # The radius is the last critical change before the first change of the predictors
+        radii = largest_changes.copy()
+        changed = np.flatnonzero(distances <= 0)
+        first_changes = changed[np.unique(batch_ids[changed], return_index=True)[1]]
+        radii[batch_ids[first_changes]] = batch_radii[first_changes]
+        radii = radii.reshape(-1, 2)
+
+    n_parameters = len(MODE_PARAMETERS[mode])
+    return ([predictor for predictor, supported in zip(predictors, support.tolist()) if supported],
+            {predictor: dict(zip(MODE_PARAMETERS[mode], radii[i * n_parameters:(i + 1) * n_parameters].tolist()))
+             for i, predictor in enumerate(predictors)},
+            radii[-1].tolist())
+
+
+def print_stability_radii(rho, predictors, support, radii, rho_radii):
+    spaces_predictors = len(max(list(predictors) + ['Predictor'], key=lambda p: len(p)))
+    print('\nSTABILITY RADIUS')
+    print('----------------\n')
+    print('Predictors with a non-zero clinical space fraction (rho={}): {}\n'.format(rho, ', '.join(support)))
+    print('Largest decrease and increase of each parameter that keep these predictors:\n')
+    print('{: <{spaces}}\tParameter  \tDecrease\tIncrease'.format('Predictor', spaces=spaces_predictors))
+    print('{: <{spaces}}\t---------  \t--------\t--------'.format('---------', spaces=spaces_predictors))
+    rows = [('', 'rho', rho_radii)] + [(predictor, parameter, parameter_radii)
+                                        for predictor in predictors
+                                        for parameter, parameter_radii in radii[predictor].items()]
+    for predictor, parameter, (decrease, increase) in rows:
+        print('{: <{spaces}}\t{: <11}\t{:<8.4g}\t{:.4g}'.format(predictor, parameter, decrease, increase,
+                                                               spaces=spaces_predictors))
+
+
+def main(rho, predictors, mode='rej'):
+    """
+    Get how far each parameter can change before the predictors with a non-zero clinical space fraction change
+    """
+    support, radii, rho_radii = get_stability_radii(rho, predictors, mode)
+
+    # Output
+    print_stability_radii(rho, predictors, support, radii, rho_radii)
+    return support, radii, rho_radii
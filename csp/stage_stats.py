@@ -0,0 +1,113 @@
+"""
+Opt-in instrumentation of the stages of the cost space partition: wall time, peak memory and counts of each stage
+"""
+
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+THREAD_STATS = threading.local()
+
+
+def get_active_stats():
+    """
+    Get the stats being collected in the current thread, so concurrent partitions don't record each other's stages
+    """
+    if not hasattr(THREAD_STATS, 'active'):
+        THREAD_STATS.active = []
+    return THREAD_STATS.active
+
+
+@contextmanager
+def collect_stats(callback=None):
+    """
+    Collect the stats of the stages run inside the context, calling callback with the record of each finished stage
+    """
+    stats = {'retry': False, 'stages': []}
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    active_stats = get_active_stats()
+    active_stats.append({'stats': stats, 'callback': callback, 'open_stages': [], 'open_memory': []})
+    try:
+        yield stats
+    finally:
+        active_stats.pop()
+        if not tracing:
+            tracemalloc.stop()
+
+
+def fold_peak(active_stats, peak):
+    """
+    Keep the peak traced memory of the open stages up to peak, before the peak of tracemalloc is reset
+    """
+    for active in active_stats:
+        for memory in active['open_memory']:
+            memory[1] = max(memory[1], peak)
+
+
+@contextmanager
+def stage(name, **values):
+    """
+    Record the wall time, peak memory (above the traced memory at its start) and counts of a stage if the stats are
+    being collected
+    The peak of tracemalloc is reset at the start of each stage, so the stages that are open keep the peak so far
+    """
+    active_stats = get_active_stats()
+    if not active_stats:
+        yield None
+        return
+    active = active_stats[-1]
+    record = {'stage': name, **values, 'counts': {}}
+    active['stats']['stages'].append(record)
+    active['open_stages'].append(record)
+    current_memory, peak_memory = tracemalloc.get_traced_memory()
+    fold_peak(active_stats, peak_memory)
+    tracemalloc.reset_peak()
+    active['open_memory'].append([current_memory, current_memory])
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        start_memory, peak_memory = active['open_memory'].pop()
+        peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+        record['peak_memory'] = peak_memory - start_memory
+        fold_peak(active_stats, peak_memory)
+        active['open_stages'].pop()
+        if active['callback']:
+            active['callback'](record)
+
+
+def count(name, value=1):
+    """
+    Add value to a count of the current stage
+    """
+    active_stats = get_active_stats()
+    if active_stats and active_stats[-1]['open_stages']:
+        counts = active_stats[-1]['open_stages'][-1]['counts']
+        counts[name] = counts.get(name, 0) + value
+
+
+def set_stat(name, value):
+    """
+    Set a value of the stats being collected
+    """
+    active_stats = get_active_stats()
+    if active_stats:
+        active_stats[-1]['stats'][name] = value
+
+
+def write_stats(stats, filename):
+    """
+    Write the stats as JSON to a file, or to the standard output if filename is '-'
+    """
+    if filename == '-':
+        print(json.dumps(stats, indent=1))
+    else:
+        with open(filename, 'w') as output:
+            json.dump(stats, output, indent=1)
+            output.write('\n')
+
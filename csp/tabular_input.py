@@ -0,0 +1,209 @@
+"""
+Read the predictors from CSV, TSV or Parquet tables, optionally grouped by a column into independent runs
+
+With curves, each predictor has a row for each threshold of its curve of operating points.
+
+The rows are read in chunks into NumPy arrays that are validated at once, and all the errors of the table are
+reported together.
+"""
+
+import os
+import csv
+import sys
+import numpy as np
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+TABLE_CHUNK_ROWS = 65536
+TABLE_DELIMITERS = {'.csv': ',', '.tsv': '\t'}
+PARAMETER_COLUMNS = {'rej': ['sensitivity', 'specificity', 'coverage'], 'norej': ['sensitivity', 'specificity']}
+
+
+def is_table(filename):
+    """
+    Check if a file is a table by its extension
+    """
+    return os.path.splitext(filename)[1].lower() in list(TABLE_DELIMITERS) + ['.parquet']
+
+
+def check_columns(header, columns):
+    """
+    Exit if the header doesn't have the required columns
+    """
+    missing_columns = [column for column in columns if column not in header]
+    if missing_columns:
+        sys.exit('The table should have the column(s) ' + ', '.join(missing_columns))
+
+
+def iter_csv_chunks(filename, columns, delimiter, chunk_rows, errors):
+    """
+    Get the chunks of string arrays of the columns of a CSV or TSV table and the numbers of their rows
+    """
+    with open(filename, newline='') as table:
+        reader = csv.reader(table, delimiter=delimiter)
+        header = [column.strip().lower() for column in next(reader, [])]
+        check_columns(header, columns)
+        indices = [header.index(column) for column in columns]
+        rows = []
+        row_numbers = []
+        for row_number, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            if len(row) != len(header):
+                errors.append('row {}: it has {} fields but the header has {}'.format(row_number, len(row),
+                                                                                     len(header)))
+                continue
+            rows.append([row[i] for i in indices])
+            row_numbers.append(row_number)
+            if len(rows) == chunk_rows:
+                yield dict(zip(columns, np.array(rows, dtype=str).T)), np.array(row_numbers)
+                rows = []
+                row_numbers = []
+        if rows:
+            yield dict(zip(columns, np.array(rows, dtype=str).T)), np.array(row_numbers)
+
+
+def iter_parquet_chunks(filename, columns, chunk_rows):
+    """
+    Get the chunks of arrays of the columns of a Parquet table and the numbers of their rows
+    """
+    if pq is None:
+        sys.exit('Reading Parquet tables requires pyarrow')
+    parquet_file = pq.ParquetFile(filename)
+    names = {name.strip().lower(): name for name in parquet_file.schema_arrow.names}
+    check_columns(names, columns)
+    first_row = 1
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=[names[column] for column in columns]):
+        yield ({column: batch.column(i).to_numpy(zero_copy_only=False) for i, column in enumerate(columns)},
+               np.arange(first_row, first_row + batch.num_rows))
+        first_row += batch.num_rows
+
+
+def get_float_column(values, column, names, rows, errors):
+    """
+    Get the values of a column as floats, with NaN in the values that aren't finite numbers
+    (NaN, infinite and null values included)
+    """
+    try:
+        floats = np.array(values, dtype=float)
+    except ValueError:
+        floats = np.full(len(values), np.nan)
+        for i, value in enumerate(values.tolist()):
+            try:
+                floats[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+    not_finite = ~np.isfinite(floats)
+    for i in np.flatnonzero(not_finite):
+        errors.append('row {}: {} {} is {} but should be a number'.format(rows[i], names[i], column, values[i]))
+    floats[not_finite] = np.nan
+    return floats
+
+
+def validate_chunk(chunk, rows, mode, group_by, read_rho, errors):
+    """
+    Get the names, groups, rho and parameters of a chunk, adding the errors of its values
+    """
+    names = np.char.strip(np.asarray(chunk['predictor']).astype(str))
+    for row in rows[names == '']:
+        errors.append('row {}: the predictor name is missing'.format(row))
+    groups = np.char.strip(np.asarray(chunk[group_by]).astype(str)) if group_by else np.full(len(rows), '')
+
+    parameters = np.column_stack([get_float_column(chunk[column], column, names, rows, errors)
+                                  for column in PARAMETER_COLUMNS[mode]])
+    rounded_parameters = np.round(parameters, 3)
+    for i, j in zip(*np.nonzero(~np.isnan(parameters) & ~((0 <= rounded_parameters) & (rounded_parameters <= 1)))):
+        errors.append('row {}: {} {} is {} but should be between 0 - 1'.format(
+            rows[i], names[i], PARAMETER_COLUMNS[mode][j], parameters[i, j]))
+
+    rho = np.full(len(rows), np.nan)
+    if read_rho:
+        rho = get_float_column(chunk['rho'], 'rho', names, rows, errors)
+        for i in np.nonzero(~np.isnan(rho) & ~((0.00001 <= rho) & (rho <= 1)))[0]:
+            errors.append('row {}: the rho value {} should be between 0.00001 - 1'.format(rows[i], rho[i]))
+    return names, groups, rho, parameters
+
+
+def round_parameters(parameters):
+    """
+    Round the parameters to 3 decimals as parse_config, with Python's correctly rounded round only where needed
+    """
+    rounded_parameters = parameters.copy()
+    for i, j in zip(*np.nonzero(np.round(parameters, 3) != parameters)):
+        rounded_parameters[i, j] = round(parameters[i, j].item(), 3)
+    return rounded_parameters
+
+
+def get_group_runs(names, groups, rhos, parameters, rows, group_by, rho, errors, thresholds=None):
+    """
+    Get the group, rho and predictors of each group in order of appearance,
+    the predictors being a list of [threshold, *parameters] points for each predictor if the thresholds are given
+    """
+    runs = []
+    names = names.tolist()
+    parameters = round_parameters(parameters)
+    _, first_indices, inverse = np.unique(groups, return_index=True, return_inverse=True)
+    # Rows sorted by group keeping their order, split at the start of each group
+    group_indices = np.split(np.argsort(inverse.ravel(), kind='stable'), np.cumsum(np.bincount(inverse.ravel()))[:-1])
+    for group_id in np.argsort(first_indices, kind='stable'):
+        indices = group_indices[group_id]
+        group = str(groups[indices[0]]) if group_by else None
+        group_name = '' if group is None else '{} {}: '.format(group_by, group)
+        if rho is None:
+            group_rhos = np.unique(rhos[indices][~np.isnan(rhos[indices])])
+            if len(group_rhos) > 1:
+                errors.append(group_name + 'the rho values should be the same but they are ' +
+                              ', '.join(map(str, group_rhos.tolist())))
+            group_rho = group_rhos[0].item() if len(group_rhos) else None
+        else:
+            group_rho = rho
+        predictors = {}
+        for i in indices.tolist():
+            if thresholds is not None:
+                predictors.setdefault(names[i], []).append([thresholds[i].item()] + parameters[i].tolist())
+                continue
+            if names[i] in predictors:
+                errors.append('row {}: {}the predictor {} is repeated'.format(rows[i], group_name, names[i]))
+            predictors[names[i]] = parameters[i].tolist()
+        runs.append((group, group_rho, predictors))
+    return runs
+
+
+def parse_table(filename, mode, rho=None, group_by=None, chunk_rows=TABLE_CHUNK_ROWS, curves=False):
+    """
+    Parse the predictor's parameters of a table into a list of (group, rho, predictors) runs, one for each value
+    of the group_by column, taking rho from its column if it isn't given
+    With curves, the rows of a predictor are the points of its curve with their threshold column
+    """
+    if mode not in PARAMETER_COLUMNS:
+        raise Exception(f'ERROR: table mode {mode} unknown')
+    if rho is not None and not 0.00001 <= rho <= 1:
+        sys.exit('The rho value ' + str(rho) + ' should be between 0.00001 - 1')
+    group_by = group_by.strip().lower() if group_by else None
+    columns = ['predictor'] + (['threshold'] if curves else []) + PARAMETER_COLUMNS[mode] + \
+        (['rho'] if rho is None else []) + ([group_by] if group_by else [])
+
+    errors = []
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.parquet':
+        chunks = iter_parquet_chunks(filename, columns, chunk_rows)
+    else:
+        chunks = iter_csv_chunks(filename, columns, TABLE_DELIMITERS.get(extension, ','), chunk_rows, errors)
+    chunk_arrays = []
+    for chunk, rows in chunks:
+        names, groups, rhos, parameters = validate_chunk(chunk, rows, mode, group_by, rho is None, errors)
+        thresholds = get_float_column(chunk['threshold'], 'threshold', names, rows, errors) if curves else \
+            np.full(len(rows), np.nan)
+        chunk_arrays.append((names, groups, rhos, parameters, thresholds, rows))
+    if not chunk_arrays:
+        sys.exit('\n'.join(errors) or 'The predictor(s) are missing')
+
+    names, groups, rhos, parameters, thresholds, rows = [np.concatenate(arrays) for arrays in zip(*chunk_arrays)]
+    runs = get_group_runs(names, groups, rhos, parameters, rows, group_by, rho, errors,
+                          thresholds if curves else None)
+    if errors:
+        sys.exit('\n'.join(errors))
+    return runs
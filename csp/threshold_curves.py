@@ -0,0 +1,117 @@
+"""
+Cost space partition without coverage of predictors given by a curve of operating points (one for each threshold)
+
+Each operating point is a cost line on [0, 1], and the best predictor and threshold at each x is the lowest line.
+The lower envelope of all the lines is built with a stack over the lines sorted by slope (convex hull trick)
+in O(L log L) instead of intersecting every pair of lines.
+"""
+
+import numpy as np
+from obtain_predictor_intervals import get_batch_predictor_lines
+from csp_norej import print_output
+from csp_rej import print_float
+from stage_stats import stage, count
+
+
+def get_curve_lines(rho, curves):
+    """
+    Get the slope, intercept, predictor and threshold of the cost line of each point of the curves
+    curves: dictionary of the [threshold, sensitivity, specificity] points of each predictor
+    """
+    points = np.concatenate([np.asarray(points, dtype=float).reshape(-1, 3) for points in curves.values()])
+    slopes, intercepts = get_batch_predictor_lines(points[None, :, 1:], rho)
+    predictor_ids = np.repeat(np.arange(len(curves)), [len(points) for points in curves.values()])
+    return slopes[0], intercepts[0], predictor_ids, points[:, 0]
+
+
+def get_lower_envelope(slopes, intercepts):
+    """
+    Get the lines of the lower envelope on [0, 1] from left to right and the points where each one starts and ends
+    (ties keep the first line)
+    """
+    # Lines from the highest to the lowest slope; of the lines with the same slope only the lowest can be the best
+    order = np.lexsort((np.arange(len(slopes)), intercepts, -slopes))
+    order = order[np.r_[True, slopes[order][1:] != slopes[order][:-1]]]
+
+    hull = []
+    starts = []
+    for line in order.tolist():
+        start = -np.inf
+        while hull:
+            start = (intercepts[line] - intercepts[hull[-1]]) / (slopes[hull[-1]] - slopes[line])
+            if start > starts[-1]:
+                break
+            # The last line of the hull is never below the new one and the previous one
+            hull.pop()
+            starts.pop()
+            start = -np.inf
+        hull.append(line)
+        starts.append(start)
+
+    starts = np.clip(starts, 0, 1)
+    ends = np.append(starts[1:], 1)
+    inside = ends > starts
+    return np.array(hull)[inside], starts[inside], ends[inside]
+
+
+def get_threshold_segments(rho, curves):
+    """
+    Get the (start, end, best predictor, best threshold) segments of [0, 1], merging adjacent segments
+    with the same predictor and threshold
+    """
+    with stage('get_curve_lines'):
+        slopes, intercepts, predictor_ids, thresholds = get_curve_lines(rho, curves)
+        count('lines', len(slopes))
+    with stage('get_lower_envelope'):
+        lines, starts, ends = get_lower_envelope(slopes, intercepts)
+        count('segments', len(lines))
+
+    predictors = list(curves)
+    threshold_segments = []
+    for line, start, end in zip(lines.tolist(), starts.tolist(), ends.tolist()):
+        predictor, threshold = predictors[predictor_ids[line]], thresholds[line].item()
+        if threshold_segments and threshold_segments[-1][2:] == (predictor, threshold):
+            threshold_segments[-1] = (threshold_segments[-1][0], end, predictor, threshold)
+        else:
+            threshold_segments.append((start, end, predictor, threshold))
+    return threshold_segments
+
+
+def get_curve_intervals(threshold_segments):
+    """
+    Get the total length of the segments of each best predictor (its region can be split between thresholds)
+    """
+    merged_intervals = {}
+    for start, end, predictor, _ in threshold_segments:
+        merged_intervals[predictor] = merged_intervals.get(predictor, 0.0) + end - start
+    return merged_intervals
+
+
+def get_curve_partition(rho, curves):
+    """
+    Get the merged intervals of each best predictor and the best threshold segments
+    """
+    threshold_segments = get_threshold_segments(rho, curves)
+    return get_curve_intervals(threshold_segments), threshold_segments
+
+
+def print_curve_output(rho, curves, merged_intervals, threshold_segments):
+    print_output(rho, curves, merged_intervals)
+    spaces_predictors = len(max(list(curves) + ['Predictor'], key=lambda p: len(p)))
+    print('\nBest threshold of the best predictor along the cost space:\n')
+    print('From\tTo\t{: <{spaces}}\tThreshold'.format('Predictor', spaces=spaces_predictors))
+    print('----\t--\t{: <{spaces}}\t---------'.format('---------', spaces=spaces_predictors))
+    for start, end, predictor, threshold in threshold_segments:
+        print('{}\t{}\t{: <{spaces}}\t{}'.format(print_float(start), print_float(end), predictor, threshold,
+                                                 spaces=spaces_predictors))
+
+
+def main(rho, curves):
+    """
+    Get the cost space partition without coverage of the curves of the predictors
+    """
+    merged_intervals, threshold_segments = get_curve_partition(rho, curves)
+
+    # Output
+    print_curve_output(rho, curves, merged_intervals, threshold_segments)
+    return merged_intervals, threshold_segments
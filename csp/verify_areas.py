@@ -0,0 +1,120 @@
+"""
+Verify the areas of the cost space partition with a randomized quasi-Monte Carlo estimation
+
+Each replicate shifts (modulo 1) the same Halton sequence by a random vector, so the replicates are independent
+unbiased estimations of the areas and their spread gives the confidence intervals.
+"""
+
+import math
+from statistics import NormalDist
+import numpy as np
+from obtain_polygon_data import get_predictors_cost_matrix
+
+TRIANGLE_AREA = 0.5
+HALTON_BASES = (2, 3)
+
+
+def get_radical_inverse(indices, base):
+    """
+    Get the radical inverse of the indices in a base (van der Corput sequence)
+    """
+    indices = np.array(indices, dtype=np.int64)
+    inverse = np.zeros(len(indices))
+    factor = 1 / base
+    while indices.any():
+        inverse += (indices % base) * factor
+        indices //= base
+        factor /= base
+    return inverse
+
+
+def get_halton_points(start, count):
+    """
+    Get count points of the 2D Halton sequence starting at index start
+    """
+    indices = np.arange(start, start + count)
+    return np.stack([get_radical_inverse(indices, base) for base in HALTON_BASES], axis=1)
+
+
+def get_triangle_points(points):
+    """
+    Fold the points of the unit square into the cost space triangle, keeping them uniformly distributed
+    """
+    outside = points.sum(axis=1) > 1
+    points[outside] = 1 - points[outside]
+    return points
+
+
+def get_t_quantile(probability, df):
+    """
+    Get the quantile of the Student's t distribution (Cornish-Fisher expansion around the normal quantile)
+    """
+    z = NormalDist().inv_cdf(probability)
+    return (z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+
+
+def get_replicate_counts(rho, predictors, shift, samples, chunk_size):
+    """
+    Count the samples of a shifted Halton sequence in which each predictor is the best one, streaming them in chunks
+    """
+    counts = np.zeros(len(predictors), dtype=np.int64)
+    for start in range(0, samples, chunk_size):
+        points = get_triangle_points((get_halton_points(start + 1, min(chunk_size, samples - start)) + shift) % 1)
+        best_predictors = get_predictors_cost_matrix(points[:, 0], points[:, 1], rho, predictors).argmin(axis=1)
+        counts += np.bincount(best_predictors, minlength=len(predictors))
+    return counts
+
+
+def get_qmc_areas(rho, predictors, samples, replicates=32, confidence=0.99, seed=None, chunk_size=1000000):
+    """
+    Get the quasi-Monte Carlo estimation of the area of each predictor and its confidence interval
+    """
+    rng = np.random.default_rng(seed)
+    replicate_samples = math.ceil(samples / replicates)
+    replicate_areas = np.array([get_replicate_counts(rho, predictors, rng.random(2), replicate_samples, chunk_size)
+                                for _ in range(replicates)]) * TRIANGLE_AREA / replicate_samples
+    areas = replicate_areas.mean(axis=0)
+    half_widths = (get_t_quantile((1 + confidence) / 2, replicates - 1) * replicate_areas.std(axis=0, ddof=1)
+                   / math.sqrt(replicates))
+    # An area smaller than the one of a sample can be missed by all the replicates
+    half_widths = np.maximum(half_widths, TRIANGLE_AREA / replicate_samples)
+    return {predictor: (area, area - half_width, area + half_width)
+            for predictor, area, half_width in zip(predictors, areas.tolist(), half_widths.tolist())}
+
+
+def get_flagged_predictors(predictor_areas, qmc_areas):
+    """
+    Get the predictors whose exact area is outside the confidence interval of the quasi-Monte Carlo estimation
+    """
+    return [predictor for predictor, (_, low, high) in qmc_areas.items()
+            if not low <= predictor_areas[predictor] <= high]
+
+
+def print_output(predictor_areas, qmc_areas, samples, confidence=0.99):
+    flagged_predictors = get_flagged_predictors(predictor_areas, qmc_areas)
+    sorted_predictors = sorted(qmc_areas, key=lambda p: (-predictor_areas[p], p))
+    spaces_predictors = len(max(list(qmc_areas) + ['Predictor'], key=lambda p: len(p)))
+    print('\nQUASI-MONTE CARLO VERIFICATION')
+    print('------------------------------\n')
+    print('Samples: {}\n'.format(samples))
+    print('Predictors outside the {:g}% confidence interval: {}\n'.format(100 * confidence,
+                                                                          ', '.join(flagged_predictors) or 'none'))
+    print('{: <{spaces}}\tAbsolute value\tQMC estimate\tConfidence interval'.format('Predictor',
+                                                                                 spaces=spaces_predictors))
+    print('{: <{spaces}}\t--------------\t------------\t-------------------'.format('---------',
+                                                                                 spaces=spaces_predictors))
+    for predictor in sorted_predictors:
+        area, low, high = qmc_areas[predictor]
+        print('{: <{spaces}}\t{:.6f}      \t{:.6f}    \t{:.6f} - {:.6f}{}'.format(
+            predictor, predictor_areas[predictor], area, max(low, 0), high,
+            '\t*' if predictor in flagged_predictors else '', spaces=spaces_predictors))
+
+
+def main(rho, predictors, predictor_areas, samples, seed=None):
+    """
+    Verify the areas of the cost space partition of given predictors with coverage
+    """
+    qmc_areas = get_qmc_areas(rho, predictors, samples, seed=seed)
+    print_output(predictor_areas, qmc_areas, samples)
+    return get_flagged_predictors(predictor_areas, qmc_areas)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from csp import approximate_areas, csp_rej
+
+
+def test_get_triangle_grid():
+    cells = approximate_areas.get_triangle_grid(3)
+    assert cells.shape == (64, 3, 2)
+    assert np.isclose(approximate_areas.get_cells_area(cells).sum(), 0.5)
+    assert np.isclose(approximate_areas.get_cells_area(approximate_areas.split_cells(cells)).sum(), 0.5)
+
+
+def test_get_approximate_partition_error_bound():
+    rho = 0.5
+    predictors = {
+        'PolyPhen-2': [0.926, 0.638, 0.909],
+        'SIFT': [0.924, 0.682, 0.866],
+        'CADD': [0.995, 0.254, 1]
+    }
+    _, predictor_relative_areas = csp_rej.get_partition(rho, predictors)
+    for tolerance in [0.01, 0.001]:
+        areas, relative_areas, error_bounds = approximate_areas.get_approximate_partition(rho, predictors, tolerance)
+        assert max(error_bounds.values()) <= tolerance
+        assert np.isclose(sum(areas.values()), 0.5)
+        for predictor in predictors:
+            assert abs(relative_areas[predictor] - predictor_relative_areas[predictor]) <= error_bounds[predictor]
+
+
+def test_perfect_predictor_exact():
+    predictors = {
+        'predictor1': [1.0, 1.0, 1.0],
+        'predictor2': [0.83, 0.92, 1.0],
+        'predictor3': [0.95, 0.95, 0.9]
+    }
+    _, relative_areas, error_bounds = approximate_areas.get_approximate_partition(0.5, predictors, 0.01)
+    assert relative_areas == {'predictor1': 1.0, 'predictor2': 0.0, 'predictor3': 0.0}
+    assert error_bounds == {'predictor1': 0.0, 'predictor2': 0.0, 'predictor3': 0.0}
+
+
+def test_print_output_approximate(capsys):
+    csp_rej.print_output(0.5, {'predictor1': [], 'predictor2': []}, {'predictor1': 0.25, 'predictor2': 0.25},
+                         {'predictor1': 0.5, 'predictor2': 0.5}, {'predictor1': 0.0004, 'predictor2': 0.0004})
+    captured = capsys.readouterr()
+    assert 'Approximate partition' in captured.out
+    assert 'predictor1\t0.25\t\t0.5\t\t4.0e-04\n' in captured.out
+
+
+@pytest.mark.parametrize('tolerance', [0, -0.01, 1])
+def test_get_approximate_areas_tolerance(tolerance):
+    with pytest.raises(Exception, match='tolerance'):
+        approximate_areas.get_approximate_areas(0.5, {'predictor1': [0.9, 0.8, 1.0]}, tolerance)
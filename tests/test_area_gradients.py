@@ -0,0 +1,36 @@
+import copy
+import pytest
+from csp import csp_rej, area_gradients
+
+PREDICTORS = {
+    'PolyPhen-2': [0.926, 0.638, 0.909],
+    'SIFT': [0.924, 0.682, 0.866],
+    'CADD': [0.995, 0.254, 1.0],
+    'VEST': [0.971, 0.824, 0.937]
+}
+
+
+def test_gradients_same_as_finite_differences():
+    rho = 0.5
+    step = 1e-4
+    predictor_areas, _, parameter_gradients, rho_gradients = area_gradients.get_partition_gradients(rho, PREDICTORS)
+    assert predictor_areas == csp_rej.get_partition(rho, PREDICTORS)[0]
+    for other in PREDICTORS:
+        for k in range(3):
+            forward, backward = copy.deepcopy(PREDICTORS), copy.deepcopy(PREDICTORS)
+            forward[other][k] += step
+            backward[other][k] -= step
+            forward_areas, _ = csp_rej.get_partition(rho, forward)
+            backward_areas, _ = csp_rej.get_partition(rho, backward)
+            for predictor in PREDICTORS:
+                difference = (forward_areas[predictor] - backward_areas[predictor]) / (2 * step)
+                assert parameter_gradients[predictor][other][k] == pytest.approx(difference, abs=1e-3)
+            # The areas always add up to the area of the triangle
+            assert sum(parameter_gradients[predictor][other][k] for predictor in PREDICTORS) == \
+                pytest.approx(0, abs=1e-12)
+
+    forward_areas, _ = csp_rej.get_partition(rho + step, PREDICTORS)
+    backward_areas, _ = csp_rej.get_partition(rho - step, PREDICTORS)
+    for predictor in PREDICTORS:
+        difference = (forward_areas[predictor] - backward_areas[predictor]) / (2 * step)
+        assert rho_gradients[predictor] == pytest.approx(difference, abs=1e-3)
@@ -1,6 +1,7 @@
+import numpy as np
 import pytest
 
-from csp import csp_norej, obtain_predictor_intervals
+from csp import csp_norej, csp_rej, obtain_predictor_intervals
 
 
 @pytest.fixture
@@ -64,7 +65,7 @@ fathmm    	0
 
 
 def test_parse_config(base_case):
-    rho, predictors = csp_norej.parse_config(base_case['filename'], mode='norej')
+    rho, predictors = csp_rej.parse_config(base_case['filename'], mode='norej')
     assert rho == base_case['rho']
     assert predictors == base_case['predictors']
 
@@ -90,3 +91,26 @@ def test_get_interval_best_predictor(base_case):
 def test_merge_intervals(base_case):
     merged_intervals = obtain_predictor_intervals.merge_intervals(base_case['interval_best_predictors'])
     assert merged_intervals == base_case['merged_intervals']
+
+
+def test_get_batch_interval_lengths(base_case):
+    parameters = np.array([list(base_case['predictors'].values())] * 2)
+    interval_lengths = obtain_predictor_intervals.get_batch_interval_lengths(parameters, [base_case['rho'], 1.0])
+    merged_intervals = [base_case['merged_intervals'].get(predictor, 0) for predictor in base_case['predictors']]
+    assert np.allclose(interval_lengths[0], merged_intervals)
+    assert np.allclose(interval_lengths.sum(axis=1), 1.0)
+
+
+def test_get_batch_interval_lengths_chunks():
+    rng = np.random.default_rng(0)
+    parameters = np.round(rng.uniform(0, 1, (500, 5, 2)), 3)
+    rho = np.round(rng.uniform(0.00001, 1, 500), 3)
+    interval_lengths = obtain_predictor_intervals.get_batch_interval_lengths(parameters, rho)
+    for replicate in [0, 123, 499]:
+        predictors = {str(i): parameters[replicate, i].tolist() for i in range(5)}
+        x_points = obtain_predictor_intervals.get_predictors_intersections(rho[replicate], predictors)
+        merged_intervals = obtain_predictor_intervals.merge_intervals(
+            obtain_predictor_intervals.get_interval_best_predictor(rho[replicate], predictors, x_points))
+        assert np.allclose(interval_lengths[replicate], [merged_intervals.get(str(i), 0) for i in range(5)])
+    assert np.array_equal(interval_lengths,
+                          obtain_predictor_intervals.get_batch_interval_lengths(parameters, rho, chunk_size=7))
@@ -1,3 +1,4 @@
+import argparse
 import pytest
 
 from csp import csp_rej, find_predictor_intersections, build_intersection_graph, search_graph_polygons, \
@@ -430,3 +431,25 @@ def test_get_polygons_data(base_case):
         base_case['rho'], base_case['predictors'], base_case['polygons'])
     assert predictor_areas == base_case['predictor_areas']
     assert predictor_relative_areas == base_case['predictor_relative_areas']
+
+
+def test_check_options():
+    def get_args(**options):
+        args = dict(output_format='text', cache_dir=None, density=None, costs=False, stability=False, pairwise=False,
+                    curves=False, gradients=False, top_k=None, approximate=None, verify=None, export=None,
+                    budget=None, spill_faces=None, raster=None)
+        args.update(options)
+        return argparse.Namespace(**args)
+
+    csp_rej.check_options(get_args(costs=True, export='partition.npz', raster='raster'))
+    csp_rej.check_options(get_args(top_k=2, cache_dir='cache'))
+    with pytest.raises(SystemExit, match='Only one of --pairwise, --top-k can be given'):
+        csp_rej.check_options(get_args(pairwise=True, top_k=2))
+    with pytest.raises(SystemExit, match='--pairwise can not be combined with --density, --approximate'):
+        csp_rej.check_options(get_args(pairwise=True, density='density.config', approximate=0.01))
+    with pytest.raises(SystemExit, match='--gradients can not be combined with --output-format json'):
+        csp_rej.check_options(get_args(gradients=True, output_format='json'))
+    with pytest.raises(SystemExit, match='--stability can not be combined with --costs, --raster, --verify'):
+        csp_rej.check_options(get_args(stability=True, costs=True, raster='raster', verify=1000))
+    with pytest.raises(SystemExit, match='--approximate can not be combined with --budget'):
+        csp_rej.check_options(get_args(approximate=0.01, budget={'seconds': 1}))
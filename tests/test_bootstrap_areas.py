@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from csp import bootstrap_areas
+
+
+def test_parse_counts_config():
+    rho, counts = bootstrap_areas.parse_counts_config('../demo/csp-rej-counts.config')
+    assert rho == 0.5
+    assert counts['VEST'] == [910, 27, 772, 165, 126]
+    assert list(counts) == ['PolyPhen-2', 'SIFT', 'CADD', 'MutPred', 'VEST', 'fathmm']
+
+
+def test_get_counts_parameters():
+    parameters = bootstrap_areas.get_counts_parameters([[910, 27, 772, 165, 126], [995, 5, 254, 746, 0]])
+    assert parameters.tolist() == [[0.971, 0.824, 0.937], [0.995, 0.254, 1.0]]
+
+
+def test_get_bootstrap_parameters_seed():
+    counts = {'predictor1': [90, 10, 80, 20, 0], 'predictor2': [1, 0, 1, 0, 10]}
+    parameters = bootstrap_areas.get_bootstrap_parameters(counts, 50, seed=7)
+    assert parameters.shape == (50, 2, 3)
+    assert np.array_equal(parameters, bootstrap_areas.get_bootstrap_parameters(counts, 50, seed=7))
+    assert ((0 <= parameters) & (parameters <= 1)).all()
+    assert not np.isnan(parameters).any()
+
+
+def test_get_bootstrap_summary():
+    rho = 0.5
+    counts = {
+        'perfect': [1000, 0, 1000, 0, 0],
+        'predictor2': [83, 17, 92, 8, 0],
+        'predictor3': [95, 5, 95, 5, 22]
+    }
+    areas, relative_areas, in_best_combination = bootstrap_areas.get_bootstrap_areas(rho, counts, 3, seed=1,
+                                                                                     processes=1)
+    summary, valid_replicates = bootstrap_areas.get_bootstrap_summary(list(counts), areas, relative_areas,
+                                                                      in_best_combination)
+    assert valid_replicates == 3
+    assert summary['perfect'] == {'area': (0.5, 0.5), 'relative_area': (1.0, 1.0), 'best_probability': 1.0}
+    assert summary['predictor2']['best_probability'] == 0.0
+
+
+def test_get_bootstrap_areas_dropped(monkeypatch, capsys):
+    def fail(*args):
+        raise IndexError('list index out of range')
+    monkeypatch.setattr(bootstrap_areas, 'get_partition', fail)
+    areas, _, _ = bootstrap_areas.get_bootstrap_areas(0.5, {'predictor1': [90, 10, 80, 20, 0]}, 2, seed=1,
+                                                      processes=1)
+    assert np.isnan(areas).all()
+    assert '2 of 2 replicates dropped' in capsys.readouterr().err
+
+
+def test_get_replicate_areas_errors(monkeypatch):
+    def fail(*args):
+        raise ValueError('unexpected')
+    monkeypatch.setattr(bootstrap_areas, 'get_partition', fail)
+    with pytest.raises(ValueError):
+        bootstrap_areas.get_replicate_areas(0.5, {'predictor1': [0.9, 0.8, 1.0]})
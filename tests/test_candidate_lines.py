@@ -0,0 +1,53 @@
+from itertools import combinations
+import numpy as np
+import pytest
+from csp import find_predictor_intersections
+
+
+def get_loop_candidate_lines(rho, predictors, precision):
+    """
+    Candidate lines of a loop over the pairs of predictors
+    """
+    potential_lines = []
+    for group in combinations(predictors, 2):
+        slope, intercept = find_predictor_intersections.get_linear_equation_parameters(
+            rho, *predictors[group[0]], *predictors[group[1]])
+        if slope is not None and intercept is not None:
+            line = (round(slope, precision), round(intercept, precision))
+            if line in [(0.0, 0.0), (-1.0, 1.0)]:
+                continue
+            elif line not in potential_lines:
+                potential_lines.append(line)
+    return potential_lines
+
+
+@pytest.mark.parametrize('precision', [8, 10])
+def test_same_as_loop(precision):
+    rng = np.random.default_rng(0)
+    for trial in range(100):
+        # Few decimals make parallel planes, repeated lines and lines equal to the edges of the cost space
+        parameters = np.round(rng.uniform(0, 1, (rng.integers(1, 20), 3)), rng.integers(1, 4))
+        if trial % 3 == 0:
+            parameters[:, 2] = 1.0
+        predictors = {f'P{i}': values for i, values in enumerate(parameters.tolist())}
+        rho = round(rng.uniform(0, 1), int(rng.integers(1, 3)))
+        assert find_predictor_intersections.get_candidate_lines(rho, predictors, precision) == \
+            get_loop_candidate_lines(rho, predictors, precision)
+
+
+def test_round_values_same_as_round():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=100000) * rng.choice([0.01, 1, 10], 100000)
+    # Values halfway between two roundings
+    values[:4] = [0.12345678905, -0.00000000025, 2.5e-9, 1.00000000015]
+    # Values of near vertical lines, whose scaled ulps are wider than the fixed tolerance
+    values[4:10000] *= 10.0 ** rng.integers(3, 12, 9996)
+    for precision in [8, 10]:
+        rounded = find_predictor_intersections.round_values(values, precision)
+        assert rounded.tolist() == [round(value, precision) for value in values.tolist()]
+
+
+def test_no_negative_zero():
+    predictors = {'A': [0.9, 0.8, 1.0], 'B': [0.9, 0.7, 1.0], 'C': [0.8, 0.8, 1.0]}
+    for slope, intercept in find_predictor_intersections.get_candidate_lines(0.5, predictors, 8):
+        assert str(slope) != '-0.0' and str(intercept) != '-0.0'
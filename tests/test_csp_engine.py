@@ -0,0 +1,70 @@
+import copy
+import pickle
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from csp import csp_rej, csp_norej, csp_engine, find_predictor_intersections, build_intersection_graph, \
+    search_graph_polygons
+
+PREDICTORS = {
+    'PolyPhen-2': [0.926, 0.638, 0.909],
+    'SIFT': [0.924, 0.682, 0.866],
+    'CADD': [0.995, 0.254, 1],
+    'VEST': [0.971, 0.824, 0.937]
+}
+
+
+def test_inputs_not_modified(capsys):
+    rho = 0.5
+    nodes = find_predictor_intersections.get_nodes(rho, PREDICTORS, 8)
+    nodes_copy = copy.deepcopy(nodes)
+    unmerged_nodes = find_predictor_intersections.unmerge_nodes(nodes)
+    assert nodes == nodes_copy
+    unmerged_nodes_copy = copy.deepcopy(unmerged_nodes)
+    merged_nodes = find_predictor_intersections.merge_nodes(unmerged_nodes)
+    assert unmerged_nodes == unmerged_nodes_copy
+
+    lines = find_predictor_intersections.sort_line_nodes(find_predictor_intersections.get_lines(merged_nodes))
+    interactions, search_edges, search_nodes = build_intersection_graph.get_predictors_graph(lines)
+    graph_copy = copy.deepcopy((interactions, search_edges, search_nodes))
+    polygons = search_graph_polygons.get_polygons(search_edges, search_nodes, merged_nodes, interactions)
+    assert (interactions, search_edges, search_nodes) == graph_copy
+    assert search_graph_polygons.get_polygons(search_edges, search_nodes, merged_nodes, interactions) == polygons
+
+    merged_intervals = {'PolyPhen-2': 1.0}
+    csp_norej.print_output(rho, {'PolyPhen-2': [0.926, 0.638], 'SIFT': [0.924, 0.682]}, merged_intervals)
+    assert merged_intervals == {'PolyPhen-2': 1.0}
+
+
+def test_engine_threads():
+    engine = csp_engine.CSPEngine('rej', max_results=2)
+    rhos = [0.2, 0.4, 0.5, 0.6, 0.8]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda rho: engine.partition(rho, PREDICTORS), rhos))
+    for rho, result in zip(rhos, results):
+        assert dict(result.relative_areas) == csp_rej.get_partition(rho, PREDICTORS)[1]
+        assert result.best_combination == csp_rej.get_best_combination(result.relative_areas)
+    assert engine.partition(0.8, PREDICTORS) is results[-1]
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        results[0].rho = 0.1
+    with pytest.raises(TypeError):
+        results[0].areas['SIFT'] = 0
+    with pytest.raises(ValueError):
+        results[0].arrays['polygon_coords'][0, 0] = 1
+
+
+def test_engine_pickle(tmp_path, capsys):
+    engine = pickle.loads(pickle.dumps(csp_engine.CSPEngine('norej')))
+    result = engine.partition(0.5, {predictor: values[:2] for predictor, values in PREDICTORS.items()})
+    assert pickle.loads(pickle.dumps(result)) == result
+
+    result = csp_engine.CSPEngine('rej').partition(0.5, PREDICTORS)
+    shared_result = result.share(str(tmp_path / 'partition'))
+    assert len(pickle.dumps(shared_result)) < len(pickle.dumps(result))
+    loaded_result = pickle.loads(pickle.dumps(shared_result))
+    assert loaded_result.areas == result.areas
+    assert (loaded_result.arrays['polygon_coords'] == result.arrays['polygon_coords']).all()
+    loaded_result.print_output()
+    assert 'Best combination of methods (rho=0.5): ' + ', '.join(result.best_combination) in capsys.readouterr().out
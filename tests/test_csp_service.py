@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from csp import csp_rej, csp_service
+
+
+def get_thread_service(**kwargs):
+    service = csp_service.get_service(1, **kwargs)
+    service['executor'].shutdown()
+    service['executor'] = ThreadPoolExecutor(max_workers=2)
+    return service
+
+
+def test_parse_request():
+    rho, predictors, mode = csp_service.parse_request({'rho': 0.5, 'predictors': {'a': [0.9264, 0.6381, 1]}})
+    assert (rho, predictors, mode) == (0.5, {'a': [0.926, 0.638, 1.0]}, 'rej')
+    with pytest.raises(ValueError, match='a specificity is x but should be a number; b information should contain'):
+        csp_service.parse_request({'rho': 0.5, 'mode': 'norej', 'predictors': {'a': [0.9, 'x'], 'b': [0.9]}})
+    with pytest.raises(ValueError, match='rho'):
+        csp_service.parse_request({'rho': 0, 'predictors': {'a': [0.9, 0.8, 0.7]}})
+
+
+def test_cached_result():
+    service = get_thread_service(cache_entries=2, cache_ttl=10)
+    csp_service.set_cached_result(service, 'a', 1, now=0)
+    csp_service.set_cached_result(service, 'b', 2, now=0)
+    assert csp_service.get_cached_result(service, 'a', now=5) == 1
+    csp_service.set_cached_result(service, 'c', 3, now=5)
+    assert csp_service.get_cached_result(service, 'b', now=5) is None
+    assert csp_service.get_cached_result(service, 'a', now=11) is None
+    assert csp_service.get_cached_result(service, 'c', now=11) == 3
+
+
+def test_handle_request():
+    rho = 0.5
+    predictors = {
+        'PolyPhen-2': [0.926, 0.638, 0.909],
+        'SIFT': [0.924, 0.682, 0.866],
+        'CADD': [0.995, 0.254, 1]
+    }
+    service = get_thread_service()
+    body = json.dumps({'rho': rho, 'predictors': predictors}).encode()
+    status, result = asyncio.run(csp_service.handle_request(service, 'POST', '/partition', body))
+    assert status == 200
+    _, predictor_relative_areas = csp_rej.get_partition(rho, predictors)
+    assert all(np.isclose(result['relative_areas'][p], predictor_relative_areas[p]) for p in predictors)
+    assert result['best_combination'] == csp_rej.get_best_combination(predictor_relative_areas)
+
+    renamed_body = json.dumps({'rho': rho, 'predictors': {p.lower(): v for p, v in predictors.items()}}).encode()
+    status, renamed_result = asyncio.run(csp_service.handle_request(service, 'POST', '/partition', renamed_body))
+    assert status == 200 and service['counters']['cache_hits'] == 1
+    assert renamed_result['areas'] == {p.lower(): area for p, area in result['areas'].items()}
+
+    status, metrics = asyncio.run(csp_service.handle_request(service, 'GET', '/metrics', b''))
+    assert 'csp_request_seconds_count{mode="rej"} 2' in metrics
+    assert asyncio.run(csp_service.handle_request(service, 'POST', '/partition', b'{"rho": 0.5}'))[0] == 400
+
+
+def test_backpressure_timeout(monkeypatch):
+    monkeypatch.setattr(csp_service, 'compute_partition', lambda *args: time.sleep(0.3) or {})
+    service = get_thread_service(max_pending=1, timeout=0.05)
+
+    async def run_requests():
+        requests = [json.dumps({'rho': rho, 'predictors': {'a': [0.9, 0.8, 0.7]}}).encode() for rho in [0.4, 0.6]]
+        return await asyncio.gather(*[csp_service.handle_request(service, 'POST', '/partition', body)
+                                      for body in requests])
+
+    (first_status, _), (second_status, _) = asyncio.run(run_requests())
+    assert (first_status, second_status) == (504, 503)
+    assert service['counters']['timeouts'] == 1 and service['counters']['rejected'] == 1
+
+
+def exit_worker(*args):
+    os._exit(1)
+
+
+def test_worker_restart(monkeypatch):
+    monkeypatch.setattr(csp_service, 'compute_partition', exit_worker)
+    service = csp_service.get_service(1)
+    body = json.dumps({'rho': 0.5, 'predictors': {'a': [0.9, 0.8, 0.7]}}).encode()
+    try:
+        status, result = asyncio.run(csp_service.handle_request(service, 'POST', '/partition', body))
+        assert status == 500 and 'BrokenProcessPool' in result['error']
+        assert service['counters']['worker_restarts'] == 1 and service['pending'] == 0
+
+        # The new pool of workers answers the next requests
+        monkeypatch.undo()
+        status, _ = asyncio.run(csp_service.handle_request(service, 'POST', '/partition', body))
+        assert status == 200
+        metrics = asyncio.run(csp_service.handle_request(service, 'GET', '/metrics', b''))[1]
+        assert 'csp_worker_restarts_total 1' in metrics
+    finally:
+        service['executor'].shutdown()
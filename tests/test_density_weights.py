@@ -0,0 +1,87 @@
+import math
+import numpy as np
+import pytest
+from csp import csp_rej, csp_norej, density_weights
+from csp.obtain_polygon_data import get_predictors_cost_matrix
+
+PREDICTORS = {
+    'PolyPhen-2': [0.926, 0.638, 0.909],
+    'SIFT': [0.924, 0.682, 0.866],
+    'CADD': [0.995, 0.254, 1]
+}
+NOREJ_PREDICTORS = {'PolyPhen-2': [0.926, 0.638], 'SIFT': [0.924, 0.682], 'CADD': [0.995, 0.254],
+                    'VEST': [0.971, 0.824]}
+
+
+@pytest.mark.parametrize('i, j', [(0, 0), (1, 0), (2, 3), (5, 4)])
+def test_integrate_triangles_exact(i, j):
+    triangles = np.array([[[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]], [[1.0, 0.0], [0.0, 1.0], [0.0, 0.0]]])
+    expected = math.factorial(i) * math.factorial(j) / math.factorial(i + j + 2)
+    assert density_weights.integrate_triangles(triangles, [(i, j, 1.0)]) == pytest.approx([expected] * 2)
+
+
+def test_uniform_density_same_as_partition():
+    rho = 0.5
+    expected_areas, _ = csp_rej.get_partition(rho, PREDICTORS)
+    for density in [{'type': 'polynomial', 'terms': [(0, 0, 2.0)]},
+                    {'type': 'piecewise', 'breaks': [np.array([0, 0.5, 1]), np.array([0, 1])],
+                     'values': np.array([[3.0], [3.0]])}]:
+        areas = density_weights.get_density_areas(rho, PREDICTORS, density)
+        for predictor in PREDICTORS:
+            assert areas[predictor] == pytest.approx(expected_areas[predictor], abs=1e-12)
+
+    expected_intervals = csp_norej.get_partition(rho, NOREJ_PREDICTORS)
+    for density in [{'type': 'polynomial', 'terms': [(0, 0, 2.0)]},
+                    {'type': 'piecewise', 'breaks': [np.array([0, 0.2, 1])], 'values': np.array([1.0, 1.0])}]:
+        intervals = density_weights.get_density_intervals(rho, NOREJ_PREDICTORS, density)
+        assert intervals.keys() == expected_intervals.keys()
+        for predictor, length in expected_intervals.items():
+            assert intervals[predictor] == pytest.approx(length, abs=1e-12)
+
+
+def test_weighted_areas_same_as_sampled():
+    rho = 0.5
+    points = np.random.default_rng(0).random((1000000, 2))
+    points = points[points.sum(axis=1) <= 1]
+    best_predictors = get_predictors_cost_matrix(points[:, 0], points[:, 1], rho, PREDICTORS).argmin(axis=1)
+    density = {'type': 'polynomial', 'terms': [(0, 0, 1.0), (2, 1, 5.0)]}
+    weights = 1 + 5 * points[:, 0] ** 2 * points[:, 1]
+    sampled_areas = 0.5 * np.bincount(best_predictors, weights, len(PREDICTORS)) / weights.sum()
+    areas = density_weights.get_density_areas(rho, PREDICTORS, density)
+    assert np.abs(np.array([areas[p] for p in PREDICTORS]) - sampled_areas).max() < 0.002
+
+    density = {'type': 'empirical', 'samples': points[:1000]}
+    areas = density_weights.get_density_areas(rho, PREDICTORS, density)
+    assert list(areas.values()) == (0.5 * np.bincount(best_predictors[:1000], minlength=3) / 1000).tolist()
+
+
+def test_parse_density_config(tmp_path):
+    config = tmp_path / 'density.config'
+    config.write_text('[density]\ntype=polynomial\n1=1\nx^2*Y=0.5\nx*x=2\n')
+    assert density_weights.parse_density_config(str(config), 'rej') == {
+        'type': 'polynomial', 'terms': [(0, 0, 1.0), (2, 1, 0.5), (2, 0, 2.0)]}
+    with pytest.raises(SystemExit) as e:
+        density_weights.parse_density_config(str(config), 'norej')
+    assert str(e.value) == 'The density term x^2*Y should be a product of powers of x such as x^2'
+
+    (tmp_path / 'samples.csv').write_text('x,y\n0.1,0.2\n0.6,0.6\n')
+    config.write_text('[density]\ntype=empirical\nsamples=samples.csv\n')
+    with pytest.raises(SystemExit) as e:
+        density_weights.parse_density_config(str(config), 'rej')
+    assert str(e.value) == 'The samples of the density should be inside the cost space but row 3 is not'
+
+    config.write_text('[density]\ntype=piecewise\nx_breaks=0,0.5,1\nvalues=1,2,3\n')
+    with pytest.raises(SystemExit) as e:
+        density_weights.parse_density_config(str(config), 'norej')
+    assert str(e.value) == 'The values of the density should be 2 non-negative numbers, one for each cell'
+
+
+def test_parse_negative_polynomial(tmp_path):
+    config = tmp_path / 'density.config'
+    config.write_text('[density]\ntype=polynomial\n1=1\nx=-1\n')
+    assert density_weights.parse_density_config(str(config), 'norej')['terms'] == [(0, 0, 1.0), (1, 0, -1.0)]
+    for text, mode in [('1=1\nx=-1.99\n', 'norej'), ('1=1\nx*y=-20\n', 'rej')]:
+        config.write_text('[density]\ntype=polynomial\n' + text)
+        with pytest.raises(SystemExit) as e:
+            density_weights.parse_density_config(str(config), mode)
+        assert str(e.value) == 'The polynomial density should be non-negative over the cost space'
@@ -0,0 +1,70 @@
+import csv
+import numpy as np
+import pytest
+from csp import csp_rej, csp_norej, expected_costs, output_writers
+from csp.obtain_polygon_data import get_predictor_cost, get_predictors_cost_matrix
+
+PREDICTORS = {
+    'PolyPhen-2': [0.926, 0.638, 0.909],
+    'SIFT': [0.924, 0.682, 0.866],
+    'CADD': [0.995, 0.254, 1.0],
+    'VEST': [0.971, 0.824, 0.937]
+}
+
+PREDICTORS_NOREJ = {predictor: parameters[:2] for predictor, parameters in PREDICTORS.items()}
+
+
+def test_rej_costs():
+    rho = 0.4
+    *_, (predictor_costs, best_cost) = csp_rej.run_cost_partition(rho, PREDICTORS)
+    # The mean of a linear cost over the triangle is its cost on the centroid of the triangle
+    for predictor, parameters in PREDICTORS.items():
+        assert predictor_costs[predictor] == pytest.approx(get_predictor_cost(1 / 3, 1 / 3, rho, *parameters),
+                                                           abs=1e-12)
+    grid = (np.arange(1000) + 0.5) / 1000
+    x, y = np.meshgrid(grid, grid)
+    inside = x + y < 1
+    costs = get_predictors_cost_matrix(x[inside], y[inside], rho, PREDICTORS)
+    assert best_cost == pytest.approx(costs.min(axis=1).mean(), abs=1e-4)
+    assert best_cost <= min(predictor_costs.values())
+
+
+def test_norej_costs(tmp_path):
+    rho = 0.4
+    merged_intervals, (predictor_costs, best_cost) = csp_norej.get_cost_partition(rho, PREDICTORS_NOREJ)
+    assert merged_intervals == csp_norej.get_partition(rho, PREDICTORS_NOREJ)
+    x = (np.arange(100000) + 0.5) / 100000
+    costs = np.stack([x * (1 - spec + rho * (sens + spec - 2)) + rho * (1 - sens)
+                      for sens, spec in PREDICTORS_NOREJ.values()], axis=1)
+    for predictor, predictor_cost in zip(PREDICTORS_NOREJ, costs.mean(axis=0)):
+        assert predictor_costs[predictor] == pytest.approx(predictor_cost, abs=1e-12)
+    assert best_cost == pytest.approx(costs.min(axis=1).mean(), abs=1e-8)
+
+    for _ in range(2):
+        cached = csp_norej.get_cost_partition(rho, PREDICTORS_NOREJ, str(tmp_path))
+        assert cached[0] == pytest.approx(merged_intervals)
+        assert cached[1][1] == pytest.approx(best_cost)
+
+
+def test_polygon_centroids():
+    arrays = {'polygon_coords': np.array([[0, 0], [1, 0], [0, 1], [0, 0], [0, 0], [0.5, 0], [0.5, 0.5], [0, 0.5],
+                                          [0, 0], [0, 0], [1, 1], [0, 0]], dtype=float),
+              'polygon_offsets': np.array([0, 4, 9, 12])}
+    centroids, areas = expected_costs.get_polygon_centroids(arrays)
+    np.testing.assert_allclose(centroids[:2], [[1 / 3, 1 / 3], [0.25, 0.25]])
+    np.testing.assert_allclose(areas, [0.5, 0.25, 0])
+    assert np.all(np.isfinite(centroids))
+
+
+def test_costs_columns(tmp_path):
+    filename = str(tmp_path / 'runs.csv')
+    *areas, costs = csp_rej.run_cost_partition(0.5, PREDICTORS)
+    with output_writers.open_writer('csv', filename, 'rej', costs=True) as write_run:
+        write_run(None, 0.5, PREDICTORS, *areas, expected_costs=costs)
+    with open(filename) as runs:
+        rows = list(csv.DictReader(runs))
+    assert len(rows) == len(PREDICTORS)
+    for row in rows:
+        assert float(row['expected_cost']) == pytest.approx(costs[0][row['predictor']])
+        assert float(row['regret']) == pytest.approx(costs[0][row['predictor']] - costs[1])
+        assert float(row['best_cost']) == pytest.approx(costs[1])
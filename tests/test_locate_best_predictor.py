@@ -0,0 +1,39 @@
+import numpy as np
+
+from csp import locate_best_predictor, obtain_polygon_data
+
+
+def test_locate_points():
+    rho = 0.5
+    predictors = {
+        'PolyPhen-2': [0.926, 0.638, 0.909],
+        'SIFT': [0.924, 0.682, 0.866],
+        'CADD': [0.995, 0.254, 1]
+    }
+    index = locate_best_predictor.build_partition_index(rho, predictors)
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0, 1, (2, 100000))
+    inside = x + y <= 1
+    labels = locate_best_predictor.locate_points(index, x, y)
+    costs = obtain_polygon_data.get_predictors_cost_matrix(x, y, rho, predictors)
+    expected = np.where(inside, costs.argmin(axis=1), -1)
+    sorted_costs = np.sort(costs, axis=1)
+    far_from_boundaries = sorted_costs[:, 1] - sorted_costs[:, 0] > 1e-6
+    assert np.array_equal(labels[far_from_boundaries], expected[far_from_boundaries])
+
+
+def test_locate_points_boundaries():
+    polygons = [[(0.0, 0.0), (0.0, 0.5), (0.5, 0.5), (0.5, 0.0), (0.0, 0.0)],
+                [(0.0, 0.5), (0.0, 1.0), (0.5, 0.5), (0.0, 0.5)],
+                [(0.5, 0.0), (0.5, 0.5), (1.0, 0.0), (0.5, 0.0)]]
+    predictors = {'predictor1': [0.9, 0.9, 1.0], 'predictor2': [0.5, 0.5, 1.0]}
+    index = locate_best_predictor.build_point_index(0.5, predictors, polygons)
+    labels = locate_best_predictor.locate_points(index, [0.0, 1.0, 0.0, 0.25, 0.6, -0.1, 0.5, 1.2],
+                                                 [0.0, 0.0, 1.0, 0.75, 0.1, 0.2, 0.6, 0.0])
+    assert labels.tolist() == [0, 0, 0, 0, 0, -1, -1, -1]
+
+
+def test_locate_intervals():
+    index = locate_best_predictor.build_interval_index(0.5, {'CADD': [0.995, 0.254], 'VEST': [0.971, 0.824]})
+    labels = locate_best_predictor.locate_intervals(index, [0.0, 0.02, 0.5, 1.0, 1.1, -0.1])
+    assert labels.tolist() == [0, 0, 1, 1, -1, -1]
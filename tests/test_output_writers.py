@@ -0,0 +1,72 @@
+import csv
+import sys
+import json
+
+import pytest
+
+from csp import csp_rej, output_writers
+
+RUNS = [
+    ('BRCA1', 0.5, {'PolyPhen-2': [0.926, 0.638, 0.909], 'SIFT': [0.924, 0.682, 0.866]},
+     {'PolyPhen-2': 0.30276380436352407, 'SIFT': 0.19723619563647593},
+     {'PolyPhen-2': 0.6055276087270481, 'SIFT': 0.39447239127295186}),
+    ('TP53', 0.4, {'CADD': [0.995, 0.254, 1.0], 'SIFT': [0.924, 0.682, 0.866]},
+     {'CADD': 0.5, 'SIFT': 0.0}, {'CADD': 1.0, 'SIFT': 0.0})
+]
+
+
+def write_runs(output_format, filename, decimals=None):
+    with output_writers.open_writer(output_format, filename, 'rej', decimals, group_by='gene') as write_run:
+        for run in RUNS:
+            write_run(*run)
+
+
+def test_write_json(tmp_path):
+    write_runs('json', str(tmp_path / 'runs.json'))
+    runs = json.loads((tmp_path / 'runs.json').read_text())
+    write_runs('jsonl', str(tmp_path / 'runs.jsonl'), decimals=3)
+    rounded_runs = [json.loads(line) for line in (tmp_path / 'runs.jsonl').read_text().splitlines()]
+    assert [run['group'] for run in runs] == ['BRCA1', 'TP53']
+    assert runs[0]['predictors'][0] == {'predictor': 'PolyPhen-2', 'sensitivity': 0.926, 'specificity': 0.638,
+                                        'coverage': 0.909, 'absolute_value': 0.30276380436352407,
+                                        'relative_value': 0.6055276087270481, 'best_rank': 1}
+    assert rounded_runs[0]['predictors'][0]['relative_value'] == 0.606
+    assert runs[1]['best_combination'] == rounded_runs[1]['best_combination'] == ['CADD']
+
+
+def test_write_csv(tmp_path):
+    write_runs('csv', str(tmp_path / 'runs.csv'))
+    with open(tmp_path / 'runs.csv') as table:
+        rows = list(csv.DictReader(table))
+    assert [(row['gene'], row['predictor'], row['best_rank']) for row in rows] == [
+        ('BRCA1', 'PolyPhen-2', '1'), ('BRCA1', 'SIFT', '2'), ('TP53', 'CADD', '1'), ('TP53', 'SIFT', '')]
+    assert float(rows[1]['absolute_value']) == 0.19723619563647593
+
+
+def test_write_text(tmp_path, capsys):
+    write_runs('text', str(tmp_path / 'runs.txt'))
+    for group, *run in RUNS:
+        print('\ngene: ' + group)
+        csp_rej.print_output(*run)
+    assert (tmp_path / 'runs.txt').read_text() == capsys.readouterr().out
+
+
+def test_write_parquet(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    write_runs('parquet', str(tmp_path / 'runs.parquet'))
+    table = pq.read_table(str(tmp_path / 'runs.parquet'))
+    assert table.column('predictor').to_pylist() == ['PolyPhen-2', 'SIFT', 'CADD', 'SIFT']
+
+
+def test_error_bound_rounded():
+    _, rho, predictors, areas, relative_areas = RUNS[0]
+    run_record = output_writers.get_run_record('rej', None, rho, predictors, areas, relative_areas,
+                                               {'PolyPhen-2': 0.0012345, 'SIFT': 0.0012345}, decimals=3)
+    assert [record['error_bound'] for record in run_record['predictors']] == [0.001, 0.001]
+
+
+def test_get_side_output():
+    assert output_writers.get_side_output('json', None) is sys.stderr
+    assert output_writers.get_side_output('csv', '-') is sys.stderr
+    assert output_writers.get_side_output('json', 'runs.json') is sys.stdout
+    assert output_writers.get_side_output('text', None) is sys.stdout
@@ -0,0 +1,50 @@
+import itertools
+import numpy as np
+import pytest
+from csp import csp_rej, csp_norej, pairwise_wins
+
+PREDICTORS_REJ = {
+    'PolyPhen-2': [0.926, 0.638, 0.909],
+    'SIFT': [0.924, 0.682, 0.866],
+    'CADD': [0.995, 0.254, 1.0],
+    'VEST': [0.971, 0.824, 0.937]
+}
+
+PREDICTORS_NOREJ = {
+    'PolyPhen-2': [0.926, 0.638],
+    'SIFT': [0.924, 0.682],
+    'CADD': [0.995, 0.254],
+    'VEST': [0.971, 0.824]
+}
+
+
+@pytest.mark.parametrize('rho', [0.2, 0.5, 0.8])
+def test_rej_same_as_partition_of_each_pair(rho):
+    wins = pairwise_wins.get_pairwise_wins(rho, PREDICTORS_REJ, mode='rej')
+    for predictor, other in itertools.permutations(PREDICTORS_REJ, 2):
+        pair = {predictor: PREDICTORS_REJ[predictor], other: PREDICTORS_REJ[other]}
+        _, relative_areas = csp_rej.get_partition(rho, pair)
+        assert wins[predictor][other] == pytest.approx(relative_areas[predictor], abs=1e-7)
+
+
+@pytest.mark.parametrize('rho', [0.2, 0.5, 0.8])
+def test_norej_same_as_partition_of_each_pair(rho):
+    wins = pairwise_wins.get_pairwise_wins(rho, PREDICTORS_NOREJ, mode='norej')
+    for predictor, other in itertools.permutations(PREDICTORS_NOREJ, 2):
+        pair = {predictor: PREDICTORS_NOREJ[predictor], other: PREDICTORS_NOREJ[other]}
+        _, _, merged_intervals = csp_norej.get_merged_intervals(rho, pair)
+        assert wins[predictor][other] == pytest.approx(merged_intervals.get(predictor, 0.0), abs=1e-7)
+
+
+def test_wins_of_both_predictors_add_up_to_one():
+    rng = np.random.default_rng(0)
+    predictors = {f'P{i}': rng.uniform(0.5, 1, 3).tolist() for i in range(20)}
+    win_matrix = pairwise_wins.get_win_matrix(0.5, predictors)
+    assert np.all(np.diag(win_matrix) == 0)
+    off_diagonal = ~np.eye(len(predictors), dtype=bool)
+    np.testing.assert_allclose((win_matrix + win_matrix.T)[off_diagonal], 1, atol=1e-12)
+
+
+def test_unknown_mode():
+    with pytest.raises(Exception):
+        pairwise_wins.get_win_matrix(0.5, PREDICTORS_REJ, mode='other')
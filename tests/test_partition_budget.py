@@ -0,0 +1,83 @@
+import argparse
+import pytest
+from csp import csp_rej, partition_budget, approximate_areas
+
+PREDICTORS = {
+    'PolyPhen-2': [0.926, 0.638, 0.909],
+    'SIFT': [0.924, 0.682, 0.866],
+    'CADD': [0.995, 0.254, 1],
+    'MutationTaster': [0.959, 0.548, 0.917]
+}
+
+
+def test_parse_budget():
+    assert partition_budget.parse_budget('30') == {'seconds': 30.0}
+    assert partition_budget.parse_budget('2.5, nodes=500,faces=100') == {'seconds': 2.5, 'nodes': 500, 'faces': 100}
+    for value in ['edges=3', 'nodes=0', 'nodes=1.5', 'fast']:
+        with pytest.raises(argparse.ArgumentTypeError):
+            partition_budget.parse_budget(value)
+
+
+def test_estimate_arrangement_bounds_partition():
+    rho = 0.5
+    with csp_rej.collect_stats() as stats:
+        csp_rej.get_partition(rho, PREDICTORS)
+    counts = {name: value for record in stats['stages'] for name, value in record['counts'].items()}
+    estimate = partition_budget.estimate_arrangement(counts['candidate_lines'])
+    assert counts['nodes'] <= estimate['nodes'] and counts['faces'] <= estimate['faces']
+
+
+def test_budget_partition_within_budget():
+    rho = 0.5
+    areas = csp_rej.get_budget_partition(rho, PREDICTORS, {'seconds': 600, 'nodes': 1000, 'faces': 1000})
+    assert areas == (*csp_rej.get_partition(rho, PREDICTORS), None)
+
+
+def test_budget_partition_checks_arrangement_counts():
+    # The nodes and faces of the arrangement are below their upper bound, which doesn't exceed the budget by itself
+    rho = 0.5
+    with csp_rej.collect_stats() as stats:
+        csp_rej.get_partition(rho, PREDICTORS)
+    counts = {}
+    for record in stats['stages']:
+        for name, value in record['counts'].items():
+            counts[name] = max(counts.get(name, 0), value)
+    estimate = partition_budget.estimate_arrangement(counts['candidate_lines'])
+    budget = {'nodes': counts['nodes'], 'faces': counts['faces']}
+    assert estimate['nodes'] > budget['nodes'] and estimate['faces'] > budget['faces']
+    assert csp_rej.get_budget_partition(rho, PREDICTORS, budget) == (*csp_rej.get_partition(rho, PREDICTORS), None)
+
+
+def test_approximate_partition_deadline():
+    rho = 0.5
+    _, predictor_relative_areas, relative_error_bounds = approximate_areas.get_approximate_partition(
+        rho, PREDICTORS, 1e-9, deadline=0)
+    _, exact_relative_areas = csp_rej.get_partition(rho, PREDICTORS)
+    # The refinement stops on the initial grid, far from the tolerance but within the bound
+    assert max(relative_error_bounds.values()) > 1e-3
+    for predictor in PREDICTORS:
+        assert abs(predictor_relative_areas[predictor] - exact_relative_areas[predictor]) <= \
+            relative_error_bounds[predictor] + 1e-9
+
+
+@pytest.mark.parametrize('budget', [{'seconds': 1e-9}, {'nodes': 10}, {'faces': 5}])
+def test_budget_partition_fallback(budget):
+    rho = 0.5
+    _, exact_relative_areas = csp_rej.get_partition(rho, PREDICTORS)
+    with csp_rej.collect_stats() as stats:
+        _, predictor_relative_areas, relative_error_bounds = csp_rej.get_budget_partition(
+            rho, PREDICTORS, budget, tolerance=0.01)
+    assert 'budget' in stats['budget_exceeded']
+    assert stats['stages'][-1]['stage'] == 'get_approximate_partition'
+    for predictor in PREDICTORS:
+        assert abs(predictor_relative_areas[predictor] - exact_relative_areas[predictor]) <= \
+            relative_error_bounds[predictor] + 1e-9
+
+
+def test_budget_partition_recursion_fallback(monkeypatch):
+    def recurse(*args):
+        raise RecursionError('maximum recursion depth exceeded')
+    monkeypatch.setattr(csp_rej, 'run_partition', recurse)
+    with csp_rej.collect_stats() as stats:
+        areas = csp_rej.get_budget_partition(0.5, PREDICTORS, {'seconds': 600})
+    assert areas[2] is not None and stats['budget_exceeded'] == 'maximum recursion depth exceeded'
@@ -0,0 +1,45 @@
+import numpy as np
+
+from csp import csp_rej, partition_format
+
+
+def get_arrangement():
+    rho = 0.5
+    predictors = {
+        'PolyPhen-2': [0.926, 0.638, 0.909],
+        'SIFT': [0.924, 0.682, 0.866],
+        'CADD': [0.995, 0.254, 1]
+    }
+    return rho, predictors, csp_rej.get_partition_arrangement(rho, predictors)
+
+
+def test_encode_arrangement():
+    _, _, (nodes, lines, polygons) = get_arrangement()
+    arrays = partition_format.encode_arrangement(nodes, lines, polygons)
+    assert arrays['polygon_offsets'][-1] == len(arrays['polygon_coords'])
+    assert partition_format.decode_arrangement(arrays) == (nodes, lines, polygons)
+
+
+def test_save_partition(tmp_path):
+    rho, predictors, _ = get_arrangement()
+    predictor_areas, _ = csp_rej.get_partition(rho, predictors)
+    arrays = csp_rej.get_partition_arrays(rho, predictors)
+    for path in [str(tmp_path / 'partition.npz'), str(tmp_path / 'partition')]:
+        partition_format.save_partition(path, arrays)
+        loaded_arrays = partition_format.load_partition(path)
+        assert sorted(loaded_arrays) == sorted(arrays)
+        for name in arrays:
+            np.testing.assert_array_equal(loaded_arrays[name], arrays[name])
+        assert partition_format.get_partition_areas(loaded_arrays) == predictor_areas
+        best_predictor_areas = partition_format.get_best_predictor_areas(loaded_arrays)
+        assert all(np.isclose(best_predictor_areas[p], predictor_areas[p]) for p in predictors)
+    assert isinstance(loaded_arrays['polygon_coords'], np.memmap)
+
+
+def test_get_polygon_areas():
+    arrays = {
+        'polygon_coords': np.array([[0, 0], [0.5, 0], [0, 0.5], [0, 0], [0.5, 0], [1, 0], [0, 1], [0.5, 0]]),
+        'polygon_offsets': np.array([0, 4, 8])
+    }
+    assert np.allclose(partition_format.get_polygon_areas(arrays), [0.125, 0.25])
+    assert np.array_equal(partition_format.get_polygon_coords(arrays, 1), [[0.5, 0], [1, 0], [0, 1], [0.5, 0]])
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from csp import csp_rej, plane_envelope
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_single_point_curves_same_as_rej(seed):
+    rng = np.random.default_rng(seed)
+    rho = 0.5
+    predictors = {'P{}'.format(i): np.round(0.5 + rng.random(3) / 2, 3).tolist() for i in range(5)}
+    curves = {predictor: [[0.0] + values] for predictor, values in predictors.items()}
+    predictor_areas, predictor_relative_areas, _ = plane_envelope.get_curve_partition(rho, curves)
+    expected_areas, _ = csp_rej.get_partition(rho, predictors)
+    for predictor in predictors:
+        assert predictor_areas[predictor] == pytest.approx(expected_areas[predictor], abs=1e-7)
+        assert predictor_relative_areas[predictor] == predictor_areas[predictor] / 0.5
+
+
+def test_curve_partition_same_as_lowest_planes():
+    rng = np.random.default_rng(0)
+    rho = 0.3
+    curves = {}
+    for predictor in range(4):
+        sensitivities = np.sort(rng.random(100))[::-1]
+        specificities = np.sort(rng.random(100))
+        coverages = 0.7 + 0.3 * rng.random(100)
+        curves['T{}'.format(predictor)] = np.column_stack([np.arange(100), sensitivities, specificities,
+                                                           coverages]).tolist()
+    predictor_areas, _, point_areas = plane_envelope.get_curve_partition(rho, curves)
+    assert sum(predictor_areas.values()) == pytest.approx(0.5)
+    assert sum(area for _, _, area in point_areas) == pytest.approx(0.5)
+
+    points = rng.random((400000, 2))
+    points = points[points.sum(axis=1) <= 1]
+    planes, predictor_ids, _ = plane_envelope.get_curve_planes(curves)
+    coefficients = plane_envelope.get_plane_coefficients(rho, planes)
+    best_planes = (points @ coefficients[:, :2].T + coefficients[:, 2]).argmin(axis=1)
+    sampled_areas = 0.5 * np.bincount(predictor_ids[best_planes], minlength=len(curves)) / len(points)
+    assert np.abs(sampled_areas - list(predictor_areas.values())).max() < 0.005
+
+
+def test_identical_planes_keep_first_point():
+    curves = {'A': [[1.0, 0.9, 0.8, 0.9]], 'B': [[2.0, 0.9, 0.8, 0.9], [3.0, 0.5, 0.5, 0.5]]}
+    predictor_areas, _, point_areas = plane_envelope.get_curve_partition(0.5, curves)
+    assert predictor_areas['B'] == sum(area for predictor, _, area in point_areas if predictor == 'B')
+    assert ('B', 2.0) not in [(predictor, threshold) for predictor, threshold, _ in point_areas]
+
+
+def test_clip_polygon():
+    triangle = [(0.0, 0.0), (1.0, 0.0), (0.0, 1.0)]
+    assert plane_envelope.get_shoelace_area(plane_envelope.clip_polygon(triangle, 1, 0, -0.5)) == \
+        pytest.approx(0.375)
+    assert plane_envelope.clip_polygon(triangle, 1, 1, 1) == []
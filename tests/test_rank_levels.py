@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from csp import csp_rej, rank_levels
+from csp.obtain_polygon_data import get_predictors_cost_matrix
+
+PREDICTORS = {
+    'PolyPhen-2': [0.926, 0.638, 0.909],
+    'SIFT': [0.924, 0.682, 0.866],
+    'CADD': [0.995, 0.254, 1.0],
+    'VEST': [0.971, 0.824, 0.937]
+}
+
+
+def test_first_rank_same_as_partition():
+    rank_areas, tuple_areas = rank_levels.get_rank_partition(0.5, PREDICTORS, 2)
+    predictor_areas, _ = csp_rej.get_partition(0.5, PREDICTORS)
+    assert list(rank_areas) == [1, 2]
+    for predictor in PREDICTORS:
+        assert rank_areas[1][predictor] == pytest.approx(predictor_areas[predictor], abs=1e-12)
+    for rank in rank_areas:
+        assert sum(rank_areas[rank].values()) == pytest.approx(0.5, abs=1e-12)
+    assert sum(tuple_areas.values()) == pytest.approx(0.5, abs=1e-12)
+    assert all(len(ranking) == 2 for ranking in tuple_areas)
+
+
+def test_ranks_same_as_grid():
+    rho = 0.3
+    rank_areas, tuple_areas = rank_levels.get_rank_partition(rho, PREDICTORS, 10)
+    assert list(rank_areas) == [1, 2, 3, 4]
+    grid = (np.arange(1000) + 0.5) / 1000
+    x, y = np.meshgrid(grid, grid)
+    inside = x + y < 1
+    costs = get_predictors_cost_matrix(x[inside], y[inside], rho, PREDICTORS)
+    order = np.argsort(costs, axis=1, kind='stable')
+    names = list(PREDICTORS)
+    for rank in rank_areas:
+        for i, predictor in enumerate(names):
+            assert rank_areas[rank][predictor] == pytest.approx(np.mean(order[:, rank - 1] == i) / 2, abs=2e-3)
+    rankings, counts = np.unique(order, axis=0, return_counts=True)
+    for ranking, n_points in zip(rankings.tolist(), counts.tolist()):
+        assert tuple_areas.get(tuple(names[i] for i in ranking), 0.0) == \
+            pytest.approx(n_points / inside.sum() / 2, abs=2e-3)
+
+
+def test_top_predictors_ties_keep_the_lowest_id():
+    costs = np.array([[1.0, 0.0, 0.0, 0.0, 2.0], [3.0, 2.0, 1.0, 0.0, 1.0]])
+    np.testing.assert_array_equal(rank_levels.get_top_predictors(costs, 2), [[1, 2], [3, 2]])
+    np.testing.assert_array_equal(rank_levels.get_top_predictors(costs, 5),
+                                  np.argsort(costs, axis=1, kind='stable'))
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from csp import csp_rej, raster_tiles
+from csp.obtain_polygon_data import get_point_best_predictor
+
+PREDICTORS = {
+    'PolyPhen-2': [0.926, 0.638, 0.909],
+    'SIFT': [0.924, 0.682, 0.866],
+    'CADD': [0.995, 0.254, 1.0],
+    'VEST': [0.971, 0.824, 0.937]
+}
+
+
+def test_labels_are_the_best_predictors(tmp_path):
+    rho, size = 0.5, 300
+    metadata = raster_tiles.write_raster(str(tmp_path), rho, PREDICTORS, size, tile_size=64, workers=4)
+    assert metadata['levels'] == 4
+    labels = raster_tiles.load_raster_level(str(tmp_path), 0)
+    assert labels.shape == (size, size) and labels.dtype == np.uint16
+    for row in range(0, size, 7):
+        for col in range(0, size, 11):
+            x, y = (col + 0.5) / size, 1 - (row + 0.5) / size
+            if x + y > 1:
+                assert labels[row, col] == raster_tiles.NODATA
+            else:
+                best_predictor = get_point_best_predictor(x, y, rho, PREDICTORS)
+                assert metadata['predictors'][labels[row, col]] == best_predictor
+
+    arrays = csp_rej.get_partition_arrays(rho, PREDICTORS)
+    pixel_areas = np.bincount(labels[labels != raster_tiles.NODATA], minlength=len(PREDICTORS)) / size ** 2
+    np.testing.assert_allclose(pixel_areas, arrays['areas'], atol=5e-3)
+
+
+def test_lower_levels_are_written_when_loaded(tmp_path):
+    raster_tiles.write_raster(str(tmp_path), 0.5, PREDICTORS, 300, tile_size=64)
+    assert not (tmp_path / 'level_2.npy').exists()
+    level = raster_tiles.load_raster_level(str(tmp_path), 2)
+    assert level.shape == (75, 75)
+    assert (tmp_path / 'level_2.npy').exists()
+    small_raster = tmp_path / 'small'
+    raster_tiles.write_raster(str(small_raster), 0.5, PREDICTORS, 75, tile_size=64)
+    np.testing.assert_array_equal(level, raster_tiles.load_raster_level(str(small_raster), 0))
+
+    tile = raster_tiles.load_raster_tile(str(tmp_path), 1, 2, 1)
+    np.testing.assert_array_equal(tile, raster_tiles.load_raster_level(str(tmp_path), 1)[128:150, 64:128])
+    with pytest.raises(Exception):
+        raster_tiles.load_raster_level(str(tmp_path), 4)
+
+
+def test_rewritten_raster_replaces_levels(tmp_path):
+    path = str(tmp_path)
+    raster_tiles.write_raster(path, 0.5, PREDICTORS, 128, tile_size=32)
+    raster_tiles.load_raster_level(path, 1)
+    (tmp_path / 'level_2.npy.tmp.npy').write_bytes(b'')
+    raster_tiles.write_raster(path, 0.1, PREDICTORS, 128, tile_size=32)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['level_0.npy', 'raster.json']
+    expected = raster_tiles.write_raster(str(tmp_path / 'fresh'), 0.1, PREDICTORS, 128, tile_size=32)
+    assert raster_tiles.read_metadata(path) == expected
+    assert np.array_equal(raster_tiles.load_raster_level(path, 1),
+                          raster_tiles.load_raster_level(str(tmp_path / 'fresh'), 1))
@@ -0,0 +1,59 @@
+import os
+import time
+
+from csp import csp_rej, csp_norej, result_cache
+
+
+def test_get_cache_key():
+    predictors = {'a': [0.9, 0.8, 0.7], 'b': [0.8, 0.9, 0.7]}
+    key = result_cache.get_cache_key(0.5, predictors, 'rej')
+    assert result_cache.get_cache_key(0.5, {'c': [0.8, 0.9, 0.7], 'd': [0.9, 0.8, 0.7]}, 'rej') == key
+    assert result_cache.get_cache_key(0.5, predictors, 'norej') != key
+    assert result_cache.get_cache_key(0.4, predictors, 'rej') != key
+
+
+def test_cached_partition(tmp_path, capsys):
+    rho = 0.5
+    predictors = {
+        'PolyPhen-2': [0.926, 0.638, 0.909],
+        'SIFT': [0.924, 0.682, 0.866],
+        'CADD': [0.995, 0.254, 1]
+    }
+    areas = csp_rej.get_partition(rho, predictors, cache_dir=str(tmp_path))
+    assert len(list(tmp_path.glob('*.npz'))) == 1
+    renamed_predictors = {name.lower(): predictors[name] for name in reversed(list(predictors))}
+    with csp_rej.collect_stats() as stats:
+        cached_areas = csp_rej.get_partition(rho, renamed_predictors, cache_dir=str(tmp_path))
+    assert stats['cache_hit'] is True and stats['stages'] == []
+    for predictor in predictors:
+        assert cached_areas[0][predictor.lower()] == areas[0][predictor]
+        assert cached_areas[1][predictor.lower()] == areas[1][predictor]
+
+    norej_predictors = {predictor: values[:2] for predictor, values in predictors.items()}
+    csp_norej.main(rho, norej_predictors, cache_dir=str(tmp_path))
+    output = capsys.readouterr().out
+    with csp_rej.collect_stats() as stats:
+        csp_norej.main(rho, norej_predictors, cache_dir=str(tmp_path))
+    assert stats['cache_hit'] is True
+    assert capsys.readouterr().out == output
+
+
+def test_evict_entries(tmp_path):
+    predictors = {'a': [0.9, 0.8, 0.7], 'b': [0.8, 0.9, 0.7]}
+    for i, rho in enumerate([0.1, 0.2, 0.3]):
+        result_cache.store_entry(str(tmp_path), rho, predictors, 'rej', {'areas': [0.25, 0.25]})
+        os.utime(result_cache.get_entry_path(str(tmp_path), result_cache.get_cache_key(rho, predictors, 'rej')),
+                 (time.time() - 10 + i, time.time() - 10 + i))
+    assert result_cache.load_entry(str(tmp_path), 0.1, predictors, 'rej') is not None
+    entry_size = os.path.getsize(next(tmp_path.glob('*.npz')))
+    result_cache.store_entry(str(tmp_path), 0.4, predictors, 'rej', {'areas': [0.25, 0.25]}, 3 * entry_size)
+    assert result_cache.load_entry(str(tmp_path), 0.2, predictors, 'rej') is None
+    assert all(result_cache.load_entry(str(tmp_path), rho, predictors, 'rej') is not None for rho in [0.1, 0.3, 0.4])
+
+
+def test_damaged_entry(tmp_path):
+    predictors = {'a': [0.9, 0.8, 0.7], 'b': [0.8, 0.9, 0.7]}
+    path = result_cache.get_entry_path(str(tmp_path), result_cache.get_cache_key(0.5, predictors, 'rej'))
+    with open(path, 'wb') as entry:
+        entry.write(b'damaged')
+    assert result_cache.load_entry(str(tmp_path), 0.5, predictors, 'rej') is None
@@ -0,0 +1,114 @@
+import copy
+import numpy as np
+import pytest
+from csp import csp_rej, csp_norej, stability_radius
+
+PREDICTORS = {
+    'PolyPhen-2': [0.926, 0.638, 0.909],
+    'SIFT': [0.924, 0.682, 0.866],
+    'CADD': [0.995, 0.254, 1.0],
+    'VEST': [0.971, 0.824, 0.937]
+}
+
+PREDICTORS_NOREJ = {
+    'PolyPhen-2': [0.926, 0.638],
+    'SIFT': [0.924, 0.682],
+    'CADD': [0.995, 0.254],
+    'MutPred': [0.95, 0.706],
+    'VEST': [0.971, 0.824]
+}
+
+
+def get_support(rho, predictors, mode):
+    if mode == 'rej':
+        predictor_areas, _ = csp_rej.get_partition(rho, predictors)
+    else:
+        predictor_areas = csp_norej.get_partition(rho, predictors)
+    return [predictor for predictor in predictors if predictor_areas.get(predictor, 0) > 1e-12]
+
+
+@pytest.mark.parametrize('mode, predictors', [('rej', PREDICTORS), ('norej', PREDICTORS_NOREJ)])
+def test_radii_same_as_partition(mode, predictors):
+    rho = 0.5
+    support, radii, rho_radii = stability_radius.get_stability_radii(rho, predictors, mode)
+    assert support == get_support(rho, predictors, mode)
+    for predictor in predictors:
+        for k, parameter in enumerate(stability_radius.MODE_PARAMETERS[mode]):
+            for direction, radius in zip([-1, 1], radii[predictor][parameter]):
+                value = predictors[predictor][k]
+                perturbed = copy.deepcopy(predictors)
+                perturbed[predictor][k] = value + direction * radius * 0.99
+                assert get_support(rho, perturbed, mode) == support
+                if radius < (value if direction < 0 else 1 - value) - 1e-9:
+                    perturbed[predictor][k] = value + direction * (radius + 1e-5)
+                    assert get_support(rho, perturbed, mode) != support
+    for direction, radius in zip([-1, 1], rho_radii):
+        assert get_support(rho + direction * radius * 0.99, predictors, mode) == support
+
+
+def test_margins_sign_same_as_partition():
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        predictors = {f'P{i}': np.round(rng.uniform(0.5, 1, 3), 3).tolist() for i in range(4)}
+        rho = rng.uniform(0.1, 0.9)
+        support, _, _ = stability_radius.get_stability_radii(rho, predictors)
+        assert support == get_support(rho, predictors, 'rej')
+
+
+def test_single_predictor():
+    support, radii, rho_radii = stability_radius.get_stability_radii(0.3, {'CADD': [0.995, 0.254, 1.0]})
+    assert support == ['CADD']
+    assert radii['CADD']['sensitivity'] == pytest.approx([0.995, 0.005])
+    assert rho_radii == pytest.approx([0.3, 0.7])
+
+
+def test_change_between_grid_steps():
+    rng = np.random.default_rng(3)
+    for _ in range(2):
+        predictors = {f'P{i}': np.round(rng.uniform(0.5, 1, 3), 3).tolist() for i in range(6)}
+        rho = rng.uniform(0.1, 0.9)
+    support, radii, _ = stability_radius.get_stability_radii(rho, predictors)
+    # Decreasing the coverage of P3 drops P5 only between about 0.11 and 0.125
+    decrease = radii['P3']['coverage'][0]
+    assert 0.1 < decrease < 0.12
+    for change, same in [(decrease * 0.99, True), (decrease + 0.005, False), (0.2, True)]:
+        perturbed = copy.deepcopy(predictors)
+        perturbed['P3'][2] -= change
+        assert (get_support(rho, perturbed, 'rej') == support) == same
+
+    # No change is missed between the scanned steps of any perturbation
+    parameters = np.array(list(predictors.values()))
+    is_supported = stability_radius.get_batch_margins(np.array([rho]), parameters[None], 'rej')[0] > 1e-12
+    perturbed, directions, largest_changes = stability_radius.get_perturbations(rho, parameters)
+    flat_radii = [radius for predictor in predictors for parameter_radii in radii[predictor].values()
+                  for radius in parameter_radii]
+    steps = np.arange(1, 501) / 500
+    for i, radius in enumerate(flat_radii):
+        changes = largest_changes[i] * steps
+        inputs = stability_radius.get_perturbed_inputs(rho, parameters, np.full(len(steps), perturbed[i]),
+                                                       directions[i] * changes)
+        distances = stability_radius.get_support_distance(stability_radius.get_batch_margins(*inputs, 'rej'),
+                                                          is_supported)
+        assert radius <= changes[distances <= 0].min(initial=np.inf) + 1e-9
+
+
+def test_tied_predictors():
+    # Only the first of the predictors with the same parameters has a non-zero fraction
+    predictors = dict(PREDICTORS, DUP=PREDICTORS['VEST'].copy())
+    rho = 0.5
+    support, radii, _ = stability_radius.get_stability_radii(rho, predictors)
+    assert support == get_support(rho, predictors, 'rej') == ['CADD', 'VEST']
+    for predictor in ['VEST', 'DUP']:
+        for k, parameter in enumerate(stability_radius.MODE_PARAMETERS['rej']):
+            for direction, radius in zip([-1, 1], radii[predictor][parameter]):
+                value = predictors[predictor][k]
+                perturbed = copy.deepcopy(predictors)
+                if radius > 1e-9:
+                    perturbed[predictor][k] = value + direction * radius * 0.99
+                    assert get_support(rho, perturbed, 'rej') == support
+                if radius < (value if direction < 0 else 1 - value) - 1e-9:
+                    perturbed[predictor][k] = value + direction * (radius + 1e-5)
+                    assert get_support(rho, perturbed, 'rej') != support
+    # Making the copy worse never changes the predictors, making it better always does
+    assert radii['DUP']['sensitivity'] == pytest.approx([0.971, 0])
+    assert radii['DUP']['specificity'] == pytest.approx([0.824, 0])
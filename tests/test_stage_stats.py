@@ -0,0 +1,65 @@
+import numpy as np
+from csp import csp_rej, csp_norej
+
+
+def test_collect_stats_rej():
+    rho = 0.5
+    predictors = {
+        'PolyPhen-2': [0.926, 0.638, 0.909],
+        'SIFT': [0.924, 0.682, 0.866],
+        'CADD': [0.995, 0.254, 1]
+    }
+    records = []
+    with csp_rej.collect_stats(callback=records.append) as stats:
+        csp_rej.get_partition(rho, predictors)
+    stages = [record['stage'] for record in stats['stages']]
+    assert stages == ['get_nodes', 'unmerge_nodes', 'merge_nodes', 'sort_line_nodes', 'get_predictors_graph',
+                      'get_polygons']
+    assert len(records) == len(stages)
+    assert stats['retry'] is False
+    polygons_stage = stats['stages'][stages.index('get_polygons')]
+    assert polygons_stage['counts']['faces'] > 0
+    assert polygons_stage['counts']['bfs_expansions'] >= polygons_stage['counts']['faces']
+    assert all(record['seconds'] >= 0 and record['peak_memory'] > 0 for record in stats['stages'])
+
+
+def test_collect_stats_norej(capsys):
+    rho = 0.5
+    predictors = {
+        'PolyPhen-2': [0.926, 0.638],
+        'SIFT': [0.924, 0.682],
+        'CADD': [0.995, 0.254]
+    }
+    with csp_rej.collect_stats() as stats:
+        csp_norej.main(rho, predictors)
+    assert [record['stage'] for record in stats['stages']] == [
+        'get_predictors_intersections', 'get_interval_best_predictor', 'merge_intervals']
+    assert stats['stages'][1]['counts']['intervals'] == stats['stages'][0]['counts']['x_points'] + 1
+
+
+def test_stats_disabled():
+    rho = 0.5
+    predictors = {
+        'PolyPhen-2': [0.926, 0.638, 0.909],
+        'SIFT': [0.924, 0.682, 0.866]
+    }
+    with csp_rej.collect_stats() as stats:
+        pass
+    csp_rej.get_partition(rho, predictors)
+    assert stats['stages'] == []
+
+
+def test_nested_stage_peak_memory():
+    size = 8 * 2 ** 20
+    with csp_rej.collect_stats() as stats:
+        with csp_rej.stage('outer'):
+            with csp_rej.stage('allocate'):
+                data = np.ones(size // 8)
+                del data
+            with csp_rej.stage('after'):
+                pass
+    peaks = {record['stage']: record['peak_memory'] for record in stats['stages']}
+    # The outer stage keeps the peak of the inner stages, and the stages count the memory above their start
+    assert size <= peaks['allocate'] < 2 * size
+    assert peaks['allocate'] <= peaks['outer']
+    assert peaks['after'] < size // 8
@@ -0,0 +1,33 @@
+import json
+from csp import csp_rej, search_graph_polygons, obtain_polygon_data
+
+PREDICTORS = {
+    'PolyPhen-2': [0.926, 0.638, 0.909],
+    'SIFT': [0.924, 0.682, 0.866],
+    'CADD': [0.995, 0.254, 1],
+    'MutationTaster': [0.959, 0.548, 0.917]
+}
+
+
+def test_iter_polygons_same_as_get_polygons():
+    rho = 0.5
+    nodes, lines, interactions, search_edges, search_nodes = csp_rej.predictors_2_graph(rho, PREDICTORS, 8)
+    polygons = search_graph_polygons.get_polygons(search_edges, search_nodes, nodes, interactions)
+    polygons_iterator = search_graph_polygons.iter_polygons(search_edges, search_nodes, nodes, interactions)
+    assert next(polygons_iterator) == polygons[0]
+    assert [polygons[0]] + list(polygons_iterator) == polygons
+
+
+def test_streaming_partition_same_as_polygons_data(tmp_path):
+    rho = 0.5
+    polygons = csp_rej.get_partition_polygons(rho, PREDICTORS)
+    expected_areas = obtain_polygon_data.get_polygons_data(rho, PREDICTORS, polygons)
+    spill_faces = str(tmp_path / 'faces.jsonl')
+    assert csp_rej.get_partition(rho, PREDICTORS, spill_faces=spill_faces) == expected_areas
+
+    with open(spill_faces) as faces:
+        spilled = [json.loads(line) for line in faces]
+    assert [face['polygon'] for face in spilled] == [[list(node) for node in polygon] for polygon in polygons]
+    assert [face['best_predictor'] for face in spilled] == \
+        obtain_polygon_data.get_polygon_best_predictor(rho, PREDICTORS, polygons)
+    assert abs(sum(face['area'] for face in spilled) - 0.5) < 1e-9
@@ -0,0 +1,32 @@
+import numpy as np
+
+from benchmarks import synthetic_predictors
+from csp import obtain_polygon_data, obtain_predictor_intervals
+
+
+def test_get_synthetic_predictors_reproducible():
+    for kind in synthetic_predictors.KINDS:
+        for mode, n_parameters in [('rej', 3), ('norej', 2)]:
+            predictors = synthetic_predictors.get_synthetic_predictors(kind, 20, mode=mode, seed=3)
+            assert predictors == synthetic_predictors.get_synthetic_predictors(kind, 20, mode=mode, seed=3)
+            assert len(predictors) == 20
+            parameters = np.array(list(predictors.values()))
+            assert parameters.shape == (20, n_parameters)
+            assert ((0 <= parameters) & (parameters <= 1)).all()
+
+
+def test_concurrent_predictors():
+    x, y = synthetic_predictors.CONCURRENT_POINT
+    predictors = synthetic_predictors.get_synthetic_predictors('concurrent', 10, mode='rej')
+    costs = obtain_polygon_data.get_predictors_cost_matrix(x, y, 0.5, predictors)
+    assert np.ptp(costs) < 0.01
+    predictors = synthetic_predictors.get_synthetic_predictors('concurrent', 10, mode='norej')
+    x_points = obtain_predictor_intervals.get_predictors_intersections(0.5, predictors)
+    assert abs(np.median(x_points) - x) < 0.01
+
+
+def test_dominated_predictors():
+    predictors = synthetic_predictors.get_synthetic_predictors('dominated', 10, mode='rej')
+    best = predictors['predictor1']
+    for sens, spec, cov in predictors.values():
+        assert sens <= best[0] and spec <= best[1] and cov == best[2]
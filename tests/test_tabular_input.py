@@ -0,0 +1,83 @@
+import pytest
+
+from csp import tabular_input
+
+
+def write_table(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_parse_table(tmp_path):
+    filename = write_table(tmp_path / 'predictors.csv', '\n'.join([
+        'Gene,Predictor,Sensitivity,Specificity,Coverage,rho',
+        'BRCA1,PolyPhen-2,0.926,0.638,0.909,0.5',
+        'BRCA1,SIFT,0.9244,0.682,0.866,0.5',
+        '',
+        'TP53,CADD,0.995,0.254,1,0.4',
+        'TP53,SIFT,0.924,0.682,0.866,0.4'
+    ]))
+    assert tabular_input.parse_table(filename, 'rej', group_by='gene', chunk_rows=3) == [
+        ('BRCA1', 0.5, {'PolyPhen-2': [0.926, 0.638, 0.909], 'SIFT': [0.924, 0.682, 0.866]}),
+        ('TP53', 0.4, {'CADD': [0.995, 0.254, 1.0], 'SIFT': [0.924, 0.682, 0.866]})
+    ]
+    filename = write_table(tmp_path / 'predictors.tsv',
+                           'predictor\tsensitivity\tspecificity\nA\t0.9\t0.8\nB\t0.8\t0.9\n')
+    assert tabular_input.is_table(filename)
+    assert tabular_input.parse_table(filename, 'norej', rho=0.5) == [(None, 0.5, {'A': [0.9, 0.8], 'B': [0.8, 0.9]})]
+
+
+def test_parse_table_errors(tmp_path):
+    filename = write_table(tmp_path / 'predictors.csv', '\n'.join([
+        'gene,predictor,sensitivity,specificity,coverage,rho',
+        'BRCA1,PolyPhen-2,0.926,x,0.909,0.5',
+        'BRCA1,PolyPhen-2,1.2,0.682,0.866,0.6',
+        'TP53,,0.995,0.254',
+        'TP53,CADD,0.995,0.254,1,2'
+    ]))
+    with pytest.raises(SystemExit) as e:
+        tabular_input.parse_table(filename, 'rej', group_by='gene')
+    assert str(e.value).split('\n') == [
+        'row 4: it has 4 fields but the header has 6',
+        'row 2: PolyPhen-2 specificity is x but should be a number',
+        'row 3: PolyPhen-2 sensitivity is 1.2 but should be between 0 - 1',
+        'row 5: the rho value 2.0 should be between 0.00001 - 1',
+        'gene BRCA1: the rho values should be the same but they are 0.5, 0.6',
+        'row 3: gene BRCA1: the predictor PolyPhen-2 is repeated'
+    ]
+    filename = write_table(tmp_path / 'norho.csv', 'predictor,sensitivity,specificity\n')
+    with pytest.raises(SystemExit, match='column.s. rho'):
+        tabular_input.parse_table(filename, 'norej')
+
+
+def test_parse_parquet(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    filename = str(tmp_path / 'predictors.parquet')
+    pq.write_table(pa.table({'predictor': ['A', 'B'], 'sensitivity': [0.9, 0.8], 'specificity': [0.8, 0.9],
+                             'rho': [0.5, 0.5]}), filename)
+    assert tabular_input.parse_table(filename, 'norej') == [(None, 0.5, {'A': [0.9, 0.8], 'B': [0.8, 0.9]})]
+
+
+def test_parse_table_not_finite(tmp_path):
+    filename = write_table(tmp_path / 'predictors.csv', '\n'.join([
+        'predictor,sensitivity,specificity,coverage,rho',
+        'A,nan,0.8,0.9,0.5',
+        'B,0.9,inf,0.9,0.5',
+        'C,0.9,0.7,0.9,NaN'
+    ]))
+    with pytest.raises(SystemExit) as e:
+        tabular_input.parse_table(filename, 'rej')
+    assert str(e.value).split('\n') == [
+        'row 2: A sensitivity is nan but should be a number',
+        'row 3: B specificity is inf but should be a number',
+        'row 4: C rho is NaN but should be a number'
+    ]
+
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    filename = str(tmp_path / 'predictors.parquet')
+    pq.write_table(pa.table({'predictor': ['A', 'B'], 'sensitivity': [None, 0.8], 'specificity': [0.8, 0.9]}),
+                   filename)
+    with pytest.raises(SystemExit, match='row 1: A sensitivity is nan but should be a number'):
+        tabular_input.parse_table(filename, 'norej', rho=0.5)
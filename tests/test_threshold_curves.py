@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from csp import csp_norej, threshold_curves, tabular_input
+
+
+def get_random_curves(seed, n_predictors, n_points):
+    rng = np.random.default_rng(seed)
+    curves = {}
+    for predictor in range(n_predictors):
+        sensitivities = np.sort(rng.random(n_points))[::-1]
+        specificities = np.sort(rng.random(n_points))
+        curves['P{}'.format(predictor)] = [[threshold, sens, spec] for threshold, (sens, spec)
+                                           in enumerate(zip(np.round(sensitivities, 3), np.round(specificities, 3)))]
+    return curves
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_single_point_curves_same_as_norej(seed):
+    rng = np.random.default_rng(seed)
+    rho = 0.5
+    predictors = {'P{}'.format(i): np.round(rng.random(2), 3).tolist() for i in range(6)}
+    curves = {predictor: [[0.0] + values] for predictor, values in predictors.items()}
+    merged_intervals, threshold_segments = threshold_curves.get_curve_partition(rho, curves)
+    expected_intervals = csp_norej.get_partition(rho, predictors)
+    assert merged_intervals.keys() == expected_intervals.keys()
+    for predictor, length in expected_intervals.items():
+        assert merged_intervals[predictor] == pytest.approx(length, abs=1e-9)
+    assert threshold_segments[0][0] == 0 and threshold_segments[-1][1] == 1
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_threshold_segments_are_lowest_lines(seed):
+    rho = 0.3
+    curves = get_random_curves(seed, 4, 200)
+    threshold_segments = threshold_curves.get_threshold_segments(rho, curves)
+    assert all(end > start for start, end, _, _ in threshold_segments)
+    assert all(segment[1] == next_segment[0] for segment, next_segment in zip(threshold_segments,
+                                                                              threshold_segments[1:]))
+    points = {(predictor, point[0]): point[1:] for predictor, points in curves.items() for point in points}
+    slopes, intercepts, _, _ = threshold_curves.get_curve_lines(rho, curves)
+    for start, end, predictor, threshold in threshold_segments:
+        x = np.linspace(start, end, 5)[1:-1]
+        sens, spec = points[(predictor, threshold)]
+        cost = x * ((1 - spec) + rho * (sens + spec - 2)) + rho * (1 - sens)
+        assert np.all(cost <= (x[:, None] * slopes + intercepts).min(axis=1) + 1e-12)
+
+
+def test_parse_curve_table(tmp_path):
+    path = tmp_path / 'curves.csv'
+    path.write_text('predictor,threshold,sensitivity,specificity\nA,0.1,0.99,0.3\nA,0.5,0.9,0.7\nB,1,0.95,0.6\n')
+    assert tabular_input.parse_table(str(path), 'norej', rho=0.5, curves=True) == [
+        (None, 0.5, {'A': [[0.1, 0.99, 0.3], [0.5, 0.9, 0.7]], 'B': [[1.0, 0.95, 0.6]]})]
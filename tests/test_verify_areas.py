@@ -0,0 +1,33 @@
+import numpy as np
+
+from csp import verify_areas
+
+
+def test_get_halton_points():
+    points = verify_areas.get_halton_points(1, 4)
+    assert np.allclose(points, [[1 / 2, 1 / 3], [1 / 4, 2 / 3], [3 / 4, 1 / 9], [1 / 8, 4 / 9]])
+
+
+def test_get_t_quantile():
+    assert round(verify_areas.get_t_quantile(0.995, 31), 3) == 2.744
+    assert round(verify_areas.get_t_quantile(0.975, 9), 2) == 2.26
+
+
+def test_get_qmc_areas():
+    rho = 0.5
+    predictors = {
+        'PolyPhen-2': [0.926, 0.638, 0.909],
+        'SIFT': [0.924, 0.682, 0.866],
+        'CADD': [0.995, 0.254, 1]
+    }
+    predictor_areas = {
+        'PolyPhen-2': 0.11410069066319463,
+        'SIFT': 0.1895963750902457,
+        'CADD': 0.19630293424655962
+    }
+    qmc_areas = verify_areas.get_qmc_areas(rho, predictors, 320000, seed=0)
+    assert np.isclose(sum(area for area, _, _ in qmc_areas.values()), 0.5)
+    assert verify_areas.get_flagged_predictors(predictor_areas, qmc_areas) == []
+    predictor_areas['SIFT'] += 0.01
+    predictor_areas['CADD'] -= 0.01
+    assert verify_areas.get_flagged_predictors(predictor_areas, qmc_areas) == ['SIFT', 'CADD']